@@ -0,0 +1,40 @@
+"""
+Selection of the statistics backend behind the statistics page.
+
+A backend is a module providing describe(counts) and
+compare_groups(counts1, counts2, alpha) over 11-bin score histograms, and
+t_sf_many(t, df), Student's t survival function at each pair of two
+sequences:
+
+- "scipy" (analytics.engine) uses NumPy and scipy.stats
+- "python" (analytics.pure_engine) needs neither
+
+The module is imported on first use, not when the URLconf loads, so workers
+that only serve participants never import NumPy or SciPy. The resampling,
+trajectory and item analysis figures always need NumPy, but not SciPy, and
+import it lazily too; without NumPy the statistics page leaves out the
+trajectory chart.
+"""
+
+from importlib import import_module
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+BACKENDS = {
+    "scipy": "analytics.engine",
+    "python": "analytics.pure_engine",
+}
+
+
+def get_backend():
+    """
+    The configured statistics backend module (STATISTICS_BACKEND)
+    """
+    name = getattr(settings, "STATISTICS_BACKEND", "scipy")
+    try:
+        return import_module(BACKENDS[name])
+    except KeyError:
+        raise ImproperlyConfigured(
+            f"STATISTICS_BACKEND must be one of {', '.join(BACKENDS)}, not {name!r}"
+        ) from None
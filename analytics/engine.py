@@ -0,0 +1,163 @@
+"""
+Statistics over per-group score histograms.
+
+Quiz scores are integers from 0 to 10, so every statistic the dashboard shows
+can be derived from an 11-bin count vector per treatment group. The functions
+here work on arrays of such vectors, shape (..., 11), without ever expanding
+them back into individual scores.
+
+Only the t distribution needs SciPy, and it is imported where used, so the
+array helpers shared with resampling and the trajectory need only NumPy.
+"""
+
+import numpy as np
+from django.db.models import Count
+
+from study.models import QuizResponse
+
+MAX_SCORE = 10
+SCORES = np.arange(MAX_SCORE + 1, dtype=float)
+
+
+def score_histograms():
+    """
+    Return {treatment_group: counts} from a single GROUP BY query
+    """
+    histograms = {}
+    rows = (
+        QuizResponse.objects.values_list("participant__treatment_group", "score")
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+    for group, score, n in rows:
+        if score is None:
+            continue
+        counts = histograms.setdefault(group, np.zeros(MAX_SCORE + 1, dtype=np.int64))
+        counts[int(score)] += n
+    return dict(sorted(histograms.items()))
+
+
+def moments(counts):
+    """
+    Return (n, mean, sample variance) for histogram(s), nan where undefined
+    """
+    counts = np.asarray(counts, dtype=float)
+    n = counts.sum(axis=-1)
+    total = counts @ SCORES
+    total_squares = counts @ (SCORES**2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / n
+        variance = (total_squares - n * mean**2) / (n - 1)
+    variance = np.where(n == 1, 0.0, np.maximum(variance, 0.0))
+    return n, mean, variance
+
+
+def percentiles(counts, q):
+    """
+    Percentiles matching numpy's default linear interpolation on the raw data
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    q = np.atleast_1d(np.asarray(q, dtype=float))
+    cumulative = counts.cumsum(axis=-1)
+    n = cumulative[..., -1:]
+
+    position = (n - 1) * q / 100.0
+    lower = np.floor(position)
+    fraction = position - lower
+
+    def value_at(rank):
+        # The score holding the rank-th smallest observation (0-based)
+        return (cumulative[..., None, :] <= rank[..., None]).sum(axis=-1)
+
+    below = value_at(lower)
+    above = value_at(np.minimum(lower + 1, n - 1))
+    result = below + fraction * (above - below)
+    return np.where(n > 0, result, np.nan)
+
+
+def describe(counts):
+    """
+    Summary statistics for one histogram, as a dict of floats
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    n, mean, variance = moments(counts)
+    present = np.nonzero(counts)[0]
+    q1, median, q3 = percentiles(counts, [25, 50, 75])
+    return {
+        "count": int(n),
+        "mean": float(mean) if n else np.nan,
+        "std": float(np.sqrt(variance)) if n else np.nan,
+        "std_population": float(np.sqrt(variance * (n - 1) / n)) if n else np.nan,
+        "min": float(present[0]) if n else np.nan,
+        "max": float(present[-1]) if n else np.nan,
+        "q1": float(q1),
+        "median": float(median),
+        "q3": float(q3),
+        "distribution": [int(c) for c in counts],
+    }
+
+
+def cohens_d(n1, mean1, var1, n2, mean2, var2):
+    """
+    Cohen's d with the pooled standard deviation; works on arrays
+    """
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pooled = np.sqrt(((n1 - 1) * var1 + (n2 - 1) * var2) / (n1 + n2 - 2))
+        d = (mean1 - mean2) / pooled
+    # Zero spread: no effect if the means agree, otherwise unbounded
+    return np.where(pooled > 0, d, np.where(mean1 == mean2, 0.0, np.inf))
+
+
+def welch_t(n1, mean1, var1, n2, mean2, var2):
+    """
+    Welch's t statistic, degrees of freedom and standard error; works on arrays
+    """
+    a = var1 / n1
+    b = var2 / n2
+    se_squared = a + b
+    with np.errstate(invalid="ignore", divide="ignore"):
+        se = np.sqrt(se_squared)
+        t = (mean1 - mean2) / se
+        df = se_squared**2 / (a**2 / (n1 - 1) + b**2 / (n2 - 1))
+    return t, df, se
+
+
+def compare_groups(counts1, counts2, alpha=0.05):
+    """
+    One-sided Welch test (group 1 > group 2), Cohen's d and the CI of the
+    mean difference, computed from two histograms
+    """
+    from scipy import stats
+
+    n1, mean1, var1 = moments(counts1)
+    n2, mean2, var2 = moments(counts2)
+    if n1 < 2 or n2 < 2:
+        return None
+
+    t, df, se = welch_t(n1, mean1, var1, n2, mean2, var2)
+    if se > 0:
+        p_value = stats.t.sf(t, df)
+        confidence_interval = stats.t.interval(
+            1 - alpha, df, loc=mean1 - mean2, scale=se
+        )
+    else:
+        p_value = np.nan
+        confidence_interval = (np.nan, np.nan)
+
+    return {
+        "t_statistic": float(t),
+        "p_value": float(p_value),
+        "df": float(df),
+        "cohens_d": float(cohens_d(n1, mean1, var1, n2, mean2, var2)),
+        "confidence_interval": confidence_interval,
+    }
+
+
+def t_sf_many(t, df):
+    """
+    Survival function P(T > t) of Student's t at each (t, df) pair of two
+    arrays
+    """
+    from scipy import stats
+
+    return stats.t.sf(t, df)
@@ -0,0 +1,105 @@
+"""
+Streaming export of participants joined with their quiz responses.
+
+Rows are read in primary-key ordered chunks (keyset pagination), so memory
+stays flat and no read transaction is held open while a slow client drains
+the stream. Under ASGI, aiter_export() reads the same chunks through
+sync_to_async: Django's ASGI handler would otherwise drain a sync iterator
+into memory before sending anything.
+"""
+
+import csv
+import json
+from datetime import datetime
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+
+from study.models import Participant
+
+EXPORT_FORMATS = ("csv", "ndjson")
+
+# (column name, Participant lookup)
+EXPORT_COLUMNS = [
+    ("participant_id", "id"),
+    ("treatment_group", "treatment_group"),
+    ("referred_by_id", "referred_by_id"),
+    ("created_at", "created_at"),
+    ("score", "quizresponse__score"),
+    ("raffle_tickets", "quizresponse__raffle_tickets"),
+    ("submitted_at", "quizresponse__submitted_at"),
+]
+
+
+def iter_rows(chunk_size=2000):
+    """
+    Yield one tuple per participant, ordered by primary key
+    """
+    lookups = [lookup for _, lookup in EXPORT_COLUMNS]
+    last_pk = 0
+    while True:
+        chunk = list(
+            Participant.objects.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .values_list(*lookups)[:chunk_size]
+        )
+        if not chunk:
+            return
+        yield from chunk
+        last_pk = chunk[-1][0]
+
+
+class _Echo:
+    """
+    File-like object whose write() returns the value, for csv.writer
+    """
+
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def iter_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _ in EXPORT_COLUMNS])
+    for row in rows:
+        yield writer.writerow([_csv_value(value) for value in row])
+
+
+def iter_ndjson(rows):
+    names = [name for name, _ in EXPORT_COLUMNS]
+    for row in rows:
+        yield json.dumps(dict(zip(names, row)), cls=DjangoJSONEncoder) + "\n"
+
+
+def iter_export(export_format="csv", chunk_size=2000):
+    """
+    Yield the export as text fragments in the requested format
+    """
+    rows = iter_rows(chunk_size=chunk_size)
+    if export_format == "csv":
+        return iter_csv(rows)
+    if export_format == "ndjson":
+        return iter_ndjson(rows)
+    raise ValueError(f"Unknown export format {export_format!r}")
+
+
+async def aiter_export(export_format="csv", chunk_size=2000):
+    """
+    Async variant of iter_export(), for streaming responses under ASGI
+    """
+    fragments = iter_export(export_format, chunk_size=chunk_size)
+    # At most one chunk query per call, run in the thread holding the
+    # connection; the generator keeps its place between calls
+    take = sync_to_async(lambda: list(islice(fragments, chunk_size)))
+    while batch := await take():
+        for fragment in batch:
+            yield fragment
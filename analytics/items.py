@@ -0,0 +1,187 @@
+"""
+Item analysis of the quiz questions.
+
+All packed answers are read in one query and unpacked into a (responses,
+questions) array of answer codes (see study.answers), from which every
+figure is a column-wise reduction: difficulty, item-rest point-biserial
+discrimination, correctness per treatment group and how often each option
+was chosen. Correlation sums are integers, so they are exact at any scale.
+Only answers given against the current version of the question bank can be
+decoded, so responses recorded against another version are counted but
+left out.
+"""
+
+import math
+import threading
+
+import numpy as np
+from django.db import connection
+
+from study import answers
+from study.models import Participant, QuizResponse
+from study.question_bank import OPTION_LETTERS, get_question_bank
+
+PARTICIPANTS = Participant._meta.db_table
+RESPONSES = QuizResponse._meta.db_table
+
+# Stand-ins for packed answers that cannot be analysed
+WITHOUT_ANSWERS = -1
+OTHER_BANK = -2
+
+
+def load_answers(bank=None):
+    """
+    Return (treatment group, packed answers) arrays of all responses; packed
+    answers are WITHOUT_ANSWERS for responses stored without them, and
+    OTHER_BANK for answers given against another version of the bank
+    """
+    bank = bank or get_question_bank()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT p.treatment_group, CASE
+                WHEN r.answers IS NULL THEN {WITHOUT_ANSWERS}
+                WHEN r.answers_bank != %s THEN {OTHER_BANK}
+                ELSE r.answers
+            END
+            FROM {RESPONSES} r
+            JOIN {PARTICIPANTS} p ON p.id = r.participant_id
+            """,
+            [bank.key_digest],
+        )
+        rows = np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, 2)
+    return rows[:, 0], rows[:, 1]
+
+
+def _share(count, total):
+    return count / total if total else None
+
+
+def _item_rest_correlation(correct):
+    """
+    Point-biserial correlation of each item with the total of the other items
+    """
+    n = len(correct)
+    x = correct.astype(np.int64)
+    total = x.sum(axis=1)
+    sum_x = x.sum(axis=0)
+    sum_rest = total.sum() - sum_x
+    # x * x == x for 0/1 items
+    sum_x_rest = x.T @ total - sum_x
+    sum_rest_squares = (total * total).sum() - 2 * (x.T @ total) + sum_x
+    covariance = n * sum_x_rest - sum_x * sum_rest
+    variance_x = n * sum_x - sum_x * sum_x
+    variance_rest = n * sum_rest_squares - sum_rest * sum_rest
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return covariance / np.sqrt(variance_x.astype(float) * variance_rest)
+
+
+def _proportion_test(correct1, correct2):
+    """
+    Two-sided pooled z-test p-values for equal correctness in two groups
+    """
+    n1, n2 = len(correct1), len(correct2)
+    if not n1 or not n2:
+        return np.full(correct1.shape[1], np.nan)
+    k1, k2 = correct1.sum(axis=0), correct2.sum(axis=0)
+    pooled = (k1 + k2) / (n1 + n2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        se = np.sqrt(pooled * (1 - pooled) * (1 / n1 + 1 / n2))
+        z = (k1 / n1 - k2 / n2) / se
+    # Two-sided normal tail, 2 * sf(|z|), without SciPy: one value per question
+    p_value = np.vectorize(math.erfc, otypes=[float])(np.abs(z) / math.sqrt(2))
+    return np.where(se > 0, p_value, np.nan)
+
+
+def _nan_to_none(value):
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+def item_analysis(groups, packed, bank=None):
+    """
+    Per-question figures for the responses with answers stored against
+    `bank`
+    """
+    bank = bank or get_question_bank()
+    count = len(bank.questions)
+    stored = packed >= 0
+    groups = groups[stored]
+    codes = answers.unpack_matrix(packed[stored], count)
+    keys = np.array(
+        [answers.CODES[question.correct_answer] for question in bank.questions],
+        dtype=np.uint8,
+    )
+    correct = codes == keys
+    n = len(codes)
+
+    difficulty = correct.mean(axis=0) if n else np.full(count, np.nan)
+    discrimination = _item_rest_correlation(correct)
+    in_group1, in_group2 = correct[groups == 1], correct[groups == 2]
+    group1 = in_group1.mean(axis=0) if len(in_group1) else np.full(count, np.nan)
+    group2 = in_group2.mean(axis=0) if len(in_group2) else np.full(count, np.nan)
+    p_values = _proportion_test(in_group1, in_group2)
+    # Row q holds how often each code (no answer, A-D) was given to question q
+    choices = np.bincount(
+        (np.arange(count) * (len(OPTION_LETTERS) + 1) + codes).ravel(),
+        minlength=count * (len(OPTION_LETTERS) + 1),
+    ).reshape(count, -1)
+
+    items = []
+    for q, question in enumerate(bank.questions):
+        option_counts = choices[q].tolist()
+        items.append(
+            {
+                "id": question.id,
+                "text": question.text,
+                "correct_answer": question.correct_answer,
+                "difficulty": _nan_to_none(difficulty[q]),
+                "discrimination": _nan_to_none(discrimination[q]),
+                "group1_correct": _nan_to_none(group1[q]),
+                "group2_correct": _nan_to_none(group2[q]),
+                "difference": _nan_to_none(group1[q] - group2[q]),
+                "p_value": _nan_to_none(p_values[q]),
+                "no_answer": option_counts[answers.NO_ANSWER],
+                "options": [
+                    {
+                        "letter": letter,
+                        "text": text,
+                        "count": option_counts[answers.CODES[letter]],
+                        "share": _share(option_counts[answers.CODES[letter]], n),
+                        "correct": letter == question.correct_answer,
+                    }
+                    for letter, text in question.options
+                ],
+            }
+        )
+    return {
+        "responses": n,
+        "without_answers": int((packed == WITHOUT_ANSWERS).sum()),
+        "other_bank": int((packed == OTHER_BANK).sum()),
+        "group1_responses": len(in_group1),
+        "group2_responses": len(in_group2),
+        "items": items,
+    }
+
+
+_lock = threading.Lock()
+_cached = (None, None)
+
+
+def cached_item_analysis(version):
+    """
+    item_analysis() of all responses, computed once per statistics data
+    version and question bank
+    """
+    global _cached
+    bank = get_question_bank()
+    key = (version, bank.digest)
+    cached_key, result = _cached
+    if cached_key == key:
+        return result
+    with _lock:
+        cached_key, result = _cached
+        if cached_key != key:
+            result = item_analysis(*load_answers(bank), bank=bank)
+            _cached = (key, result)
+        return result
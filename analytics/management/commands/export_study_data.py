@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from analytics.export import EXPORT_FORMATS, iter_export
+
+
+class Command(BaseCommand):
+    help = "Stream participants and their quiz responses as CSV or NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+        parser.add_argument(
+            "--output",
+            help="File to write to (defaults to standard output)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=2000,
+            help="Number of participants fetched per query",
+        )
+
+    def handle(self, *args, **options):
+        chunks = iter_export(options["format"], chunk_size=options["chunk_size"])
+        if options["output"]:
+            with open(options["output"], "w", newline="") as f:
+                f.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
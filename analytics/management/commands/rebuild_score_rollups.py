@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from analytics import rollups
+
+
+class Command(BaseCommand):
+    help = "Reconcile the per-group score rollups with the quiz responses"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report groups whose rollup has drifted; do not write",
+        )
+
+    def handle(self, *args, **options):
+        drifted = rollups.find_drift()
+        if options["check"]:
+            if drifted:
+                groups = ", ".join(str(group) for group in drifted)
+                self.stdout.write(self.style.WARNING(f"Drift in groups: {groups}"))
+            else:
+                self.stdout.write(self.style.SUCCESS("Rollups are consistent"))
+            return
+
+        rebuilt = rollups.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt {len(rebuilt)} rollups ({len(drifted)} had drifted)"
+            )
+        )
@@ -0,0 +1,69 @@
+# Generated by Django 5.0.2 on 2026-10-18 13:13
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_rollups(apps, schema_editor):
+    """
+    Build the score rollups from existing quiz responses
+    """
+    QuizResponse = apps.get_model("study", "QuizResponse")
+    ScoreRollup = apps.get_model("analytics", "ScoreRollup")
+
+    rollups = {}
+    rows = (
+        QuizResponse.objects.values_list("participant__treatment_group", "score")
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+    for treatment_group, score, n in rows:
+        rollup = rollups.setdefault(
+            treatment_group, ScoreRollup(treatment_group=treatment_group)
+        )
+        setattr(rollup, f"score_{score}", n)
+        rollup.count += n
+        rollup.score_sum += n * score
+        rollup.score_sum_squares += n * score * score
+    ScoreRollup.objects.bulk_create(rollups.values())
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = [
+        ("study", "0007_leaderboardentry"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScoreRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("treatment_group", models.IntegerField(unique=True)),
+                ("count", models.BigIntegerField(default=0)),
+                ("score_sum", models.BigIntegerField(default=0)),
+                ("score_sum_squares", models.BigIntegerField(default=0)),
+                ("score_0", models.BigIntegerField(default=0)),
+                ("score_1", models.BigIntegerField(default=0)),
+                ("score_2", models.BigIntegerField(default=0)),
+                ("score_3", models.BigIntegerField(default=0)),
+                ("score_4", models.BigIntegerField(default=0)),
+                ("score_5", models.BigIntegerField(default=0)),
+                ("score_6", models.BigIntegerField(default=0)),
+                ("score_7", models.BigIntegerField(default=0)),
+                ("score_8", models.BigIntegerField(default=0)),
+                ("score_9", models.BigIntegerField(default=0)),
+                ("score_10", models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
@@ -1 +1,37 @@
-# Create your models here.
+from django.db import models
+
+MAX_SCORE = 10
+
+
+class ScoreRollup(models.Model):
+    """
+    Sufficient statistics of quiz scores for one treatment group.
+
+    Kept current by the QuizResponse signal handlers in analytics.signals, so
+    the dashboard reads one row per group instead of scanning every response.
+    """
+
+    treatment_group = models.IntegerField(unique=True)
+    count = models.BigIntegerField(default=0)
+    score_sum = models.BigIntegerField(default=0)
+    score_sum_squares = models.BigIntegerField(default=0)
+    score_0 = models.BigIntegerField(default=0)
+    score_1 = models.BigIntegerField(default=0)
+    score_2 = models.BigIntegerField(default=0)
+    score_3 = models.BigIntegerField(default=0)
+    score_4 = models.BigIntegerField(default=0)
+    score_5 = models.BigIntegerField(default=0)
+    score_6 = models.BigIntegerField(default=0)
+    score_7 = models.BigIntegerField(default=0)
+    score_8 = models.BigIntegerField(default=0)
+    score_9 = models.BigIntegerField(default=0)
+    score_10 = models.BigIntegerField(default=0)
+
+    HISTOGRAM_FIELDS = [f"score_{score}" for score in range(MAX_SCORE + 1)]
+
+    @property
+    def histogram(self):
+        return [getattr(self, field) for field in self.HISTOGRAM_FIELDS]
+
+    def __str__(self):
+        return f"Group {self.treatment_group} - {self.count} responses"
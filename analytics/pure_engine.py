@@ -0,0 +1,256 @@
+"""
+Pure-Python statistics over per-group score histograms.
+
+Same interface and results as analytics.engine for the figures of the
+statistics page (describe() and compare_groups()), without NumPy or SciPy.
+Histograms have 11 bins, so plain loops are as fast as array code here, and
+Student's t distribution comes from the regularized incomplete beta
+function (Numerical Recipes' continued fraction) instead of scipy.stats.
+"""
+
+import math
+
+MAX_SCORE = 10
+SCORES = range(MAX_SCORE + 1)
+
+# Continued fraction and quantile search tolerances
+EPSILON = 1e-15
+MAX_ITERATIONS = 10_000
+
+
+def moments(counts):
+    """
+    Return (n, mean, sample variance) of one histogram, nan where undefined
+    """
+    n = sum(counts)
+    total = sum(c * s for c, s in zip(counts, SCORES))
+    total_squares = sum(c * s * s for c, s in zip(counts, SCORES))
+    if n == 0:
+        return 0, math.nan, math.nan
+    if n == 1:
+        return 1, total / n, 0.0
+    # Integer numerator, so no cancellation error
+    return n, total / n, (n * total_squares - total * total) / (n * (n - 1))
+
+
+def percentiles(counts, q):
+    """
+    Percentiles matching numpy's default linear interpolation on the raw data
+    """
+    cumulative = []
+    running = 0
+    for c in counts:
+        running += c
+        cumulative.append(running)
+    n = running
+    if n == 0:
+        return [math.nan for _ in q]
+
+    def value_at(rank):
+        # The score holding the rank-th smallest observation (0-based)
+        return sum(1 for c in cumulative if c <= rank)
+
+    result = []
+    for percent in q:
+        position = (n - 1) * percent / 100.0
+        lower = math.floor(position)
+        below = value_at(lower)
+        above = value_at(min(lower + 1, n - 1))
+        result.append(below + (position - lower) * (above - below))
+    return result
+
+
+def describe(counts):
+    """
+    Summary statistics for one histogram, as a dict of floats
+    """
+    counts = [int(c) for c in counts]
+    n, mean, variance = moments(counts)
+    present = [score for score, c in zip(SCORES, counts) if c]
+    q1, median, q3 = percentiles(counts, [25, 50, 75])
+    return {
+        "count": n,
+        "mean": mean,
+        "std": math.sqrt(variance) if n else math.nan,
+        "std_population": math.sqrt(variance * (n - 1) / n) if n else math.nan,
+        "min": float(present[0]) if n else math.nan,
+        "max": float(present[-1]) if n else math.nan,
+        "q1": q1,
+        "median": median,
+        "q3": q3,
+        "distribution": counts,
+    }
+
+
+def _beta_fraction(a, b, x):
+    """
+    Continued fraction of the incomplete beta function (modified Lentz)
+    """
+    tiny = 1e-300
+    c = 1.0
+    d = 1.0 - (a + b) * x / (a + 1)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    result = d
+    for m in range(1, MAX_ITERATIONS + 1):
+        for numerator in (
+            m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+            -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1)),
+        ):
+            d = 1.0 + numerator * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            result *= c * d
+        if abs(c * d - 1.0) < EPSILON:
+            return result
+    raise ArithmeticError(f"Incomplete beta did not converge for a={a}, b={b}")
+
+
+def _stirling_correction(x):
+    """
+    lgamma(x) minus Stirling's approximation, for x >= 10
+    """
+    # Terms of the asymptotic series up to x**-11, below 1e-13 at x = 10
+    coefficients = (1 / 12, -1 / 360, 1 / 1260, -1 / 1680, 1 / 1188, -691 / 360360)
+    inverse_squared = 1.0 / (x * x)
+    total = 0.0
+    for coefficient in reversed(coefficients):
+        total = total * inverse_squared + coefficient
+    return total / x
+
+
+def _log_beta(a, b):
+    """
+    log B(a, b). Subtracting lgamma() values of a large argument loses
+    precision (t-tests have a = df / 2), so the two large terms are taken
+    together with Stirling's formula.
+    """
+    small, large = sorted((a, b))
+    if large < 10:
+        return math.lgamma(a) + math.lgamma(b) - math.lgamma(a + b)
+    # lgamma(large + small) - lgamma(large)
+    ratio = (
+        (large - 0.5) * math.log1p(small / large)
+        + small * math.log(large + small)
+        - small
+        + _stirling_correction(large + small)
+        - _stirling_correction(large)
+    )
+    return math.lgamma(small) - ratio
+
+
+def incomplete_beta(a, b, x, y=None):
+    """
+    Regularized incomplete beta function I_x(a, b); pass y = 1 - x when it
+    can be computed more precisely than by the subtraction
+    """
+    if y is None:
+        y = 1.0 - x
+    if x <= 0:
+        return 0.0
+    if y <= 0:
+        return 1.0
+    log_x = math.log1p(-y) if y < 0.5 else math.log(x)
+    log_y = math.log1p(-x) if x < 0.5 else math.log(y)
+    log_front = a * log_x + b * log_y - _log_beta(a, b)
+    # The fraction converges fast on the side of the mean
+    if x < (a + 1) / (a + b + 2):
+        return math.exp(log_front) * _beta_fraction(a, b, x) / a
+    return 1.0 - math.exp(log_front) * _beta_fraction(b, a, y) / b
+
+
+def t_sf(t, df):
+    """
+    Survival function P(T > t) of Student's t distribution
+    """
+    if math.isnan(t) or math.isnan(df):
+        return math.nan
+    if math.isinf(t):
+        return 0.0 if t > 0 else 1.0
+    tail = 0.5 * incomplete_beta(df / 2, 0.5, df / (df + t * t), t * t / (df + t * t))
+    return tail if t > 0 else 1.0 - tail
+
+
+def t_sf_many(t, df):
+    """
+    t_sf() at each (t, df) pair of two sequences, as a list
+    """
+    return [t_sf(float(x), float(y)) for x, y in zip(t, df)]
+
+
+def t_ppf(p, df):
+    """
+    Quantile of Student's t distribution, by bisection on t_sf()
+    """
+    if not 0 < p < 1:
+        return math.nan if not 0 <= p <= 1 else math.copysign(math.inf, p - 0.5)
+    if p < 0.5:
+        return -t_ppf(1 - p, df)
+    target = 1 - p
+    low, high = 0.0, 1.0
+    while t_sf(high, df) > target:
+        low, high = high, high * 2
+    for _ in range(200):
+        middle = (low + high) / 2
+        if t_sf(middle, df) > target:
+            low = middle
+        else:
+            high = middle
+        if high - low <= EPSILON * high:
+            break
+    return (low + high) / 2
+
+
+def cohens_d(n1, mean1, var1, n2, mean2, var2):
+    """
+    Cohen's d with the pooled standard deviation
+    """
+    pooled = math.sqrt(((n1 - 1) * var1 + (n2 - 1) * var2) / (n1 + n2 - 2))
+    if pooled > 0:
+        return (mean1 - mean2) / pooled
+    # Zero spread: no effect if the means agree, otherwise unbounded
+    return 0.0 if mean1 == mean2 else math.inf
+
+
+def welch_t(n1, mean1, var1, n2, mean2, var2):
+    """
+    Welch's t statistic, degrees of freedom and standard error
+    """
+    a = var1 / n1
+    b = var2 / n2
+    se = math.sqrt(a + b)
+    if se == 0:
+        # As NumPy's division: unbounded unless the means agree
+        t = math.nan if mean1 == mean2 else math.copysign(math.inf, mean1 - mean2)
+        return t, math.nan, 0.0
+    df = (a + b) ** 2 / (a * a / (n1 - 1) + b * b / (n2 - 1))
+    return (mean1 - mean2) / se, df, se
+
+
+def compare_groups(counts1, counts2, alpha=0.05):
+    """
+    One-sided Welch test (group 1 > group 2), Cohen's d and the CI of the
+    mean difference, computed from two histograms
+    """
+    n1, mean1, var1 = moments([int(c) for c in counts1])
+    n2, mean2, var2 = moments([int(c) for c in counts2])
+    if n1 < 2 or n2 < 2:
+        return None
+
+    t, df, se = welch_t(n1, mean1, var1, n2, mean2, var2)
+    if se > 0:
+        p_value = t_sf(t, df)
+        margin = t_ppf(1 - alpha / 2, df) * se
+        difference = mean1 - mean2
+        confidence_interval = (difference - margin, difference + margin)
+    else:
+        p_value = math.nan
+        confidence_interval = (math.nan, math.nan)
+
+    return {
+        "t_statistic": t,
+        "p_value": p_value,
+        "df": df,
+        "cohens_d": cohens_d(n1, mean1, var1, n2, mean2, var2),
+        "confidence_interval": confidence_interval,
+    }
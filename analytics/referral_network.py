@@ -0,0 +1,293 @@
+"""
+Structure of the referral forest formed by Participant.referred_by.
+
+Everything is computed in SQL with recursive CTEs, one query per figure, so
+the cost does not depend on Python loops over participants. Subtree figures
+walk the ancestor closure, whose size is the sum of all depths; referral
+trees are shallow, so that stays linear in the number of participants in
+practice.
+
+Participant.referred_by should never form a cycle, but nothing in the schema
+prevents one; every walk up or down the forest stops after MAX_CHAIN_DEPTH
+levels, so a corrupted row cannot make a query recurse without bound.
+"""
+
+import threading
+
+from django.db import connection
+from django.db.models import Count, Max
+
+from study import versioning
+from study.models import Participant, QuizResponse
+
+PARTICIPANTS = Participant._meta.db_table
+RESPONSES = QuizResponse._meta.db_table
+
+# Far deeper than any real referral chain (bonuses stop at 5 levels)
+MAX_CHAIN_DEPTH = 100
+
+# Depth of every participant below its root (roots have depth 0)
+DEPTHS_CTE = f"""
+    depths(id, depth) AS (
+        SELECT id, 0 FROM {PARTICIPANTS} WHERE referred_by_id IS NULL
+        UNION ALL
+        SELECT p.id, depths.depth + 1
+        FROM {PARTICIPANTS} p
+        JOIN depths ON p.referred_by_id = depths.id
+        WHERE depths.depth < {MAX_CHAIN_DEPTH}
+    )
+"""
+
+# One (descendant, ancestor) row per ancestor of every referred participant
+CLOSURE_CTE = f"""
+    closure(descendant, ancestor, level) AS (
+        SELECT id, referred_by_id, 1
+        FROM {PARTICIPANTS}
+        WHERE referred_by_id IS NOT NULL
+        UNION ALL
+        SELECT closure.descendant, p.referred_by_id, closure.level + 1
+        FROM closure
+        JOIN {PARTICIPANTS} p ON p.id = closure.ancestor
+        WHERE p.referred_by_id IS NOT NULL AND closure.level < {MAX_CHAIN_DEPTH}
+    )
+"""
+
+
+def _fetch(sql, params=()):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def depth_distribution():
+    """
+    Return {depth: number of participants}
+    """
+    rows = _fetch(
+        f"WITH RECURSIVE {DEPTHS_CTE} "
+        "SELECT depth, COUNT(*) FROM depths GROUP BY depth ORDER BY depth"
+    )
+    return dict(rows)
+
+
+def conversion():
+    """
+    Referral funnel totals from a single aggregate query
+    """
+    ((participants, referred, referred_completed, completed, referrers),) = _fetch(
+        f"""
+        SELECT
+            COUNT(*),
+            COUNT(p.referred_by_id),
+            COUNT(CASE WHEN p.referred_by_id IS NOT NULL THEN r.id END),
+            COUNT(r.id),
+            COUNT(CASE WHEN r.id IS NOT NULL AND EXISTS (
+                SELECT 1 FROM {PARTICIPANTS} c WHERE c.referred_by_id = p.id
+            ) THEN 1 END)
+        FROM {PARTICIPANTS} p
+        LEFT JOIN {RESPONSES} r ON r.participant_id = p.id
+        """
+    )
+    return {
+        "participants": participants,
+        "referred": referred,
+        "referred_completed": referred_completed,
+        "completed": completed,
+        "completed_referrers": referrers,
+        # Share of referred participants who went on to finish the quiz
+        "conversion_rate": referred_completed / referred if referred else None,
+        # Share of quiz completers who brought in at least one participant
+        "referrer_rate": referrers / completed if completed else None,
+    }
+
+
+def top_referrers(limit=20, offset=0):
+    """
+    Participants with the largest referral subtrees.
+
+    Each row has the participant's depth, direct referrals, subtree size (all
+    descendants) and how many of those descendants completed the quiz.
+    """
+    rows = _fetch(
+        f"""
+        WITH RECURSIVE {CLOSURE_CTE},
+        subtrees(id, size, completed) AS MATERIALIZED (
+            SELECT closure.ancestor, COUNT(*), COUNT(r.id)
+            FROM closure
+            LEFT JOIN {RESPONSES} r ON r.participant_id = closure.descendant
+            GROUP BY closure.ancestor
+            ORDER BY COUNT(*) DESC, closure.ancestor
+            LIMIT %s OFFSET %s
+        ),
+        path(id, ancestor, level) AS (
+            SELECT id, id, 0 FROM subtrees
+            UNION ALL
+            SELECT path.id, p.referred_by_id, path.level + 1
+            FROM path
+            JOIN {PARTICIPANTS} p ON p.id = path.ancestor
+            WHERE p.referred_by_id IS NOT NULL AND path.level < {MAX_CHAIN_DEPTH}
+        ),
+        depths(id, depth) AS (
+            SELECT id, COUNT(*) - 1 FROM path GROUP BY id
+        )
+        SELECT
+            s.id,
+            p.name,
+            depths.depth,
+            (SELECT COUNT(*) FROM {PARTICIPANTS} c WHERE c.referred_by_id = s.id),
+            s.size,
+            s.completed
+        FROM subtrees s
+        JOIN depths ON depths.id = s.id
+        JOIN {PARTICIPANTS} p ON p.id = s.id
+        ORDER BY s.size DESC, s.id
+        """,
+        [limit, offset],
+    )
+    return [
+        {
+            "participant_id": participant_id,
+            "name": name,
+            "depth": depth,
+            "direct_referrals": direct,
+            "subtree_size": size,
+            "completed_descendants": completed,
+        }
+        for participant_id, name, depth, direct, size, completed in rows
+    ]
+
+
+def participant_stats(participant_id):
+    """
+    Depth, subtree size and completed descendants of one participant, or
+    None if there is no such participant
+    """
+    rows = _fetch(
+        f"""
+        WITH RECURSIVE
+        ancestors(id, level) AS (
+            SELECT referred_by_id, 1 FROM {PARTICIPANTS}
+            WHERE id = %s AND referred_by_id IS NOT NULL
+            UNION ALL
+            SELECT p.referred_by_id, ancestors.level + 1
+            FROM {PARTICIPANTS} p
+            JOIN ancestors ON p.id = ancestors.id
+            WHERE p.referred_by_id IS NOT NULL
+                AND ancestors.level < {MAX_CHAIN_DEPTH}
+        ),
+        subtree(id, level) AS MATERIALIZED (
+            SELECT id, 1 FROM {PARTICIPANTS} WHERE referred_by_id = %s
+            UNION ALL
+            SELECT p.id, subtree.level + 1
+            FROM {PARTICIPANTS} p
+            JOIN subtree ON p.referred_by_id = subtree.id
+            WHERE subtree.level < {MAX_CHAIN_DEPTH}
+        )
+        SELECT
+            p.id,
+            p.name,
+            (SELECT COUNT(*) FROM ancestors),
+            (SELECT COUNT(*) FROM {PARTICIPANTS} c WHERE c.referred_by_id = p.id),
+            (SELECT COUNT(*) FROM subtree),
+            (SELECT COUNT(r.id) FROM subtree
+             JOIN {RESPONSES} r ON r.participant_id = subtree.id)
+        FROM {PARTICIPANTS} p
+        WHERE p.id = %s
+        """,
+        [participant_id, participant_id, participant_id],
+    )
+    if not rows:
+        return None
+    participant_id, name, depth, direct, size, completed = rows[0]
+    return {
+        "participant_id": participant_id,
+        "name": name,
+        "depth": depth,
+        "direct_referrals": direct,
+        "subtree_size": size,
+        "completed_descendants": completed,
+    }
+
+
+def largest_chains(limit=5):
+    """
+    The longest referral chains, root first, each ending at a different
+    participant who has not referred anyone
+    """
+    rows = _fetch(
+        f"""
+        WITH RECURSIVE {DEPTHS_CTE},
+        leaves(id, depth) AS MATERIALIZED (
+            SELECT id, depth FROM depths
+            WHERE depth > 0 AND NOT EXISTS (
+                SELECT 1 FROM {PARTICIPANTS} c WHERE c.referred_by_id = depths.id
+            )
+            ORDER BY depth DESC, id
+            LIMIT %s
+        ),
+        chains(leaf, id, level) AS (
+            SELECT id, id, 0 FROM leaves
+            UNION ALL
+            SELECT chains.leaf, p.referred_by_id, chains.level + 1
+            FROM chains
+            JOIN {PARTICIPANTS} p ON p.id = chains.id
+            WHERE p.referred_by_id IS NOT NULL AND chains.level < {MAX_CHAIN_DEPTH}
+        )
+        SELECT chains.leaf, chains.id, p.name
+        FROM chains
+        JOIN leaves ON leaves.id = chains.leaf
+        JOIN {PARTICIPANTS} p ON p.id = chains.id
+        ORDER BY leaves.depth DESC, chains.leaf, chains.level DESC
+        """,
+        [limit],
+    )
+    chains = {}
+    for leaf, participant_id, name in rows:
+        chains.setdefault(leaf, []).append(
+            {"participant_id": participant_id, "name": name}
+        )
+    return [
+        {"length": len(chain) - 1, "participants": chain} for chain in chains.values()
+    ]
+
+
+_summary_lock = threading.Lock()
+_summary = (None, None)
+
+
+def network_summary(top=20, chains=5):
+    """
+    Everything the referral network page shows, in five queries
+    """
+    depths = depth_distribution()
+    return {
+        **conversion(),
+        "roots": depths.get(0, 0),
+        "max_depth": max(depths, default=0),
+        "depth_distribution": depths,
+        "top_referrers": top_referrers(top),
+        "largest_chains": largest_chains(chains),
+    }
+
+
+def cached_network_summary():
+    """
+    network_summary() with the default sizes, recomputed only after a change.
+
+    Completions and invalidations bump the leaderboard version; registrations
+    change the participant count and highest id.
+    """
+    global _summary
+    key = (
+        versioning.current(versioning.LEADERBOARD)[0],
+        *Participant.objects.aggregate(Count("id"), Max("id")).values(),
+    )
+    cached_key, summary = _summary
+    if cached_key == key:
+        return summary
+    with _summary_lock:
+        cached_key, summary = _summary
+        if cached_key != key:
+            summary = network_summary()
+            _summary = (key, summary)
+        return summary
@@ -0,0 +1,152 @@
+"""
+Bootstrap and permutation inference for the speed comparison.
+
+Like the rest of the engine, resampling works on the 11-bin score
+histograms. A bootstrap resample of a group is a multinomial draw over its
+histogram, and a permutation of the pooled responses assigns group 1 a
+multivariate hypergeometric draw from the pooled histogram. Each batch of
+resamples is therefore one (batch, 11) array, whatever the number of
+responses.
+"""
+
+import threading
+import time
+
+import numpy as np
+
+from .engine import SCORES, cohens_d, moments
+
+DEFAULT_RESAMPLES = 100_000
+DEFAULT_SEED = 0
+
+# Resamples drawn per NumPy call, which bounds memory
+BATCH_SIZE = 50_000
+
+
+def _batches(resamples):
+    for start in range(0, resamples, BATCH_SIZE):
+        yield min(BATCH_SIZE, resamples - start)
+
+
+def bootstrap(counts1, counts2, resamples=DEFAULT_RESAMPLES, alpha=0.05, seed=0):
+    """
+    Percentile bootstrap CIs for the mean difference (group 1 - group 2) and
+    Cohen's d, resampling each group within itself
+    """
+    counts1 = np.asarray(counts1, dtype=np.int64)
+    counts2 = np.asarray(counts2, dtype=np.int64)
+    n1, n2 = int(counts1.sum()), int(counts2.sum())
+    rng = np.random.default_rng(seed)
+
+    differences = []
+    effect_sizes = []
+    for size in _batches(resamples):
+        sample1 = rng.multinomial(n1, counts1 / n1, size=size)
+        sample2 = rng.multinomial(n2, counts2 / n2, size=size)
+        _, mean1, var1 = moments(sample1)
+        _, mean2, var2 = moments(sample2)
+        differences.append(mean1 - mean2)
+        effect_sizes.append(cohens_d(n1, mean1, var1, n2, mean2, var2))
+
+    tails = [100 * alpha / 2, 100 * (1 - alpha / 2)]
+    difference_ci = np.percentile(np.concatenate(differences), tails)
+    # Resamples without spread have an unbounded d; they sort to the ends,
+    # and a tail between two infinite values is undefined
+    with np.errstate(invalid="ignore"):
+        d_ci = np.percentile(np.concatenate(effect_sizes), tails)
+    return {
+        "difference_ci": tuple(float(x) for x in difference_ci),
+        "cohens_d_ci": tuple(float(x) for x in d_ci),
+    }
+
+
+def permutation_test(counts1, counts2, resamples=DEFAULT_RESAMPLES, seed=0):
+    """
+    Monte Carlo permutation p-values for the mean difference: one-sided
+    (group 1 higher) and two-sided (difference at least as large either way).
+
+    With the pooled scores fixed, the mean difference only grows with group
+    1's score total, so resamples are compared on that integer total and ties
+    are counted exactly. The p-values include the observed split, so they are
+    never 0.
+    """
+    counts1 = np.asarray(counts1, dtype=np.int64)
+    counts2 = np.asarray(counts2, dtype=np.int64)
+    pooled = counts1 + counts2
+    n1, n = int(counts1.sum()), int(pooled.sum())
+    scores = SCORES.astype(np.int64)
+    observed = int(counts1 @ scores)
+    # Group 1 total at the same distance from the null expectation, other side
+    mirrored = 2 * (pooled @ scores) * n1 / n - observed
+    rng = np.random.default_rng(seed)
+
+    greater = 0
+    extreme = 0
+    for size in _batches(resamples):
+        totals = rng.multivariate_hypergeometric(pooled, n1, size=size) @ scores
+        greater += int((totals >= observed).sum())
+        extreme += int(
+            (
+                (totals >= max(observed, mirrored))
+                | (totals <= min(observed, mirrored))
+            ).sum()
+        )
+    return {
+        "p_value": (greater + 1) / (resamples + 1),
+        "p_value_two_sided": (extreme + 1) / (resamples + 1),
+        "resamples": resamples,
+    }
+
+
+def resampled_comparison(counts1, counts2, resamples=DEFAULT_RESAMPLES, alpha=0.05):
+    """
+    Bootstrap CIs and permutation p-values for two histograms, or None if a
+    group has fewer than two responses
+    """
+    if np.sum(counts1) < 2 or np.sum(counts2) < 2:
+        return None
+    return {
+        **bootstrap(counts1, counts2, resamples, alpha, seed=DEFAULT_SEED),
+        **permutation_test(counts1, counts2, resamples, seed=DEFAULT_SEED),
+        "responses": int(np.sum(counts1) + np.sum(counts2)),
+    }
+
+
+_lock = threading.Lock()
+# (settings, data version, monotonic time computed, result)
+_cached = (None, None, None, None)
+
+
+def reusable_comparison(version, resamples=DEFAULT_RESAMPLES, alpha=0.05, max_age=0):
+    """
+    (data version, result) of the cached comparison if it may be served for
+    `version`, else None.
+
+    A result less than `max_age` seconds old is reused for newer versions
+    too, so a steady stream of submissions does not make every page view
+    resample again. Pages serving it must say which version it is for.
+    """
+    key, cached_version, computed_at, result = _cached
+    if key != (resamples, alpha):
+        return None
+    if cached_version == version or time.monotonic() - computed_at < max_age:
+        return cached_version, result
+    return None
+
+
+def cached_comparison(
+    version, counts1, counts2, resamples=DEFAULT_RESAMPLES, alpha=0.05
+):
+    """
+    resampled_comparison() computed once per statistics data version. The
+    seed is fixed, so every worker shows the same figures for a version.
+    """
+    global _cached
+    key = (resamples, alpha)
+    if _cached[:2] == (key, version):
+        return _cached[3]
+    with _lock:
+        if _cached[:2] != (key, version):
+            result = resampled_comparison(counts1, counts2, resamples, alpha)
+            _cached = (key, version, time.monotonic(), result)
+        return _cached[3]
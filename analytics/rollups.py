@@ -0,0 +1,98 @@
+"""
+Maintenance of the per-group ScoreRollup rows.
+"""
+
+from django.db import transaction
+from django.db.models import F
+
+from study import versioning
+
+from .models import ScoreRollup
+
+
+def record_score(treatment_group, score, delta=1):
+    """
+    Add (delta=1) or remove (delta=-1) one score from its group's rollup
+    """
+    changes = {
+        "count": F("count") + delta,
+        "score_sum": F("score_sum") + delta * score,
+        "score_sum_squares": F("score_sum_squares") + delta * score * score,
+        f"score_{score}": F(f"score_{score}") + delta,
+    }
+    with transaction.atomic():
+        rollups = ScoreRollup.objects.filter(treatment_group=treatment_group)
+        if not rollups.update(**changes):
+            ScoreRollup.objects.get_or_create(treatment_group=treatment_group)
+            rollups.update(**changes)
+        versioning.bump(versioning.STATISTICS)
+
+
+def stored_histograms():
+    """
+    Return {treatment_group: counts} from the rollup table, one row per group
+    """
+    return {
+        rollup.treatment_group: list(rollup.histogram)
+        for rollup in ScoreRollup.objects.order_by("treatment_group")
+        if rollup.count > 0
+    }
+
+
+def expected_rollups():
+    """
+    Build unsaved ScoreRollup rows from a full scan of the responses
+    """
+    # Not imported at module level: rollups are recorded by a signal handler
+    # in every worker, and the engine imports NumPy
+    from .engine import score_histograms
+
+    rollups = []
+    for treatment_group, counts in score_histograms().items():
+        rollup = ScoreRollup(treatment_group=treatment_group)
+        for score, n in enumerate(counts.tolist()):
+            setattr(rollup, f"score_{score}", n)
+            rollup.count += n
+            rollup.score_sum += n * score
+            rollup.score_sum_squares += n * score * score
+        rollups.append(rollup)
+    return rollups
+
+
+def _values(rollup):
+    return (
+        rollup.count,
+        rollup.score_sum,
+        rollup.score_sum_squares,
+        *rollup.histogram,
+    )
+
+
+def find_drift():
+    """
+    Return the treatment groups whose stored rollup differs from the data
+    """
+    expected = {
+        rollup.treatment_group: _values(rollup) for rollup in expected_rollups()
+    }
+    stored = {
+        rollup.treatment_group: _values(rollup) for rollup in ScoreRollup.objects.all()
+    }
+    empty = _values(ScoreRollup())
+    return sorted(
+        group
+        for group in expected.keys() | stored.keys()
+        if expected.get(group, empty) != stored.get(group, empty)
+    )
+
+
+def rebuild():
+    """
+    Replace all rollups with values recomputed from the responses
+    """
+    with transaction.atomic():
+        rollups = expected_rollups()
+        ScoreRollup.objects.all().delete()
+        ScoreRollup.objects.bulk_create(rollups)
+        versioning.bump(versioning.STATISTICS)
+    return rollups
@@ -0,0 +1,100 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from study.models import Participant, QuizResponse
+
+from .rollups import record_score
+
+
+def _stored_bin(instance):
+    """
+    (participant id, treatment group, score) of the stored row, or None
+    """
+    if instance.pk is None:
+        return None
+    return (
+        QuizResponse.objects.filter(pk=instance.pk)
+        .values_list("participant_id", "participant__treatment_group", "score")
+        .first()
+    )
+
+
+def _treatment_group(instance):
+    if QuizResponse.participant.is_cached(instance):
+        return instance.participant.treatment_group
+    return Participant.objects.values_list("treatment_group", flat=True).get(
+        pk=instance.participant_id
+    )
+
+
+def _stored_group(instance):
+    """
+    (treatment group, quiz score or None) of the stored participant, or None
+    """
+    if instance.pk is None:
+        return None
+    return (
+        Participant.objects.filter(pk=instance.pk)
+        .values_list("treatment_group", "quizresponse__score")
+        .first()
+    )
+
+
+@receiver(pre_save, sender=QuizResponse)
+def remember_rollup_bin(sender, instance, raw=False, **kwargs):
+    # An update may change the score or the participant, so note which bin
+    # the response is counted in before it is written
+    instance._rollup_bin = None if raw else _stored_bin(instance)
+
+
+@receiver(post_save, sender=QuizResponse)
+def add_to_rollup(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, "_rollup_bin", None)
+    if previous is not None:
+        participant_id, treatment_group, score = previous
+        if (participant_id, score) == (instance.participant_id, instance.score):
+            return
+        record_score(treatment_group, score, -1)
+    record_score(_treatment_group(instance), instance.score, 1)
+
+
+@receiver(pre_delete, sender=QuizResponse)
+def remember_deleted_bin(sender, instance, **kwargs):
+    # Also runs for the cascade when a Participant is deleted: every
+    # pre_delete is sent before any row is removed, so the group can still
+    # be read in the same query as the stored score
+    instance._rollup_bin = _stored_bin(instance)
+
+
+@receiver(post_delete, sender=QuizResponse)
+def remove_from_rollup(sender, instance, **kwargs):
+    previous = getattr(instance, "_rollup_bin", None)
+    if previous is not None:
+        _, treatment_group, score = previous
+        record_score(treatment_group, score, -1)
+
+
+@receiver(pre_save, sender=Participant)
+def remember_participant_group(
+    sender, instance, raw=False, update_fields=None, **kwargs
+):
+    # Changing a participant's group (in the admin) moves their score from
+    # one group's rollup to the other's
+    if raw or (update_fields is not None and "treatment_group" not in update_fields):
+        instance._rollup_group = None
+    else:
+        instance._rollup_group = _stored_group(instance)
+
+
+@receiver(post_save, sender=Participant)
+def move_between_rollups(sender, instance, raw=False, **kwargs):
+    previous = getattr(instance, "_rollup_group", None)
+    if raw or previous is None:
+        return
+    treatment_group, score = previous
+    if score is None or treatment_group == instance.treatment_group:
+        return
+    record_score(treatment_group, score, -1)
+    record_score(instance.treatment_group, score, 1)
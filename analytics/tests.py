@@ -1 +1,285 @@
-# Create your tests here.
+import math
+import random
+import sys
+import warnings
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from study.models import Participant
+from study.referrals import submit_quiz
+
+from . import engine, export, pure_engine, rollups
+from .models import ScoreRollup
+
+
+def histograms():
+    """
+    Score histograms covering the edge cases and a spread of random shapes
+    """
+    yield [0] * 11
+    yield [0] * 5 + [1] + [0] * 5
+    yield [0] * 7 + [40] + [0] * 3
+    yield [3] + [0] * 9 + [4]
+    rng = random.Random(0)
+    for size in (2, 5, 30, 500, 20_000):
+        counts = [0] * 11
+        for _ in range(size):
+            counts[min(10, int(rng.betavariate(5, 3) * 11))] += 1
+        yield counts
+
+
+class EngineParityTests(SimpleTestCase):
+    """
+    The pure-Python backend gives the NumPy/SciPy figures
+    """
+
+    def assertSameFigure(self, expected, actual, label):
+        expected, actual = float(expected), float(actual)
+        if math.isnan(expected):
+            self.assertTrue(math.isnan(actual), f"{label}: {actual} is not nan")
+        elif math.isinf(expected):
+            self.assertEqual(expected, actual, label)
+        else:
+            self.assertTrue(
+                math.isclose(expected, actual, rel_tol=1e-9, abs_tol=1e-12),
+                f"{label}: {actual} != {expected}",
+            )
+
+    def test_describe(self):
+        for counts in histograms():
+            expected = engine.describe(counts)
+            actual = pure_engine.describe(counts)
+            self.assertEqual(expected.keys(), actual.keys())
+            self.assertEqual(expected["count"], actual["count"])
+            self.assertEqual(expected["distribution"], actual["distribution"])
+            for key in expected.keys() - {"count", "distribution"}:
+                self.assertSameFigure(expected[key], actual[key], f"{counts} {key}")
+
+    def test_compare_groups(self):
+        groups = list(histograms())
+        for counts1 in groups:
+            for counts2 in groups:
+                for alpha in (0.05, 0.01):
+                    expected = engine.compare_groups(counts1, counts2, alpha)
+                    actual = pure_engine.compare_groups(counts1, counts2, alpha)
+                    label = f"{counts1} vs {counts2} at {alpha}"
+                    if expected is None:
+                        self.assertIsNone(actual, label)
+                        continue
+                    self.assertEqual(expected.keys(), actual.keys())
+                    for key in ("t_statistic", "p_value", "df", "cohens_d"):
+                        self.assertSameFigure(
+                            expected[key], actual[key], f"{label} {key}"
+                        )
+                    for bound, (low, high) in enumerate(
+                        zip(
+                            expected["confidence_interval"],
+                            actual["confidence_interval"],
+                        )
+                    ):
+                        self.assertSameFigure(low, high, f"{label} CI {bound}")
+
+    def test_t_distribution(self):
+        from scipy import stats
+
+        for df in (1, 2.5, 10, 137.2, 5000):
+            for t in (-8, -1.5, 0, 0.3, 2, 12):
+                self.assertSameFigure(
+                    stats.t.sf(t, df), pure_engine.t_sf(t, df), f"sf({t}, {df})"
+                )
+            for p in (0.005, 0.025, 0.5, 0.975, 0.995):
+                self.assertSameFigure(
+                    stats.t.ppf(p, df), pure_engine.t_ppf(p, df), f"ppf({p}, {df})"
+                )
+
+
+class RollupTests(TestCase):
+    def assertMatchesRebuild(self):
+        stored = {
+            rollup.treatment_group: rollup.histogram
+            for rollup in ScoreRollup.objects.filter(count__gt=0)
+        }
+        self.assertEqual(rollups.find_drift(), [])
+        rollups.rebuild()
+        self.assertEqual(
+            {
+                rollup.treatment_group: rollup.histogram
+                for rollup in ScoreRollup.objects.all()
+            },
+            stored,
+        )
+
+    def participant(self, i, treatment_group):
+        return Participant.objects.create(
+            name=f"p{i}", email=f"p{i}@example.com", treatment_group=treatment_group
+        )
+
+    def test_incremental_matches_rebuild(self):
+        rng = random.Random(7)
+        responses = [
+            submit_quiz(self.participant(i, 1 + i % 2), rng.randint(0, 10))[0]
+            for i in range(12)
+        ]
+        self.assertMatchesRebuild()
+
+        for response in responses[:4]:
+            response.score = (response.score + 3) % 11
+            response.save()
+        # Moving a response to a participant of the other group
+        moved = responses[4]
+        moved.participant = self.participant(99, 3 - moved.participant.treatment_group)
+        moved.save()
+        self.assertMatchesRebuild()
+
+        responses[5].delete()
+        # Deleting a participant cascades to their response
+        responses[6].participant.delete()
+        self.assertMatchesRebuild()
+
+    def test_treatment_group_edited_in_admin(self):
+        staff = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        self.client.force_login(staff)
+        participant = self.participant(0, 1)
+        submit_quiz(participant, 7)
+        submit_quiz(self.participant(1, 2), 4)
+
+        response = self.client.post(
+            f"/admin/study/participant/{participant.pk}/change/",
+            {
+                "name": participant.name,
+                "email": participant.email,
+                "treatment_group": 2,
+                "referral_code": participant.referral_code,
+                "referred_by": "",
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        participant.refresh_from_db()
+        self.assertEqual(participant.treatment_group, 2)
+        self.assertEqual(rollups.stored_histograms().keys(), {2})
+        self.assertMatchesRebuild()
+
+        # Saving other fields, or a participant without a quiz, moves nothing
+        participant.name = "renamed"
+        participant.save(update_fields=["name"])
+        self.participant(2, 1).save()
+        self.assertMatchesRebuild()
+
+
+@override_settings(STATISTICS_BACKEND="python", STATISTICS_RESAMPLES=0)
+class WithoutSciPyTests(TestCase):
+    """
+    The statistics page and the trajectory work with the python backend on
+    a worker without SciPy, and the page still renders without NumPy
+    """
+
+    # Imported again under the blocked imports, rather than reused
+    NUMPY_USERS = (
+        "analytics.engine",
+        "analytics.items",
+        "analytics.resampling",
+        "analytics.trajectory",
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(4)
+        for i in range(30):
+            participant = Participant.objects.create(
+                name=f"p{i}", email=f"p{i}@example.com", treatment_group=1 + i % 2
+            )
+            submit_quiz(participant, rng.randint(3, 10))
+
+    def block(self, *packages):
+        patcher = mock.patch.dict(sys.modules)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        for name in list(sys.modules):
+            if name.split(".")[0] in packages or name in self.NUMPY_USERS:
+                del sys.modules[name]
+        for package in packages:
+            # None makes any import of the package raise ImportError
+            sys.modules[package] = None
+
+    def test_without_scipy(self):
+        with override_settings(STATISTICS_BACKEND="scipy"):
+            expected = self.client.get("/analytics/trajectory/api/").json()
+
+        self.block("scipy")
+        response = self.client.get("/analytics/")
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "trajectoryChart")
+
+        response = self.client.get("/analytics/trajectory/api/?resolution=submission")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["p_value"]), 30)
+        actual = self.client.get("/analytics/trajectory/api/").json()
+        self.assertEqual(actual.keys(), expected.keys())
+        for key, values in expected.items():
+            if key == "p_value":
+                for p, q in zip(values, actual[key]):
+                    self.assertTrue(
+                        p == q or math.isclose(p, q, abs_tol=1e-6), f"{p} != {q}"
+                    )
+            else:
+                self.assertEqual(values, actual[key], key)
+        self.assertNotIn("scipy.stats", sys.modules)
+
+    def test_without_numpy(self):
+        self.block("numpy", "scipy")
+        response = self.client.get("/analytics/")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, "trajectoryChart")
+        self.assertEqual(self.client.get("/analytics/trajectory/api/").status_code, 501)
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        for i in range(7):
+            participant = Participant.objects.create(
+                name=f"p{i}", email=f"p{i}@example.com", treatment_group=1 + i % 2
+            )
+            if i % 3:
+                submit_quiz(participant, i)
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+        self.async_client.force_login(self.staff)
+
+    def test_async_iterator_matches(self):
+        for export_format in export.EXPORT_FORMATS:
+            expected = list(export.iter_export(export_format, chunk_size=3))
+
+            async def collect():
+                return [
+                    fragment
+                    async for fragment in export.aiter_export(
+                        export_format, chunk_size=3
+                    )
+                ]
+
+            with self.assertNumQueries(4):
+                self.assertEqual(async_to_sync(collect)(), expected)
+            self.assertEqual(len(expected), 7 + (export_format == "csv"))
+
+    async def test_streams_asynchronously_under_asgi(self):
+        sync_body = await self.sync_export()
+        with warnings.catch_warnings():
+            # Django warns when it has to drain a sync iterator under ASGI
+            warnings.filterwarnings(
+                "error", message="StreamingHttpResponse must consume synchronous"
+            )
+            response = await self.async_client.get("/analytics/export/?format=csv")
+            self.assertTrue(response.is_async)
+            body = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(body, sync_body)
+
+    async def sync_export(self):
+        response = await sync_to_async(self.client.get)("/analytics/export/?format=csv")
+        self.assertFalse(response.is_async)
+        return await sync_to_async(b"".join)(response.streaming_content)
@@ -0,0 +1,180 @@
+"""
+How the speed comparison evolved over the course of the study.
+
+Responses are read once in submission order. Running counts, score sums and
+sums of squares per group (np.cumsum) give every group's mean and variance
+after each submission, and from those the Welch test and Cohen's d for the
+whole trajectory at once. Sums stay integers, so the running figures are
+exact however long the study runs.
+
+NumPy is imported on first use, and the p-values come from the configured
+statistics backend, so the trajectory does not need SciPy; available()
+tells whether it can be computed at all.
+"""
+
+import threading
+import time
+from importlib.util import find_spec
+
+from django.db import connection
+
+from study.models import Participant, QuizResponse
+
+from .backends import get_backend
+
+PARTICIPANTS = Participant._meta.db_table
+RESPONSES = QuizResponse._meta.db_table
+
+# Point spacing: one point per submission, or the state at the end of each
+# hour or day (UTC) that had submissions
+RESOLUTIONS = {"submission": None, "hour": "h", "day": "D"}
+
+
+def available():
+    """
+    Whether NumPy, which the trajectory is computed with, is installed
+    """
+    return find_spec("numpy") is not None
+
+
+def load_submissions():
+    """
+    Return (submitted_at, treatment group, score) arrays in submission order
+    """
+    import numpy as np
+
+    with connection.cursor() as cursor:
+        # Concatenation drops the column type, so timestamps come back as
+        # text and skip the per-row datetime converter; NumPy parses them
+        cursor.execute(
+            f"""
+            SELECT r.submitted_at || '', p.treatment_group, r.score
+            FROM {RESPONSES} r
+            JOIN {PARTICIPANTS} p ON p.id = r.participant_id
+            ORDER BY r.submitted_at, r.id
+            """
+        )
+        rows = np.array(cursor.fetchall(), dtype=object).reshape(-1, 3)
+    return (
+        rows[:, 0].astype("datetime64[us]"),
+        rows[:, 1].astype(np.int64),
+        rows[:, 2].astype(np.int64),
+    )
+
+
+def _running(mask, scores):
+    """
+    Running (n, mean, sample variance) of the scores selected by `mask`
+    """
+    import numpy as np
+
+    n = np.cumsum(mask)
+    total = np.cumsum(np.where(mask, scores, 0))
+    total_squares = np.cumsum(np.where(mask, scores * scores, 0))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / n
+        # Integer numerator, so no cancellation error
+        variance = (n * total_squares - total * total) / (n * (n - 1))
+    return n, mean, np.where(n == 1, 0.0, variance)
+
+
+def _floats(values, digits=6):
+    """
+    Rounded list of `values` with None for NaN and infinity, which JSON lacks
+    """
+    import numpy as np
+
+    result = np.round(values, digits).tolist()
+    for i in np.flatnonzero(~np.isfinite(values)).tolist():
+        result[i] = None
+    return result
+
+
+def trajectory(times, groups, scores, resolution="day"):
+    """
+    Running group sizes, means, one-sided Welch test (1x > 2x) and Cohen's d
+    after every submission, or at the end of every hour or day
+    """
+    import numpy as np
+
+    from .engine import cohens_d, welch_t
+
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"resolution must be one of {', '.join(RESOLUTIONS)}")
+    n1, mean1, var1 = _running(groups == 1, scores)
+    n2, mean2, var2 = _running(groups == 2, scores)
+
+    unit = RESOLUTIONS[resolution]
+    if unit is None or not len(times):
+        points = np.arange(len(times))
+    else:
+        buckets = times.astype(f"datetime64[{unit}]")
+        # Last submission of every bucket
+        points = np.flatnonzero(np.append(buckets[1:] != buckets[:-1], True))
+    n1, mean1, var1 = n1[points], mean1[points], var1[points]
+    n2, mean2, var2 = n2[points], mean2[points], var2[points]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t, df, se = welch_t(n1, mean1, var1, n2, mean2, var2)
+        defined = (n1 >= 2) & (n2 >= 2) & (se > 0)
+        t = np.where(defined, t, np.nan)
+        p_value = np.full(len(t), np.nan)
+        p_value[defined] = get_backend().t_sf_many(t[defined], df[defined])
+        d = np.where(
+            (n1 >= 2) & (n2 >= 2), cohens_d(n1, mean1, var1, n2, mean2, var2), np.nan
+        )
+
+    return {
+        "resolution": resolution,
+        "submitted_at": [
+            f"{value}Z" for value in np.datetime_as_string(times[points], unit="s")
+        ],
+        "n1": n1.tolist(),
+        "n2": n2.tolist(),
+        "mean1": _floats(mean1),
+        "mean2": _floats(mean2),
+        "t_statistic": _floats(t),
+        "df": _floats(np.where(defined, df, np.nan)),
+        "p_value": _floats(p_value),
+        "cohens_d": _floats(d),
+    }
+
+
+_lock = threading.Lock()
+# resolution -> (data version, monotonic time computed, result)
+_cached = {}
+
+
+def reusable_trajectory(version, resolution="day", max_age=0):
+    """
+    (data version, result) of the cached trajectory at `resolution` if it
+    may be served for `version`, else None.
+
+    A result less than `max_age` seconds old is reused for newer versions
+    too, so a steady stream of submissions does not make every request
+    reload all responses. Responses serving it must say which version it is
+    for.
+    """
+    cached = _cached.get(resolution)
+    if cached is None:
+        return None
+    cached_version, computed_at, result = cached
+    if cached_version == version or time.monotonic() - computed_at < max_age:
+        return cached_version, result
+    return None
+
+
+def cached_trajectory(version, resolution="day"):
+    """
+    trajectory() of all responses, computed once per statistics data version
+    """
+    cached = _cached.get(resolution)
+    if cached is not None and cached[0] == version:
+        return cached[2]
+    with _lock:
+        cached = _cached.get(resolution)
+        if cached is None or cached[0] != version:
+            result = trajectory(*load_submissions(), resolution=resolution)
+            # One entry per resolution
+            cached = _cached[resolution] = (version, time.monotonic(), result)
+        return cached[2]
@@ -5,4 +5,10 @@ app_name = "analytics"
 
 urlpatterns = [
     path("", views.statistics_view, name="statistics"),
+    path("export/", views.export_view, name="export"),
+    path("referrals/", views.referral_network_view, name="referrals"),
+    path("referrals/api/", views.referral_network_api, name="referrals_api"),
+    path("items/", views.item_analysis_view, name="items"),
+    path("items/api/", views.item_analysis_api, name="items_api"),
+    path("trajectory/api/", views.trajectory_api, name="trajectory_api"),
 ]
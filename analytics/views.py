@@ -1,163 +1,291 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
-from django.db.models import Avg, Count, Min, Max, StdDev
-from study.models import QuizResponse
-from scipy import stats
-import numpy as np
+from study.versioning import STATISTICS, request_version, versioned_page
+from . import referral_network
+from .backends import get_backend
+from .export import EXPORT_FORMATS, aiter_export, iter_export
+from .rollups import stored_histograms
 import logging
-from collections import Counter
+import math
+import sys
+
+# Modules needing NumPy (resampling, trajectory, items) are imported inside
+# the views, so loading the URLconf does not import it; see backends.py
 
 logger = logging.getLogger(__name__)
 
+ALPHA = 0.05
+
+
+def resampling_variant(request, version):
+    """
+    The older data version whose resampling result the statistics page
+    reuses, if any; the result is kept on the request for the view
+    """
+    # Nothing is cached before the view first imports the module, and a 304
+    # should not be what imports NumPy into a worker
+    resampling = sys.modules.get("analytics.resampling")
+    if resampling is None or not settings.STATISTICS_RESAMPLES:
+        return None
+    reused = resampling.reusable_comparison(
+        version,
+        resamples=settings.STATISTICS_RESAMPLES,
+        alpha=ALPHA,
+        max_age=settings.STATISTICS_RESAMPLE_INTERVAL,
+    )
+    if reused is None:
+        return None
+    request._reused_resampling = reused
+    return None if reused[0] == version else f"resampled-{reused[0]}"
 
-def get_score_distribution(scores_list):
-    if not scores_list:
-        return [0] * 11
-    counts = Counter(int(s) for s in scores_list if s is not None)
-    distribution = [counts.get(i, 0) for i in range(11)]
-    return distribution
 
+@versioned_page(STATISTICS, variant=resampling_variant)
 def statistics_view(request):
-    total_responses = QuizResponse.objects.count()
-    all_scores_qs = QuizResponse.objects.values_list("score", flat=True)
-    all_scores = [float(s) for s in all_scores_qs if s is not None]
-
-    if all_scores:
-        average_score = np.mean(all_scores)
-        min_score = np.min(all_scores)
-        max_score = np.max(all_scores)
-        q1_overall = np.percentile(all_scores, 25)
-        median_overall = np.percentile(all_scores, 50)
-        q3_overall = np.percentile(all_scores, 75)
-        std_dev_overall = np.std(all_scores, ddof=1) if len(all_scores) > 1 else (0.0 if len(all_scores) == 1 else np.nan)
-    else:
-        average_score = np.nan
-        min_score = np.nan
-        max_score = np.nan
-        q1_overall = np.nan
-        median_overall = np.nan
-        q3_overall = np.nan
-        std_dev_overall = np.nan
-
-    responses_by_treatment_group = (
-        QuizResponse.objects.values("participant__treatment_group")
-        .annotate(
-            count=Count("id"),
-            avg_score=Avg("score"),
-            min_score=Min("score"),
-            max_score=Max("score"),
-            std_dev_score=StdDev("score"),
+    from . import trajectory
+
+    backend = get_backend()
+    describe = backend.describe
+    # Everything below is derived from the per-group score rollups
+    histograms = stored_histograms()
+    empty = [0] * 11
+    overall = describe([sum(bins) for bins in zip(empty, *histograms.values())])
+    group1 = describe(histograms.get(1, empty))
+    group2 = describe(histograms.get(2, empty))
+
+    responses_by_treatment_group = []
+    for group, counts in histograms.items():
+        group_stats = describe(counts)
+        responses_by_treatment_group.append(
+            {
+                "participant__treatment_group": group,
+                "count": group_stats["count"],
+                "avg_score": group_stats["mean"],
+                "min_score": group_stats["min"],
+                "max_score": group_stats["max"],
+                "std_dev_score": group_stats["std_population"],
+                "q1_score": group_stats["q1"],
+                "median_score": group_stats["median"],
+                "q3_score": group_stats["q3"],
+            }
         )
-        .order_by("participant__treatment_group")
-    )
 
-    for group_stats in responses_by_treatment_group:
-        group_scores_qs = QuizResponse.objects.filter(
-            participant__treatment_group=group_stats["participant__treatment_group"]
-        ).values_list("score", flat=True)
-        group_scores = [float(s) for s in group_scores_qs if s is not None]
-
-        if group_scores:
-            group_stats["q1_score"] = np.percentile(group_scores, 25)
-            group_stats["median_score"] = np.percentile(group_scores, 50)
-            group_stats["q3_score"] = np.percentile(group_scores, 75)
-        else:
-            group_stats["q1_score"] = np.nan
-            group_stats["median_score"] = np.nan
-            group_stats["q3_score"] = np.nan
-
-
-    group1_scores_qs = QuizResponse.objects.filter(
-        participant__treatment_group=1
-    ).values_list("score", flat=True)
-    group2_scores_qs = QuizResponse.objects.filter(
-        participant__treatment_group=2
-    ).values_list("score", flat=True)
-
-    group1_scores = [float(s) for s in group1_scores_qs if s is not None]
-    group2_scores = [float(s) for s in group2_scores_qs if s is not None]
-
-    overall_score_distribution = get_score_distribution(all_scores)
-    group1_score_distribution = get_score_distribution(group1_scores)
-    group2_score_distribution = get_score_distribution(group2_scores)
-
-    t_statistic = None
-    p_value = None
-    df = None
-    cohens_d = None
-    confidence_interval = None
-    alpha = 0.05
-
-    if len(group1_scores) >= 2 and len(group2_scores) >= 2:
-        ttest_result = stats.ttest_ind(
-            group1_scores, group2_scores, equal_var=False, alternative="greater"
+    alpha = ALPHA
+    comparison = backend.compare_groups(
+        histograms.get(1, empty), histograms.get(2, empty), alpha=alpha
+    ) or {
+        "t_statistic": None,
+        "p_value": None,
+        "df": None,
+        "cohens_d": None,
+        "confidence_interval": None,
+    }
+    # Bounded scores and uneven groups: back the t-test with resampling
+    resampled = None
+    if hasattr(request, "_reused_resampling"):
+        # The result the ETag was computed for
+        resampled = request._reused_resampling[1]
+    elif settings.STATISTICS_RESAMPLES:
+        from . import resampling
+
+        resampled = resampling.cached_comparison(
+            request_version(request, STATISTICS)[0],
+            histograms.get(1, empty),
+            histograms.get(2, empty),
+            resamples=settings.STATISTICS_RESAMPLES,
+            alpha=alpha,
         )
-        t_statistic = ttest_result.statistic
-        p_value = ttest_result.pvalue
-        df = ttest_result.df
-
-        n1, n2 = len(group1_scores), len(group2_scores)
-        mean1, mean2 = np.mean(group1_scores), np.mean(group2_scores)
-        var1, var2 = np.var(group1_scores, ddof=1), np.var(group2_scores, ddof=1)
-
-        if var1 > 0 or var2 > 0: # Ensure s_pooled is not NaN or zero if means are different
-            s_pooled_numerator = (n1 - 1) * var1 + (n2 - 1) * var2
-            s_pooled_denominator = n1 + n2 - 2
-            if s_pooled_denominator > 0:
-                 s_pooled = np.sqrt(s_pooled_numerator / s_pooled_denominator)
-                 if s_pooled > 0: # Avoid division by zero if s_pooled is 0
-                    cohens_d = (mean1 - mean2) / s_pooled
-                 else: # If pooled std dev is 0, effect size is undefined or infinite if means differ
-                    cohens_d = np.inf if mean1 != mean2 else 0 
-            else: # Should not happen if n1,n2 >=2
-                cohens_d = np.nan
-        elif mean1 == mean2: # Both variances are zero and means are equal
-             cohens_d = 0
-        else: # Both variances are zero but means differ (unlikely with real data)
-             cohens_d = np.inf
-
-
-        se_diff_squared = (var1 / n1) + (var2 / n2)
-        if se_diff_squared > 0:
-            se_diff = np.sqrt(se_diff_squared)
-            confidence_interval = stats.t.interval(
-                1 - alpha,
-                df,
-                loc=(mean1 - mean2),
-                scale=se_diff,
-            )
-        else:
-            confidence_interval = (np.nan, np.nan)
 
+    total_responses = overall["count"]
+    average_score = overall["mean"]
+    std_dev_overall = overall["std"]
 
     logger.info("=== STUDY STATISTICS ===")
     logger.info(f"Total Responses: {total_responses}")
-    logger.info(f"Average Score: {average_score if not np.isnan(average_score) else 'N/A'}")
-    logger.info(f"Overall Std Dev: {std_dev_overall if not np.isnan(std_dev_overall) else 'N/A'}")
+    logger.info(
+        f"Average Score: {average_score if not math.isnan(average_score) else 'N/A'}"
+    )
+    logger.info(
+        f"Overall Std Dev: {std_dev_overall if not math.isnan(std_dev_overall) else 'N/A'}"
+    )
 
     context = {
         "total_responses": total_responses,
         "average_score": average_score,
-        "min_score": min_score,
-        "max_score": max_score,
-        "q1_overall": q1_overall,
-        "median_overall": median_overall,
-        "q3_overall": q3_overall,
+        "min_score": overall["min"],
+        "max_score": overall["max"],
+        "q1_overall": overall["q1"],
+        "median_overall": overall["median"],
+        "q3_overall": overall["q3"],
         "std_dev_overall": std_dev_overall,
         "responses_by_treatment_group": responses_by_treatment_group,
-        "t_statistic": t_statistic,
-        "p_value": p_value,
-        "df": df,
-        "confidence_interval": confidence_interval,
-        "cohens_d": cohens_d,
+        **comparison,
         "alpha": alpha,
-        "group1_count": len(group1_scores),
-        "group2_count": len(group2_scores),
-        "group1_mean": np.mean(group1_scores) if group1_scores else np.nan,
-        "group2_mean": np.mean(group2_scores) if group2_scores else np.nan,
-        "group1_std": np.std(group1_scores, ddof=1) if len(group1_scores) > 1 else (0.0 if len(group1_scores) == 1 else np.nan),
-        "group2_std": np.std(group2_scores, ddof=1) if len(group2_scores) > 1 else (0.0 if len(group2_scores) == 1 else np.nan),
-        "overall_score_distribution": overall_score_distribution,
-        "group1_score_distribution": group1_score_distribution,
-        "group2_score_distribution": group2_score_distribution,
+        "resampled": resampled,
+        "resampling_enabled": bool(settings.STATISTICS_RESAMPLES),
+        "trajectory_available": trajectory.available(),
+        "group1_count": group1["count"],
+        "group2_count": group2["count"],
+        "group1_mean": group1["mean"],
+        "group2_mean": group2["mean"],
+        "group1_std": group1["std"],
+        "group2_std": group2["std"],
+        "overall_score_distribution": overall["distribution"],
+        "group1_score_distribution": group1["distribution"],
+        "group2_score_distribution": group2["distribution"],
     }
     return render(request, "analytics/statistics.html", context)
+
+
+@staff_member_required
+def export_view(request):
+    """
+    Stream all participants and their quiz responses as CSV or NDJSON
+    """
+    export_format = request.GET.get("format", "csv")
+    if export_format not in EXPORT_FORMATS:
+        return HttpResponseBadRequest("format must be csv or ndjson")
+
+    content_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    # The ASGI handler only streams async iterators; it would read a sync one
+    # to the end first
+    if isinstance(request, ASGIRequest):
+        content = aiter_export(export_format)
+    else:
+        content = iter_export(export_format)
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response["Content-Disposition"] = (
+        f'attachment; filename="speedierwatch-export.{export_format}"'
+    )
+    return response
+
+
+@staff_member_required
+def referral_network_view(request):
+    """
+    Depth, subtree and conversion figures of the referral forest; staff only,
+    as it names participants
+    """
+    summary = referral_network.cached_network_summary()
+    max_count = max(summary["depth_distribution"].values(), default=0)
+    depth_rows = [
+        {"depth": depth, "count": count, "share": 100 * count / max_count}
+        for depth, count in summary["depth_distribution"].items()
+    ]
+    return render(
+        request,
+        "analytics/referrals.html",
+        {**summary, "depth_rows": depth_rows},
+    )
+
+
+MAX_API_LIMIT = 100
+
+
+@staff_member_required
+def referral_network_api(request):
+    """
+    JSON form of the referral network page.
+
+    ?participant=<id> returns one participant's figures instead; ?limit and
+    ?offset page through the top referrers.
+    """
+    try:
+        participant_id = request.GET.get("participant")
+        limit = int(request.GET.get("limit", 20))
+        offset = int(request.GET.get("offset", 0))
+        if participant_id is not None:
+            participant_id = int(participant_id)
+    except ValueError:
+        return HttpResponseBadRequest("participant, limit and offset must be integers")
+    if not 0 < limit <= MAX_API_LIMIT or offset < 0:
+        return HttpResponseBadRequest(
+            f"limit must be 1-{MAX_API_LIMIT} and offset non-negative"
+        )
+
+    if participant_id is not None:
+        stats = referral_network.participant_stats(participant_id)
+        if stats is None:
+            return JsonResponse({"error": "No such participant"}, status=404)
+        return JsonResponse(stats)
+
+    summary = dict(referral_network.cached_network_summary())
+    if (limit, offset) != (20, 0):
+        summary["top_referrers"] = referral_network.top_referrers(limit, offset)
+    summary["depth_distribution"] = [
+        {"depth": depth, "participants": count}
+        for depth, count in summary["depth_distribution"].items()
+    ]
+    return JsonResponse(summary)
+
+
+def trajectory_variant(request, version):
+    """
+    The older data version whose trajectory the trajectory API reuses, if
+    any; the result is kept on the request for the view
+    """
+    trajectory = sys.modules.get("analytics.trajectory")
+    if trajectory is None:
+        return None
+    reused = trajectory.reusable_trajectory(
+        version,
+        request.GET.get("resolution", "day"),
+        max_age=settings.STATISTICS_TRAJECTORY_INTERVAL,
+    )
+    if reused is None:
+        return None
+    request._reused_trajectory = reused
+    return None if reused[0] == version else f"trajectory-{reused[0]}"
+
+
+@versioned_page(STATISTICS, variant=trajectory_variant)
+def trajectory_api(request):
+    """
+    Running group means, Welch test and Cohen's d over submission time, as
+    JSON columns for charting.
+
+    ?resolution=submission|hour|day (default day) sets the point spacing.
+    """
+    from . import trajectory
+
+    if not trajectory.available():
+        return JsonResponse({"error": "The trajectory needs NumPy"}, status=501)
+    resolution = request.GET.get("resolution", "day")
+    if resolution not in trajectory.RESOLUTIONS:
+        return HttpResponseBadRequest(
+            f"resolution must be one of {', '.join(trajectory.RESOLUTIONS)}"
+        )
+    if hasattr(request, "_reused_trajectory"):
+        # The result the ETag was computed for
+        return JsonResponse(request._reused_trajectory[1])
+    return JsonResponse(
+        trajectory.cached_trajectory(
+            request_version(request, STATISTICS)[0], resolution
+        )
+    )
+
+
+@versioned_page(STATISTICS)
+def item_analysis_view(request):
+    """
+    Difficulty, discrimination, per-group correctness and option choices of
+    every quiz question
+    """
+    from . import items
+
+    report = items.cached_item_analysis(request_version(request, STATISTICS)[0])
+    return render(request, "analytics/items.html", report)
+
+
+@versioned_page(STATISTICS)
+def item_analysis_api(request):
+    """
+    JSON form of the item analysis page
+    """
+    from . import items
+
+    return JsonResponse(
+        items.cached_item_analysis(request_version(request, STATISTICS)[0])
+    )
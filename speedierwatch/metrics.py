@@ -0,0 +1,263 @@
+"""
+Per-view request metrics with a Prometheus text endpoint.
+
+MetricsMiddleware records latency, SQL query count and time, and response
+size per URL name into an in-process registry. When METRICS_DIR is set, each
+worker periodically writes its counters to <METRICS_DIR>/<pid>.json and the
+/metrics endpoint sums the files, so all gunicorn workers are reported
+together.
+
+The middleware runs natively under both WSGI and ASGI. Queries are counted by
+a wrapper installed on every database connection, which reports to the timer
+of the current request through a context variable, so ORM calls made from
+sync_to_async threads of an async view are attributed to that request.
+"""
+
+import bisect
+import hmac
+import json
+import os
+import threading
+import time
+from contextvars import ContextVar
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+FIELDS = ("count", "latency_sum", "queries", "query_seconds", "response_bytes")
+
+
+class Registry:
+    """
+    Counters keyed by (view, method); one short lock per recorded request
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+        self._last_flush = 0.0
+
+    def record(self, view, method, latency, queries, query_seconds, response_bytes):
+        bucket = bisect.bisect_left(LATENCY_BUCKETS, latency)
+        with self._lock:
+            series = self._series.get((view, method))
+            if series is None:
+                series = dict.fromkeys(FIELDS, 0)
+                series["buckets"] = [0] * (len(LATENCY_BUCKETS) + 1)
+                self._series[(view, method)] = series
+            series["count"] += 1
+            series["latency_sum"] += latency
+            series["queries"] += queries
+            series["query_seconds"] += query_seconds
+            series["response_bytes"] += response_bytes
+            series["buckets"][bucket] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return [
+                {
+                    "view": view,
+                    "method": method,
+                    **series,
+                    "buckets": list(series["buckets"]),
+                }
+                for (view, method), series in self._series.items()
+            ]
+
+    def maybe_flush(self, directory, interval):
+        now = time.monotonic()
+        if now - self._last_flush < interval:
+            return
+        self._last_flush = now
+        self.flush(directory)
+
+    def flush(self, directory):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{os.getpid()}.json"
+        temporary = path.with_suffix(".tmp")
+        temporary.write_text(json.dumps(self.snapshot()))
+        os.replace(temporary, path)
+
+
+registry = Registry()
+
+
+class _QueryTimer:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+_active_timer = ContextVar("metrics_query_timer", default=None)
+
+
+def _time_query(execute, sql, params, many, context):
+    timer = _active_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timer.count += 1
+        timer.seconds += time.perf_counter() - started
+
+
+def _install_query_timer(connection, **kwargs):
+    if _time_query not in connection.execute_wrappers:
+        # First in the list so connection.execute_wrapper() blocks, which pop
+        # the last wrapper on exit, never remove it
+        connection.execute_wrappers.insert(0, _time_query)
+
+
+connection_created.connect(_install_query_timer)
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.directory = getattr(settings, "METRICS_DIR", None)
+        self.flush_interval = getattr(settings, "METRICS_FLUSH_INTERVAL", 5.0)
+        for connection in connections.all(initialized_only=True):
+            _install_query_timer(connection)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timer = _QueryTimer()
+        token = _active_timer.set(timer)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _active_timer.reset(token)
+        self._record(request, response, time.perf_counter() - started, timer)
+        return response
+
+    async def __acall__(self, request):
+        timer = _QueryTimer()
+        token = _active_timer.set(timer)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _active_timer.reset(token)
+        self._record(request, response, time.perf_counter() - started, timer)
+        return response
+
+    def _record(self, request, response, latency, timer):
+        match = request.resolver_match
+        view = match.view_name if match else "<unresolved>"
+        if response.streaming:
+            response_bytes = int(response.get("Content-Length", 0))
+        else:
+            response_bytes = len(response.content)
+
+        registry.record(
+            view, request.method, latency, timer.count, timer.seconds, response_bytes
+        )
+        if self.directory:
+            registry.maybe_flush(self.directory, self.flush_interval)
+
+
+def collect():
+    """
+    Merge this worker's live counters with every worker's flushed snapshot
+    """
+    snapshots = {}
+    directory = getattr(settings, "METRICS_DIR", None)
+    if directory and Path(directory).is_dir():
+        for path in Path(directory).glob("*.json"):
+            try:
+                snapshots[path.stem] = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+    snapshots[str(os.getpid())] = registry.snapshot()
+
+    merged = {}
+    for series_list in snapshots.values():
+        for series in series_list:
+            key = (series["view"], series["method"])
+            total = merged.setdefault(
+                key,
+                {
+                    **dict.fromkeys(FIELDS, 0),
+                    "buckets": [0] * (len(LATENCY_BUCKETS) + 1),
+                },
+            )
+            for field in FIELDS:
+                total[field] += series[field]
+            total["buckets"] = [
+                a + b for a, b in zip(total["buckets"], series["buckets"])
+            ]
+    return merged
+
+
+def render_prometheus(merged):
+    lines = [
+        "# HELP speedierwatch_request_duration_seconds Request latency per view",
+        "# TYPE speedierwatch_request_duration_seconds histogram",
+    ]
+    for (view, method), series in sorted(merged.items()):
+        labels = f'view="{view}",method="{method}"'
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, series["buckets"]):
+            cumulative += count
+            lines.append(
+                f'speedierwatch_request_duration_seconds_bucket{{{labels},le="{bound}"}} '
+                f"{cumulative}"
+            )
+        lines.append(
+            f'speedierwatch_request_duration_seconds_bucket{{{labels},le="+Inf"}} '
+            f"{series['count']}"
+        )
+        lines.append(
+            f"speedierwatch_request_duration_seconds_sum{{{labels}}} "
+            f"{series['latency_sum']}"
+        )
+        lines.append(
+            f"speedierwatch_request_duration_seconds_count{{{labels}}} {series['count']}"
+        )
+
+    counters = [
+        ("db_queries_total", "queries", "SQL queries issued per view"),
+        ("db_query_seconds_total", "query_seconds", "Time spent in SQL per view"),
+        ("response_bytes_total", "response_bytes", "Response body bytes per view"),
+    ]
+    for name, field, description in counters:
+        lines.append(f"# HELP speedierwatch_{name} {description}")
+        lines.append(f"# TYPE speedierwatch_{name} counter")
+        for (view, method), series in sorted(merged.items()):
+            lines.append(
+                f'speedierwatch_{name}{{view="{view}",method="{method}"}} {series[field]}'
+            )
+    return "\n".join(lines) + "\n"
+
+
+def metrics_view(request):
+    """
+    Prometheus text exposition of the request metrics of all workers
+    """
+    token = getattr(settings, "METRICS_TOKEN", "")
+    authorization = request.headers.get("Authorization", "")
+    authorized = request.user.is_staff or (
+        token and hmac.compare_digest(authorization, f"Bearer {token}")
+    )
+    if not authorized:
+        return HttpResponseForbidden()
+    return HttpResponse(
+        render_prometheus(collect()), content_type="text/plain; version=0.0.4"
+    )
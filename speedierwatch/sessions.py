@@ -0,0 +1,115 @@
+"""
+Session engine that keeps participant sessions out of the database.
+
+A participant's session only holds a few small values (participant id,
+referral code, quiz seed), listed in COOKIE_SESSION_KEYS. While a session
+holds nothing else, it is stored in the session cookie itself, signed like
+Django's signed_cookies engine, so the participant pages neither read nor
+write django_session and never compete with quiz submissions for the SQLite
+writer lock. As soon as a session holds any other key (a staff login, or
+messages that overflowed their cookie) it is stored in the database as
+before, so staff sessions stay revocable.
+
+A cookie session cannot be revoked server-side: flush() replaces the
+client's cookie, but a replayed old cookie is still valid until it expires.
+It only ever carries the participant's own state.
+
+Assigning a value a session already holds does not mark it modified, so
+repeat visits do not rewrite the cookie or the row. clear_expired() deletes
+expired database sessions in short batches instead of one long DELETE.
+"""
+
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends import db
+from django.core import signing
+from django.utils import timezone
+
+# Marks a cookie value holding the signed session data rather than the key
+# of a database row; database keys are lowercase letters and digits only.
+COOKIE_PREFIX = "c:"
+SALT = "speedierwatch.sessions"
+
+CLEANUP_BATCH_SIZE = 1000
+
+
+class SessionStore(db.SessionStore):
+    def _in_cookie(self, session_key=None):
+        session_key = self.session_key if session_key is None else session_key
+        return bool(session_key) and session_key.startswith(COOKIE_PREFIX)
+
+    def _fits_cookie(self):
+        return set(self._session) <= set(settings.COOKIE_SESSION_KEYS)
+
+    def __setitem__(self, key, value):
+        # Unchanged values leave the session unmodified, so nothing is saved
+        if key in self._session and self._session[key] == value:
+            return
+        super().__setitem__(key, value)
+
+    def load(self):
+        if not self._in_cookie():
+            return super().load()
+        try:
+            return signing.loads(
+                self.session_key[len(COOKIE_PREFIX) :],
+                serializer=self.serializer,
+                max_age=self.get_session_cookie_age(),
+                salt=SALT,
+            )
+        except Exception:
+            # Bad signature, expired or undecodable: start a new session
+            self._session_key = None
+            return {}
+
+    def exists(self, session_key):
+        if self._in_cookie(session_key):
+            return False
+        return super().exists(session_key)
+
+    def save(self, must_create=False):
+        if self._fits_cookie():
+            database_key = None if self._in_cookie() else self.session_key
+            self._session_key = COOKIE_PREFIX + signing.dumps(
+                self._session,
+                compress=True,
+                salt=SALT,
+                serializer=self.serializer,
+            )
+            # A session moving out of the database leaves no row behind
+            if database_key:
+                super().delete(database_key)
+            return
+        if self._in_cookie():
+            # Outgrew the cookie: continue as a new database session
+            self._session_key = None
+        super().save(must_create=must_create)
+
+    def delete(self, session_key=None):
+        if session_key is None:
+            session_key = self.session_key
+        if self._in_cookie(session_key):
+            return
+        super().delete(session_key)
+
+    @classmethod
+    def clear_expired(cls, batch_size=CLEANUP_BATCH_SIZE, pause=0.0):
+        """
+        Delete expired database sessions in batches of `batch_size`, sleeping
+        `pause` seconds between them; returns the number deleted
+        """
+        model = cls.get_model_class()
+        now = timezone.now()
+        deleted = 0
+        while True:
+            keys = list(
+                model.objects.filter(expire_date__lt=now).values_list(
+                    "session_key", flat=True
+                )[:batch_size]
+            )
+            if not keys:
+                return deleted
+            deleted += model.objects.filter(session_key__in=keys).delete()[0]
+            if pause:
+                time.sleep(pause)
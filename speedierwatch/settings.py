@@ -56,8 +56,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "speedierwatch.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "speedierwatch.middleware.AsyncWhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -68,12 +69,71 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = "speedierwatch.urls"
 
+# Route the participant pages to the async views in study/async_views.py.
+# Enable when serving speedierwatch.asgi with uvicorn; under WSGI each async
+# view would only be run to completion on the worker thread.
+ASYNC_PARTICIPANT_VIEWS = os.getenv("ASYNC_PARTICIPANT_VIEWS", "False") == "True"
+
+# Request metrics (see speedierwatch/metrics.py). Workers share their counters
+# through METRICS_DIR; /metrics accepts staff users or "Bearer <METRICS_TOKEN>".
+METRICS_DIR = os.getenv("METRICS_DIR", "")
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Playback telemetry (see study/telemetry.py). Each worker buffers beacon
+# events and writes them in one bulk insert per TELEMETRY_FLUSH_SIZE events
+# or TELEMETRY_FLUSH_INTERVAL seconds, whichever comes first.
+TELEMETRY_FLUSH_SIZE = int(os.getenv("TELEMETRY_FLUSH_SIZE", "500"))
+TELEMETRY_FLUSH_INTERVAL = float(os.getenv("TELEMETRY_FLUSH_INTERVAL", "10"))
+
+# Blocked randomization (see study/allocation.py). When enabled, referred and
+# direct participants are allocated from separate sequences, which must then
+# be generated with --strata direct,referred.
+ALLOCATION_STRATIFY_REFERRALS = (
+    os.getenv("ALLOCATION_STRATIFY_REFERRALS", "False") == "True"
+)
+
+# Bootstrap and permutation resamples behind the statistics page (see
+# analytics/resampling.py); computed once per data version in each worker.
+STATISTICS_RESAMPLES = int(os.getenv("STATISTICS_RESAMPLES", "100000"))
+# Seconds a resampling result is reused after the data changes; 0 resamples
+# on every new data version.
+STATISTICS_RESAMPLE_INTERVAL = int(os.getenv("STATISTICS_RESAMPLE_INTERVAL", "60"))
+# Seconds a trajectory (analytics/trajectory.py) is reused after the data
+# changes; 0 recomputes it on every new data version.
+STATISTICS_TRAJECTORY_INTERVAL = int(os.getenv("STATISTICS_TRAJECTORY_INTERVAL", "60"))
+# Backend for the statistics page figures (see analytics/backends.py):
+# "scipy", or "python" to serve them without NumPy/SciPy (set
+# STATISTICS_RESAMPLES=0 as well, since resampling needs NumPy).
+STATISTICS_BACKEND = os.getenv("STATISTICS_BACKEND", "scipy")
+
+# Participant sessions holding only these keys live in the signed session
+# cookie instead of django_session (see speedierwatch/sessions.py); any other
+# key, such as a staff login, moves the session to the database.
+SESSION_ENGINE = "speedierwatch.sessions"
+COOKIE_SESSION_KEYS = [
+    "participant_id",
+    "referral_code",
+    "quiz_seed",
+    "referred_bonus_earned",
+]
+
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],
-        "APP_DIRS": True,
         "OPTIONS": {
+            # Compiled templates are kept per worker; runserver still picks
+            # up template edits through its autoreloader
+            "loaders": [
+                (
+                    "django.template.loaders.cached.Loader",
+                    [
+                        "django.template.loaders.filesystem.Loader",
+                        "django.template.loaders.app_directories.Loader",
+                    ],
+                ),
+            ],
             "context_processors": [
                 "django.template.context_processors.debug",
                 "django.template.context_processors.request",
@@ -92,20 +152,25 @@ WSGI_APPLICATION = "speedierwatch.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
-if DEBUG:
-    DATABASES = {
-        "default": {
-            "ENGINE": "django.db.backends.sqlite3",
-            "NAME": BASE_DIR / "dev-db.sqlite3",
-        }
-    }
-else:
-    DATABASES = {
-        "default": {
-            "ENGINE": "django.db.backends.sqlite3",
-            "NAME": BASE_DIR / "prod-db.sqlite3",
-        }
+# "speedierwatch.sqlite" applies WAL, busy timeout, synchronous and mmap
+# PRAGMAs on every connection and starts transactions with BEGIN IMMEDIATE;
+# see speedierwatch/sqlite/. Connections persist for CONN_MAX_AGE seconds
+# under WSGI, where each worker thread reuses its own. Under ASGI a request's
+# sync work may run in any thread, so persistent connections are seldom
+# reused and accumulate; the default is then 0, as Django recommends.
+DATABASES = {
+    "default": {
+        "ENGINE": "speedierwatch.sqlite",
+        "NAME": BASE_DIR / ("dev-db.sqlite3" if DEBUG else "prod-db.sqlite3"),
+        "CONN_MAX_AGE": int(
+            os.getenv("CONN_MAX_AGE", "0" if ASYNC_PARTICIPANT_VIEWS else "600")
+        ),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            "timeout": 20,
+        },
     }
+}
 
 
 # Password validation
@@ -0,0 +1,9 @@
+"""
+SQLite backend tuned for several gunicorn workers sharing one database file.
+
+Use "speedierwatch.sqlite" as the database ENGINE. Every new connection gets
+the PRAGMAs in DEFAULT_PRAGMAS (overridable through OPTIONS["pragmas"]), and
+transactions start with BEGIN IMMEDIATE (OPTIONS["transaction_mode"]) so a
+writer waits for the lock up front instead of failing with "database is
+locked" when upgrading from a read lock mid-transaction.
+"""
@@ -0,0 +1,40 @@
+from django.db.backends.sqlite3 import base
+
+DEFAULT_PRAGMAS = {
+    # Readers no longer block the writer, and commits only append to the WAL
+    "journal_mode": "WAL",
+    # Durable across application crashes; fsync happens at checkpoints
+    "synchronous": "NORMAL",
+    # Milliseconds a writer waits for the lock before giving up
+    "busy_timeout": 20000,
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -20000,
+    "temp_store": "MEMORY",
+}
+
+DEFAULT_TRANSACTION_MODE = "IMMEDIATE"
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        # Our own options are not sqlite3.connect() arguments
+        kwargs.pop("pragmas", None)
+        kwargs.pop("transaction_mode", None)
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        pragmas = {
+            **DEFAULT_PRAGMAS,
+            **self.settings_dict["OPTIONS"].get("pragmas", {}),
+        }
+        for name, value in pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.settings_dict["OPTIONS"].get(
+            "transaction_mode", DEFAULT_TRANSACTION_MODE
+        )
+        self.cursor().execute(f"BEGIN {mode}")
@@ -17,11 +17,13 @@ Including another URLconf
 
 from django.contrib import admin
 from django.urls import path, include
+from .metrics import metrics_view
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("", include("study.urls")),
     path("analytics/", include("analytics.urls")),  # Added analytics urls
+    path("metrics", metrics_view, name="metrics"),
 ]
 
 # No longer needed as WhiteNoise will handle media files
@@ -1,5 +1,11 @@
 from django.contrib import admin
-from .models import Participant, QuizResponse
+from .models import (
+    LeaderboardEntry,
+    Participant,
+    PlaybackEvent,
+    QuizResponse,
+    RaffleDraw,
+)
 
 
 @admin.register(Participant)
@@ -14,3 +20,31 @@ class QuizResponseAdmin(admin.ModelAdmin):
     list_display = ("participant", "score", "submitted_at")
     list_filter = ("score", "submitted_at")
     search_fields = ("participant__name", "participant__email")
+
+
+@admin.register(LeaderboardEntry)
+class LeaderboardEntryAdmin(admin.ModelAdmin):
+    list_display = ("rank", "name", "score", "raffle_tickets", "referral_count")
+    ordering = ("rank",)
+    search_fields = ("name",)
+
+
+@admin.register(PlaybackEvent)
+class PlaybackEventAdmin(admin.ModelAdmin):
+    list_display = ("participant", "kind", "position", "playback_rate", "received_at")
+    list_filter = ("kind",)
+    raw_id_fields = ("participant",)
+
+
+@admin.register(RaffleDraw)
+class RaffleDrawAdmin(admin.ModelAdmin):
+    list_display = ("id", "drawn_at", "winner_count", "entrants", "seed")
+    readonly_fields = (
+        "seed",
+        "winner_count",
+        "entrants",
+        "total_cents",
+        "weights_digest",
+        "winners",
+        "drawn_at",
+    )
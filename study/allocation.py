@@ -0,0 +1,127 @@
+"""
+Blocked randomization of treatment groups.
+
+The allocation sequence is generated ahead of time (see the
+generate_allocation_sequence command) as permuted blocks, each holding every
+treatment group equally often. A worker reserves the next free block of a
+stratum with one conditional UPDATE, then hands out its assignments from
+memory, so registrations do not contend on a shared counter. Groups stay
+balanced to within a block per worker.
+
+Assignments left in memory when a worker exits are skipped, which costs at
+most one partial block of balance per worker restart. If a stratum has no
+free blocks left, participants fall back to simple randomization, and the
+sequence is looked up again every EXHAUSTED_RECHECK seconds.
+"""
+
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import AllocationBlock
+
+logger = logging.getLogger(__name__)
+
+GROUPS = (1, 2)
+
+# Seconds before a stratum found without free blocks is looked up again
+EXHAUSTED_RECHECK = 60
+
+DIRECT = "direct"
+REFERRED = "referred"
+
+
+def permuted_blocks(count, sizes, rng):
+    """
+    Return `count` blocks as strings of groups, each block a shuffled run of
+    a size drawn from `sizes` with every group equally often
+    """
+    blocks = []
+    for _ in range(count):
+        size = rng.choice(sizes)
+        if size % len(GROUPS):
+            raise ValueError(f"Block size {size} is not a multiple of {len(GROUPS)}")
+        block = [group for group in GROUPS for _ in range(size // len(GROUPS))]
+        rng.shuffle(block)
+        blocks.append("".join(map(str, block)))
+    return blocks
+
+
+def stratum_for(participant):
+    """
+    Stratum of a new participant; "" unless ALLOCATION_STRATIFY_REFERRALS
+    """
+    if not getattr(settings, "ALLOCATION_STRATIFY_REFERRALS", False):
+        return ""
+    return REFERRED if participant.referred_by_id else DIRECT
+
+
+def reserve_block(stratum):
+    """
+    Mark the next free block of `stratum` as taken by this process and
+    return its assignments, or None if the stratum is exhausted
+    """
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    free = AllocationBlock.objects.filter(stratum=stratum, reserved_at__isnull=True)
+    while True:
+        block = free.order_by("position").values_list("pk", "assignments").first()
+        if block is None:
+            return None
+        pk, assignments = block
+        # A single conditional UPDATE; it only misses if another process
+        # took the block since it was read, and then the next one is tried
+        if free.filter(pk=pk).update(reserved_at=timezone.now(), reserved_by=owner):
+            return [int(group) for group in assignments]
+
+
+class Allocator:
+    """
+    Per-process source of treatment groups, one reserved block at a time
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        # Stratum -> monotonic time it was last found without free blocks
+        self._exhausted = {}
+
+    def assign(self, stratum=""):
+        with self._lock:
+            pending = self._pending.setdefault(stratum, deque())
+            if not pending:
+                exhausted_at = self._exhausted.get(stratum)
+                if (
+                    exhausted_at is not None
+                    and time.monotonic() - exhausted_at < EXHAUSTED_RECHECK
+                ):
+                    return random.choice(GROUPS)
+                block = reserve_block(stratum)
+                if block is None:
+                    if exhausted_at is None:
+                        logger.warning(
+                            "No allocation blocks left for stratum %r, "
+                            "falling back to simple randomization",
+                            stratum,
+                        )
+                    self._exhausted[stratum] = time.monotonic()
+                    return random.choice(GROUPS)
+                self._exhausted.pop(stratum, None)
+                pending.extend(block)
+            return pending.popleft()
+
+
+allocator = Allocator()
+
+
+def assign_group(participant):
+    """
+    Treatment group for a participant about to be registered
+    """
+    return allocator.assign(stratum_for(participant))
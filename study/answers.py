@@ -0,0 +1,71 @@
+"""
+Packed storage of a participant's quiz answers.
+
+Each answer takes BITS bits of one integer, at the position of its question
+in the question bank: 0 for no answer, 1-4 for options A-D (the bank's own
+letters, not the shuffled order shown). Ten questions fit in 30 bits, so a
+response's answers are a single BigIntegerField however many responses
+there are, and unpack_matrix() turns a whole column of them into a
+(responses, questions) NumPy array with a few shifts.
+
+Positions only mean something for one version of the bank, so each response
+also stores the bank's key_digest, and answers recorded against another
+version are left out of the item analysis.
+"""
+
+from .question_bank import ANSWER_BITS, MAX_QUESTIONS, OPTION_LETTERS
+
+BITS = ANSWER_BITS
+MASK = (1 << BITS) - 1
+
+NO_ANSWER = 0
+CODES = {letter: code for code, letter in enumerate(OPTION_LETTERS, start=1)}
+
+
+def pack(answers):
+    """
+    Pack a sequence of chosen letters (None for no answer), indexed by bank
+    question id, into one integer
+    """
+    if len(answers) > MAX_QUESTIONS:
+        raise ValueError(f"At most {MAX_QUESTIONS} answers fit in one integer")
+    packed = 0
+    for position, letter in enumerate(answers):
+        code = NO_ANSWER if letter is None else CODES[letter]
+        packed |= code << (BITS * position)
+    return packed
+
+
+def unpack(packed, questions):
+    """
+    Return the chosen letters (None for no answer) of `questions` questions
+    """
+    return [
+        OPTION_LETTERS[code - 1] if code else None
+        for code in ((packed >> (BITS * i)) & MASK for i in range(questions))
+    ]
+
+
+def unpack_matrix(packed, questions):
+    """
+    Unpack an array of packed answers into a (len(packed), questions) uint8
+    array of answer codes
+    """
+    import numpy as np
+
+    packed = np.asarray(packed, dtype=np.int64)
+    shifts = np.arange(questions, dtype=np.int64) * BITS
+    return ((packed[:, None] >> shifts) & MASK).astype(np.uint8)
+
+
+def pack_matrix(codes):
+    """
+    Inverse of unpack_matrix(): one packed integer per row of answer codes
+    """
+    import numpy as np
+
+    codes = np.asarray(codes, dtype=np.int64)
+    if codes.shape[-1] > MAX_QUESTIONS:
+        raise ValueError(f"At most {MAX_QUESTIONS} answers fit in one integer")
+    shifts = np.arange(codes.shape[-1], dtype=np.int64) * BITS
+    return (codes << shifts).sum(axis=-1)
@@ -0,0 +1,222 @@
+"""
+Async versions of the participant-facing views, served when
+ASYNC_PARTICIPANT_VIEWS is enabled (see study/urls.py).
+
+Reads use the async ORM, so a participant waiting on the network holds no
+thread. Writes keep going through the sync helpers in sync_to_async: they
+rely on transaction.atomic(), which is not available in async code.
+"""
+
+import random
+
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.shortcuts import redirect, render
+
+from . import leaderboard as leaderboard_table
+from .allocation import assign_group
+from .forms import ParticipantForm, QuizForm
+from .models import LeaderboardEntry, Participant, QuizResponse
+from .question_bank import get_question_bank, shuffled_questions
+from .quiz_fragments import question_fragments
+from .referrals import submit_quiz
+from .versioning import LEADERBOARD, link_variant, versioned_page
+
+
+async def load_session(request):
+    """
+    Load the session off the event loop; later reads and writes hit its cache
+    """
+    # SessionBase only gains async accessors in Django 5.1
+    await sync_to_async(request.session.items)()
+    return request.session
+
+
+async def registered_participant(request, participants=Participant.objects):
+    """
+    Async variant of views.registered_participant()
+    """
+    session = await load_session(request)
+    participant_id = session.get("participant_id")
+    if not participant_id:
+        return None
+    participant = await participants.filter(id=participant_id).afirst()
+    if participant is None:
+        await sync_to_async(session.flush)()
+    return participant
+
+
+async def home(request):
+    session = await load_session(request)
+    referral_code = request.GET.get("ref")
+    referred_by = None
+
+    if referral_code:
+        try:
+            referred_by = await Participant.objects.aget(referral_code=referral_code)
+            session["referral_code"] = referral_code
+        except Participant.DoesNotExist:
+            pass
+
+    if request.method == "POST":
+        form = ParticipantForm(request.POST)
+        if form.is_valid():
+            participant = form.save(commit=False)
+
+            # Set referrer if available
+            if "referral_code" in session:
+                try:
+                    participant.referred_by = await Participant.objects.aget(
+                        referral_code=session["referral_code"]
+                    )
+                except Participant.DoesNotExist:
+                    pass
+
+            # Next slot of this worker's block; may stratify on the referrer
+            participant.treatment_group = await sync_to_async(assign_group)(participant)
+
+            def register():
+                participant.save()
+                if participant.referred_by_id:
+                    leaderboard_table.adjust_referral_count(
+                        participant.referred_by_id, 1
+                    )
+
+            await sync_to_async(register)()
+            session["participant_id"] = participant.id
+            session.pop("quiz_seed", None)
+            return redirect("study:video")
+    else:
+        form = ParticipantForm()
+
+    # Show the referral bonus notification once
+    referred_bonus_earned = session.pop("referred_bonus_earned", None)
+
+    context = {
+        "form": form,
+        "referred_by": referred_by,
+        "referred_bonus_earned": referred_bonus_earned,
+        "referral_success": True if referred_by else False,
+        "referral_source": referred_by.name if referred_by else None,
+    }
+    return render(request, "study/home.html", context)
+
+
+async def video(request):
+    participant = await registered_participant(request)
+    if participant is None:
+        messages.error(request, "Please register first.")
+        return redirect("study:home")
+
+    return render(
+        request,
+        "study/video.html",
+        {
+            "participant": participant,
+            "video_speed": "1" if participant.treatment_group == 1 else "2",
+        },
+    )
+
+
+async def quiz(request):
+    session = await load_session(request)
+    participant = await registered_participant(request)
+    if participant is None:
+        messages.error(request, "Please register first.")
+        return redirect("study:home")
+
+    # Only the seed is stored; question and option order are derived from it
+    seed = session.get("quiz_seed")
+    if seed is None:
+        seed = random.getrandbits(32)
+        session["quiz_seed"] = seed
+
+    if request.method == "POST":
+        bank = get_question_bank()
+        questions_data = shuffled_questions(seed, bank)
+        form = QuizForm(request.POST, questions_to_display=questions_data, seed=seed)
+        if form.is_valid():
+            score = sum(
+                form.cleaned_data.get(f"question_{i}") == question_data.correct_answer
+                for i, question_data in enumerate(questions_data)
+            )
+
+            answers = form.packed_answers()
+            # Records the response and credits the referral chain once
+            _, bonuses = await sync_to_async(submit_quiz)(
+                participant, score, answers, bank.key_digest
+            )
+            if bonuses:
+                # Store info for the direct referrer only
+                direct_bonus = next(iter(bonuses.values()))
+                session["referred_bonus_earned"] = str(direct_bonus)
+            return redirect("study:results")
+        # Invalid answers: re-render the bound form to keep the selections
+        context = {"form": form}
+    else:
+        # Assembled from cached question blocks; no form is built on GET
+        context = {"question_fragments": question_fragments(seed)}
+
+    context["participant"] = participant
+    return render(request, "study/quiz.html", context)
+
+
+async def results(request):
+    participant = await registered_participant(
+        request, Participant.objects.select_related("referred_by")
+    )
+    if participant is None:
+        messages.error(request, "Please register first.")
+        return redirect("study:home")
+
+    quiz_response = await QuizResponse.objects.aget(participant=participant)
+
+    site_url = request.build_absolute_uri("/").rstrip("/")
+    referral_url = f"{site_url}?ref={participant.referral_code}"
+
+    return render(
+        request,
+        "study/results.html",
+        {
+            "participant": participant,
+            "quiz_response": quiz_response,
+            "referral_url": referral_url,
+            "referral_success": participant.referred_by is not None,
+            "referral_source": (
+                participant.referred_by.name if participant.referred_by else None
+            ),
+        },
+    )
+
+
+@versioned_page(LEADERBOARD, variant=link_variant)
+async def leaderboard(request):
+    """
+    Display a leaderboard of participants and their raffle tickets
+    """
+    entries = LeaderboardEntry.objects.order_by("rank", "participant_id").values_list(
+        "name", "score", "raffle_tickets", "referral_code", "referral_count", "rank"
+    )
+
+    site_url = request.build_absolute_uri("/").rstrip("/")
+    participants_data = [
+        {
+            "name": name,
+            "score": score,
+            "tickets": float(tickets),
+            "referral_url": f"{site_url}?ref={referral_code}",
+            "referral_count": referral_count,
+            "rank": rank,
+        }
+        async for name, score, tickets, referral_code, referral_count, rank in entries
+    ]
+
+    return render(
+        request,
+        "study/leaderboard.html",
+        {
+            "participants": participants_data,
+            "total_participants": len(participants_data),
+            "total_tickets": float(sum(p["tickets"] for p in participants_data)),
+        },
+    )
@@ -0,0 +1,159 @@
+"""
+Chunked, resumable bulk updates for data migrations and management commands.
+
+A Backfill walks a queryset in primary-key order, a chunk at a time. Each
+chunk is one set-based UPDATE (or one bulk_update) in its own short
+transaction, together with a BackfillCheckpoint of the last primary key done,
+so the SQLite write lock is released between chunks and an interrupted run
+picks up where it stopped. The checkpoint is deleted once the backfill
+completes.
+
+Run from a data migration, a backfill should be non-atomic (atomic = False
+on the Migration and on RunPython), otherwise the chunks share one
+transaction and neither the lock release nor the resume applies. Migrations
+older than the checkpoint table (0014) use the frozen chunk loop in
+study.migrations.operations.backfill instead, which keeps no checkpoints.
+"""
+
+import logging
+import time
+
+from django.db import connections, transaction
+
+from .models import BackfillCheckpoint
+
+logger = logging.getLogger(__name__)
+
+
+def has_checkpoints(using="default"):
+    """
+    Whether the checkpoint table exists yet (migration 0014 has run)
+    """
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        tables = connection.introspection.table_names(cursor)
+    return BackfillCheckpoint._meta.db_table in tables
+
+
+def _checkpoints(using):
+    return BackfillCheckpoint.objects.using(using)
+
+
+def load_checkpoint(name, using="default"):
+    """
+    Return (last_pk, rows_done) of an unfinished backfill, or None
+    """
+    return (
+        _checkpoints(using).filter(name=name).values_list("last_pk", "rows_done")
+    ).first()
+
+
+def list_checkpoints(using="default"):
+    """
+    Return [(name, last_pk, rows_done, updated_at), ...] of unfinished backfills
+    """
+    return list(
+        _checkpoints(using)
+        .order_by("name")
+        .values_list("name", "last_pk", "rows_done", "updated_at")
+    )
+
+
+def clear_checkpoint(name, using="default"):
+    """
+    Forget the progress of a backfill so the next run starts from the beginning
+    """
+    deleted, _ = _checkpoints(using).filter(name=name).delete()
+    return deleted > 0
+
+
+class Backfill:
+    """
+    Apply `update` (field -> value or expression, as for QuerySet.update())
+    or `transform` (a function changing an instance in place, saved with
+    bulk_update on `fields`) to every row of `queryset`.
+
+    `progress(done, total)` is called after every chunk; by default progress
+    is logged. `pause` seconds are slept between chunks to let other writers
+    in.
+    """
+
+    def __init__(
+        self,
+        name,
+        queryset,
+        *,
+        update=None,
+        transform=None,
+        fields=None,
+        chunk_size=1000,
+        pause=0.0,
+        progress=None,
+    ):
+        if (update is None) == (transform is None):
+            raise ValueError("Pass exactly one of update and transform")
+        if transform is not None and not fields:
+            raise ValueError("transform needs the fields it changes")
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be positive")
+        self.name = name
+        self.queryset = queryset.order_by("pk")
+        self.update = update
+        self.transform = transform
+        self.fields = fields
+        self.chunk_size = chunk_size
+        self.pause = pause
+        self.progress = progress or self._log_progress
+
+    def run(self):
+        """
+        Process the remaining chunks; returns the number of rows processed
+        """
+        using = self.queryset.db
+        resumable = has_checkpoints(using)
+        checkpoint = load_checkpoint(self.name, using) if resumable else None
+        last_pk, done = checkpoint or (None, 0)
+        remaining = self._after(last_pk).count()
+        total = done + remaining
+        if checkpoint:
+            logger.info("Resuming backfill %s after pk %s", self.name, last_pk)
+
+        while True:
+            pks = list(
+                self._after(last_pk).values_list("pk", flat=True)[: self.chunk_size]
+            )
+            if not pks:
+                break
+            chunk = self._after(last_pk).filter(pk__lte=pks[-1])
+            with transaction.atomic(using=using):
+                if self.update is not None:
+                    chunk.update(**self.update)
+                else:
+                    objects = list(chunk)
+                    for obj in objects:
+                        self.transform(obj)
+                    self.queryset.model._default_manager.db_manager(using).bulk_update(
+                        objects, self.fields
+                    )
+                last_pk = pks[-1]
+                done += len(pks)
+                if resumable:
+                    _checkpoints(using).update_or_create(
+                        name=self.name,
+                        defaults={"last_pk": last_pk, "rows_done": done},
+                    )
+            self.progress(done, total)
+            if self.pause:
+                time.sleep(self.pause)
+
+        if resumable:
+            clear_checkpoint(self.name, using)
+        return done
+
+    def _after(self, last_pk):
+        if last_pk is None:
+            return self.queryset
+        return self.queryset.filter(pk__gt=last_pk)
+
+    def _log_progress(self, done, total):
+        logger.info("Backfill %s: %d/%d rows", self.name, done, total)
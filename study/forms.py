@@ -1,6 +1,7 @@
 from django import forms
+from .answers import pack
 from .models import Participant
-import random
+from .question_bank import option_orders
 
 
 class ParticipantForm(forms.ModelForm):
@@ -13,27 +14,38 @@ class ParticipantForm(forms.ModelForm):
         }
 
 
+def question_field(question, options):
+    """
+    Radio choice field for one quiz question with its options in display order
+    """
+    return forms.ChoiceField(
+        label=question.text,
+        choices=options,
+        widget=forms.RadioSelect(attrs={"class": "form-check-input"}),
+        required=True,
+    )
+
+
 class QuizForm(forms.Form):
     def __init__(self, *args, **kwargs):
         questions_to_display = kwargs.pop("questions_to_display", [])
+        seed = kwargs.pop("seed", None)
         super().__init__(*args, **kwargs)
+        # Options are ordered from the quiz seed so GET and POST agree
+        orders = option_orders(seed, questions_to_display)
         self.ordered_correct_answers = []
+        self.questions = questions_to_display
 
-        for i, question_data in enumerate(questions_to_display):
-            field_name = f"question_{i}"
-
-            options = [
-                ("A", question_data["option_a"]),
-                ("B", question_data["option_b"]),
-                ("C", question_data["option_c"]),
-                ("D", question_data["option_d"]),
-            ]
-            random.shuffle(options)
-
-            self.fields[field_name] = forms.ChoiceField(
-                label=question_data["text"],
-                choices=options,
-                widget=forms.RadioSelect(attrs={"class": "form-check-input"}),
-                required=True,
-            )
-            self.ordered_correct_answers.append(question_data["correct_answer"])
+        for i, (question_data, options) in enumerate(zip(questions_to_display, orders)):
+            self.fields[f"question_{i}"] = question_field(question_data, options)
+            self.ordered_correct_answers.append(question_data.correct_answer)
+
+    def packed_answers(self):
+        """
+        Chosen options of a valid form packed by bank question id
+        """
+        by_id = {
+            question.id: self.cleaned_data.get(f"question_{i}")
+            for i, question in enumerate(self.questions)
+        }
+        return pack([by_id.get(position) for position in range(max(by_id) + 1)])
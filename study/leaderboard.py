@@ -0,0 +1,204 @@
+"""
+Incremental maintenance of the denormalized leaderboard table.
+
+Ranks use competition ranking (1 + number of entries with strictly more
+tickets), so a ticket change only shifts the ranks of the entries whose
+ticket count it crosses, which is a single set-based UPDATE.
+"""
+
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import (
+    Case,
+    Count,
+    DecimalField,
+    F,
+    Func,
+    OuterRef,
+    Subquery,
+    Value,
+    When,
+)
+
+from . import versioning
+from .models import LeaderboardEntry, Participant, QuizResponse
+
+TICKET_QUANTUM = Decimal("0.01")
+TICKET_FIELD = DecimalField(max_digits=10, decimal_places=2)
+
+
+def _quantize(tickets):
+    return Decimal(tickets).quantize(TICKET_QUANTUM)
+
+
+def _rank_for(tickets):
+    return LeaderboardEntry.objects.filter(raffle_tickets__gt=tickets).count() + 1
+
+
+def add_entry(quiz_response):
+    """
+    Insert the leaderboard row for a newly submitted quiz
+    """
+    participant = quiz_response.participant
+    tickets = _quantize(quiz_response.raffle_tickets)
+
+    with transaction.atomic():
+        versioning.bump(versioning.LEADERBOARD)
+        LeaderboardEntry.objects.filter(raffle_tickets__lt=tickets).update(
+            rank=F("rank") + 1
+        )
+        return LeaderboardEntry.objects.create(
+            participant=participant,
+            name=participant.name,
+            referral_code=participant.referral_code,
+            score=quiz_response.score,
+            raffle_tickets=tickets,
+            referral_count=participant.referrals.count(),
+            rank=_rank_for(tickets),
+        )
+
+
+def update_tickets(new_tickets):
+    """
+    Apply new raffle ticket totals, given as {participant_id: tickets}, in a
+    fixed number of statements however many entries change
+    """
+    with transaction.atomic():
+        old_tickets = dict(
+            LeaderboardEntry.objects.filter(participant_id__in=new_tickets).values_list(
+                "participant_id", "raffle_tickets"
+            )
+        )
+        changes = {
+            participant_id: (old_tickets[participant_id], _quantize(tickets))
+            for participant_id, tickets in new_tickets.items()
+            if participant_id in old_tickets
+            and old_tickets[participant_id] != _quantize(tickets)
+        }
+        if not changes:
+            return
+
+        # Every other entry moves down one place for each total that rises
+        # past it and up one for each that falls below it
+        shift = sum(
+            Case(
+                When(
+                    raffle_tickets__gte=min(old, new),
+                    raffle_tickets__lt=max(old, new),
+                    then=Value(1 if new > old else -1),
+                ),
+                default=Value(0),
+            )
+            for old, new in changes.values()
+        )
+        totals = [total for change in changes.values() for total in change]
+        LeaderboardEntry.objects.exclude(participant_id__in=changes).filter(
+            raffle_tickets__gte=min(totals), raffle_tickets__lt=max(totals)
+        ).update(rank=F("rank") + shift)
+
+        changed = LeaderboardEntry.objects.filter(participant_id__in=changes)
+        changed.update(
+            raffle_tickets=Case(
+                *[
+                    When(participant_id=participant_id, then=Value(new))
+                    for participant_id, (_, new) in changes.items()
+                ],
+                output_field=TICKET_FIELD,
+            )
+        )
+        # The changed entries are ranked last, against the final totals
+        higher = (
+            LeaderboardEntry.objects.filter(
+                raffle_tickets__gt=OuterRef("raffle_tickets")
+            )
+            .order_by()
+            .annotate(count=Func("pk", function="COUNT"))
+            .values("count")
+        )
+        changed.update(rank=Subquery(higher) + 1)
+        versioning.bump(versioning.LEADERBOARD)
+
+
+def remove_entry(participant_id):
+    """
+    Delete a participant's leaderboard row; close_gap() runs on post_delete
+    """
+    LeaderboardEntry.objects.filter(participant_id=participant_id).delete()
+
+
+def close_gap(tickets):
+    """
+    Move up the entries ranked below a deleted entry with `tickets`
+    """
+    with transaction.atomic():
+        LeaderboardEntry.objects.filter(raffle_tickets__lt=tickets).update(
+            rank=F("rank") - 1
+        )
+        versioning.bump(versioning.LEADERBOARD)
+
+
+def adjust_referral_count(participant_id, delta):
+    """
+    Shift the referral count shown for a participant, if they are on the board
+    """
+    if LeaderboardEntry.objects.filter(participant_id=participant_id).update(
+        referral_count=F("referral_count") + delta
+    ):
+        versioning.bump(versioning.LEADERBOARD)
+
+
+def rebuild(batch_size=1000):
+    """
+    Recreate the whole leaderboard from QuizResponse in one pass
+    """
+    referral_counts = dict(
+        Participant.objects.filter(referred_by__isnull=False)
+        .values_list("referred_by")
+        .annotate(count=Count("id"))
+        .values_list("referred_by", "count")
+    )
+    responses = (
+        QuizResponse.objects.order_by("-raffle_tickets", "participant_id")
+        .values_list(
+            "participant_id",
+            "participant__name",
+            "participant__referral_code",
+            "score",
+            "raffle_tickets",
+        )
+        .iterator(chunk_size=batch_size)
+    )
+
+    count = 0
+    rank = 0
+    previous_tickets = None
+    batch = []
+    with transaction.atomic():
+        # Without the per-row post_delete, which would close every gap in turn
+        entries = LeaderboardEntry.objects.all()
+        entries._raw_delete(entries.db)
+        # Entries are written batch by batch so memory stays flat
+        for participant_id, name, referral_code, score, tickets in responses:
+            count += 1
+            tickets = _quantize(tickets)
+            if tickets != previous_tickets:
+                rank = count
+                previous_tickets = tickets
+            batch.append(
+                LeaderboardEntry(
+                    participant_id=participant_id,
+                    name=name,
+                    referral_code=referral_code,
+                    score=score,
+                    raffle_tickets=tickets,
+                    referral_count=referral_counts.get(participant_id, 0),
+                    rank=rank,
+                )
+            )
+            if len(batch) >= batch_size:
+                LeaderboardEntry.objects.bulk_create(batch)
+                batch = []
+        LeaderboardEntry.objects.bulk_create(batch)
+        versioning.bump(versioning.LEADERBOARD)
+    return count
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from study import backfill
+
+
+class Command(BaseCommand):
+    help = "List interrupted backfills, or reset one so it starts over"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset",
+            metavar="NAME",
+            help="Forget the checkpoint of the named backfill",
+        )
+        parser.add_argument(
+            "--database",
+            default="default",
+            help="Database to inspect",
+        )
+
+    def handle(self, *args, **options):
+        using = options["database"]
+        if not backfill.has_checkpoints(using):
+            raise CommandError(
+                "No checkpoint table; run migrate to apply study.0014 first"
+            )
+        if options["reset"]:
+            if not backfill.clear_checkpoint(options["reset"], using):
+                raise CommandError(f"No checkpoint named {options['reset']!r}")
+            self.stdout.write(self.style.SUCCESS(f"Reset {options['reset']}"))
+            return
+
+        checkpoints = backfill.list_checkpoints(using)
+        if not checkpoints:
+            self.stdout.write("No interrupted backfills")
+        for name, last_pk, rows_done, updated_at in checkpoints:
+            self.stdout.write(
+                f"{name}: {rows_done} rows done, resumes after pk {last_pk} "
+                f"(last progress {updated_at})"
+            )
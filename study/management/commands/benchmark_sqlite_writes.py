@@ -0,0 +1,151 @@
+import random
+import statistics
+import tempfile
+import threading
+import time
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections
+
+from study.models import Participant
+from study.referrals import submit_quiz
+
+# Stock Django/sqlite3 behaviour, for comparison with the tuned profile
+STOCK_OPTIONS = {
+    "pragmas": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "busy_timeout": 5000,
+        "mmap_size": 0,
+        "cache_size": -2000,
+        "temp_store": "DEFAULT",
+    },
+    "transaction_mode": "DEFERRED",
+}
+
+MODES = [
+    ("stock", STOCK_OPTIONS),
+    ("tuned", {}),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure concurrent quiz submission throughput on a scratch SQLite file "
+        "with the stock settings and with the tuned profile"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=16,
+            help="Concurrent writers, each with its own connection",
+        )
+        parser.add_argument("--submissions", type=int, default=800)
+        parser.add_argument(
+            "--participants",
+            type=int,
+            default=2000,
+            help="Size of the generated dataset the submissions land in",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            connection.settings_dict["TEST"]["NAME"] = str(
+                Path(directory) / "bench.sqlite3"
+            )
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            original_options = connection.settings_dict["OPTIONS"]
+            try:
+                for name, db_options in MODES:
+                    connection.close()
+                    connection.settings_dict["OPTIONS"] = {
+                        **original_options,
+                        **db_options,
+                    }
+                    self._report(name, self._run(options))
+            finally:
+                connection.settings_dict["OPTIONS"] = original_options
+                connection.close()
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def _run(self, options):
+        call_command(
+            "generate_study_data",
+            participants=options["participants"],
+            seed=options["seed"],
+            clear=True,
+            stdout=StringIO(),
+        )
+        rng = random.Random(options["seed"])
+        referrers = list(
+            Participant.objects.filter(quizresponse__isnull=False).values_list(
+                "id", flat=True
+            )
+        )
+        pending = Participant.objects.bulk_create(
+            Participant(
+                name=f"Writer {i}",
+                email=f"writer{i}@example.com",
+                treatment_group=rng.randint(1, 2),
+                referral_code=f"bench-{i}",
+                referred_by_id=rng.choice(referrers),
+            )
+            for i in range(options["submissions"])
+        )
+        pending_ids = [participant.id for participant in pending]
+        # Release the file so every writer starts from the same state
+        connection.close()
+
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+
+        def writer(participant_ids):
+            try:
+                for participant_id in participant_ids:
+                    started = time.perf_counter()
+                    try:
+                        participant = Participant.objects.get(id=participant_id)
+                        submit_quiz(participant, 7)
+                    except OperationalError as exc:
+                        with lock:
+                            errors.append(str(exc))
+                        continue
+                    with lock:
+                        latencies.append(time.perf_counter() - started)
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(
+                target=writer, args=(pending_ids[i :: options["threads"]],)
+            )
+            for i in range(options["threads"])
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        return latencies, errors, elapsed
+
+    def _report(self, name, result):
+        latencies, errors, elapsed = result
+        if latencies:
+            ordered = sorted(latencies)
+            p50 = statistics.median(ordered) * 1000
+            p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000
+        else:
+            p50 = p99 = float("nan")
+        self.stdout.write(
+            f"{name:<16} {len(latencies) / elapsed:>8.1f} submissions/s "
+            f"p50 {p50:>8.2f} ms  p99 {p99:>8.2f} ms  "
+            f"{len(errors)} 'database is locked' failures"
+        )
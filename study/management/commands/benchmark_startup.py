@@ -0,0 +1,196 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics.backends import BACKENDS
+
+# Modules a participant-facing worker must not import while booting
+HEAVY_MODULES = ("numpy", "scipy", "pandas")
+
+# Run in a fresh interpreter per measurement, so nothing is imported yet.
+# Boot is what a worker does before serving its first request: build the
+# application and load the URLconf (which imports every view module).
+# First use then loads the statistics backend and runs it once.
+# Arguments: server ("wsgi" or "asgi"), "1" to measure first use, and the
+# heavy module names.
+PROBE = """
+import importlib, json, resource, sys, time
+
+server, first_use, heavy = sys.argv[1], sys.argv[2] == "1", sys.argv[3:]
+
+def peak_rss():
+    # ru_maxrss survives exec on Linux, so it would report the peak of the
+    # forking manage.py process; the high-water mark of this image does not
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+result = {"interpreter_rss": peak_rss()}
+started = time.perf_counter()
+handler = importlib.import_module(f"django.core.{server}")
+getattr(handler, f"get_{server}_application")()
+from django.urls import get_resolver
+get_resolver().url_patterns
+result["boot_ms"] = (time.perf_counter() - started) * 1000
+result["boot_rss"] = peak_rss()
+result["heavy_modules"] = sorted(
+    name for name in heavy if name in sys.modules
+)
+if first_use:
+    started = time.perf_counter()
+    from analytics.backends import get_backend
+    backend = get_backend()
+    backend.describe([3, 5, 8, 13, 21, 34, 21, 13, 8, 5, 3])
+    backend.compare_groups(
+        [3, 5, 8, 13, 21, 34, 21, 13, 8, 5, 3], [5, 8, 13, 21, 34, 21, 13, 8, 5, 3, 1]
+    )
+    result["first_use_ms"] = (time.perf_counter() - started) * 1000
+    result["first_use_rss"] = peak_rss()
+print(json.dumps(result))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure worker startup: import time and peak RSS of booting the "
+        "application, and of first use of each statistics backend"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Fresh interpreters started per measurement (medians reported)",
+        )
+        parser.add_argument(
+            "--server",
+            choices=("wsgi", "asgi"),
+            default="wsgi",
+            help="Application entry point the workers load",
+        )
+        parser.add_argument(
+            "--backends",
+            default=",".join(BACKENDS),
+            help="Comma-separated statistics backends to measure first use of",
+        )
+        parser.add_argument(
+            "--max-boot-ms",
+            type=float,
+            help="Fail if the median boot time is above this",
+        )
+        parser.add_argument(
+            "--max-boot-rss-mb",
+            type=float,
+            help="Fail if the median peak RSS after boot is above this",
+        )
+        parser.add_argument("--output", help="Write JSON results to this file")
+
+    def handle(self, *args, **options):
+        if options["repeat"] < 1:
+            raise CommandError("--repeat must be positive")
+        backends = [name for name in options["backends"].split(",") if name]
+        unknown = sorted(set(backends) - set(BACKENDS))
+        if unknown:
+            raise CommandError(f"Unknown backends: {', '.join(unknown)}")
+
+        results = {"boot": self._measure(options, first_use=False)}
+        for name in backends:
+            results[f"statistics_{name}"] = self._measure(
+                options, first_use=True, backend=name
+            )
+
+        self._report(results)
+        if options["output"]:
+            Path(options["output"]).write_text(json.dumps(results, indent=2) + "\n")
+
+        failures = self._check(results["boot"], options)
+        if failures:
+            raise CommandError("Startup regressions:\n  " + "\n  ".join(failures))
+        self.stdout.write(self.style.SUCCESS("Worker startup within budget"))
+
+    def _measure(self, options, first_use, backend=None):
+        """
+        Median figures over `repeat` fresh interpreters
+        """
+        arguments = [options["server"], "1" if first_use else "0", *HEAVY_MODULES]
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+        if backend is not None:
+            env["STATISTICS_BACKEND"] = backend
+        runs = []
+        for _ in range(options["repeat"]):
+            completed = subprocess.run(
+                [sys.executable, "-c", PROBE, *arguments],
+                cwd=settings.BASE_DIR,
+                env=env,
+                capture_output=True,
+                text=True,
+            )
+            if completed.returncode:
+                raise CommandError(f"Startup probe failed:\n{completed.stderr}")
+            runs.append(json.loads(completed.stdout.splitlines()[-1]))
+
+        result = {
+            key: statistics.median(run[key] for run in runs)
+            for key in runs[0]
+            if key != "heavy_modules"
+        }
+        result["heavy_modules"] = sorted(
+            {name for run in runs for name in run["heavy_modules"]}
+        )
+        return result
+
+    def _report(self, results):
+        mb = 1024 * 1024
+        boot = results["boot"]
+        self.stdout.write(
+            f"  {'interpreter':<20} {'':>9}    {boot['interpreter_rss'] / mb:>7.1f} MB"
+        )
+        for name, result in results.items():
+            line = (
+                f"  {name:<20} {result['boot_ms']:>9.1f} ms "
+                f"{result['boot_rss'] / mb:>7.1f} MB"
+            )
+            if "first_use_ms" in result:
+                line += (
+                    f"  first use +{result['first_use_ms']:.1f} ms, "
+                    f"{result['first_use_rss'] / mb:.1f} MB"
+                )
+            self.stdout.write(line)
+        if boot["heavy_modules"]:
+            self.stdout.write(f"  boot imported {', '.join(boot['heavy_modules'])}")
+
+    def _check(self, boot, options):
+        failures = []
+        if boot["heavy_modules"]:
+            failures.append(
+                f"boot imports {', '.join(boot['heavy_modules'])}; "
+                "import it inside the code that needs it"
+            )
+        if (
+            options["max_boot_ms"] is not None
+            and boot["boot_ms"] > options["max_boot_ms"]
+        ):
+            failures.append(
+                f"boot takes {boot['boot_ms']:.1f} ms "
+                f"(budget {options['max_boot_ms']:.1f} ms)"
+            )
+        limit = options["max_boot_rss_mb"]
+        if limit is not None and boot["boot_rss"] > limit * 1024 * 1024:
+            failures.append(
+                f"boot peak RSS is {boot['boot_rss'] / 1024 / 1024:.1f} MB "
+                f"(budget {limit:.1f} MB)"
+            )
+        return failures
@@ -0,0 +1,249 @@
+import json
+import re
+import statistics
+import time
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext,
+    setup_test_environment,
+    teardown_test_environment,
+)
+
+from study.models import Participant
+
+# Maximum SQL queries per request, including transaction statements;
+# participant sessions are cookies and cost none. These must not grow with
+# the dataset; a view going over budget has most likely regained an N+1.
+# quiz_post credits a referral chain of any depth in the same statements,
+# home_post includes reserving an allocation block (one read, one update).
+QUERY_BUDGETS = {
+    "home_get": 1,
+    "home_post": 9,
+    "video": 1,
+    "quiz_get": 1,
+    "quiz_post": 34,
+    "results": 2,
+    "leaderboard": 2,
+    "statistics": 2,
+}
+
+# Views a participant goes through, in order
+FUNNEL_VIEWS = ("home_get", "home_post", "video", "quiz_get", "quiz_post", "results")
+
+# Maximum INSERT/UPDATE/DELETE statements for one participant through the
+# funnel: up to 4 to register (participant, referrer's count, data version,
+# allocation block) and 6 to submit the quiz, plus 5 to credit the referral
+# chain however deep it is.
+# Sessions live in a signed cookie and add none.
+PARTICIPANT_WRITE_BUDGET = 4 + 6 + 5
+
+# Statements that write to the database, as opposed to reads and
+# transaction control
+WRITE_PATTERN = re.compile(r"\s*(INSERT|UPDATE|DELETE|REPLACE)\b", re.IGNORECASE)
+
+FIELD_PATTERN = re.compile(r'name="(question_\d+)" value="([A-D])"')
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark every study and analytics view against generated datasets, "
+        "recording wall time and SQL query counts"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default="100,1000,10000",
+            help="Comma-separated dataset sizes (participants)",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=10,
+            help="Participants pushed through the funnel per dataset size",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="Write JSON results to this file")
+        parser.add_argument(
+            "--baseline",
+            help="Also compare median times against the --output of an earlier "
+            "run on this machine",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.5,
+            help="Allowed relative slowdown of a view's median time vs baseline",
+        )
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options["sizes"].split(",")]
+        if options["baseline"] and not Path(options["baseline"]).exists():
+            raise CommandError(f"No baseline at {options['baseline']}")
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            results = {}
+            participant_writes = {}
+            for size in sizes:
+                results[str(size)], participant_writes[str(size)] = (
+                    self._benchmark_size(size, options)
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        self._report(results, participant_writes)
+        if options["output"]:
+            Path(options["output"]).write_text(json.dumps(results, indent=2) + "\n")
+
+        failures = self._check(
+            results, participant_writes, options["baseline"], options["tolerance"]
+        )
+        if failures:
+            raise CommandError("Benchmark regressions:\n  " + "\n  ".join(failures))
+        self.stdout.write(self.style.SUCCESS("All views within budget"))
+
+    def _benchmark_size(self, size, options):
+        call_command(
+            "generate_study_data",
+            participants=size,
+            seed=options["seed"],
+            clear=True,
+            stdout=StringIO(),
+        )
+        # Registrations reserve allocation blocks as they would in a study
+        call_command(
+            "generate_allocation_sequence",
+            blocks=options["repeat"],
+            seed=options["seed"],
+            stdout=StringIO(),
+        )
+        # Recent completers sit deepest in the referral forest, which makes
+        # the referral cascade in quiz_post as expensive as it gets
+        referral_codes = list(
+            Participant.objects.filter(quizresponse__isnull=False)
+            .order_by("-pk")
+            .values_list("referral_code", flat=True)[: options["repeat"]]
+        )
+
+        timings = {view: [] for view in QUERY_BUDGETS}
+        queries = {view: [] for view in QUERY_BUDGETS}
+        writes = {view: [] for view in QUERY_BUDGETS}
+
+        def measure(view, client, method, url, data=None, expected=200):
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = getattr(client, method)(url, data or {})
+                elapsed = time.perf_counter() - started
+            if response.status_code != expected:
+                raise CommandError(
+                    f"{view}: expected HTTP {expected}, got {response.status_code}"
+                )
+            timings[view].append(elapsed * 1000)
+            queries[view].append(len(context.captured_queries))
+            writes[view].append(
+                sum(
+                    bool(WRITE_PATTERN.match(query["sql"]))
+                    for query in context.captured_queries
+                )
+            )
+            return response
+
+        for i in range(options["repeat"]):
+            client = Client()
+            # Every other participant arrives through a referral link
+            url = "/"
+            if i % 2 and referral_codes:
+                url = f"/?ref={referral_codes[i % len(referral_codes)]}"
+            measure("home_get", client, "get", url)
+            measure(
+                "home_post",
+                client,
+                "post",
+                url,
+                {"name": f"Bench {i}", "email": f"bench{i}@example.com"},
+                expected=302,
+            )
+            measure("video", client, "get", "/video/")
+            page = measure("quiz_get", client, "get", "/quiz/").content.decode()
+            answers = dict(FIELD_PATTERN.findall(page))
+            measure("quiz_post", client, "post", "/quiz/", answers, expected=302)
+            measure("results", client, "get", "/results/")
+            measure("leaderboard", Client(), "get", "/leaderboard/")
+            measure("statistics", Client(), "get", "/analytics/")
+
+        views = {
+            view: {
+                "median_ms": round(statistics.median(timings[view]), 3),
+                "max_ms": round(max(timings[view]), 3),
+                "queries": max(queries[view]),
+                "writes": max(writes[view]),
+            }
+            for view in QUERY_BUDGETS
+        }
+        # Writes caused by each participant going through the whole funnel
+        per_participant = [sum(run) for run in zip(*map(writes.get, FUNNEL_VIEWS))]
+        return views, {
+            "median": statistics.median(per_participant),
+            "max": max(per_participant),
+        }
+
+    def _report(self, results, participant_writes):
+        for size, views in results.items():
+            self.stdout.write(f"{size} participants")
+            for view, result in views.items():
+                self.stdout.write(
+                    f"  {view:<12} {result['median_ms']:>9.2f} ms median "
+                    f"{result['max_ms']:>9.2f} ms max {result['queries']:>4} queries "
+                    f"{result['writes']:>3} writes"
+                )
+            self.stdout.write(
+                f"  writes per participant: {participant_writes[size]['median']:g} "
+                f"median, {participant_writes[size]['max']} max"
+            )
+
+    def _check(self, results, participant_writes, baseline_path, tolerance):
+        failures = []
+        for size, views in results.items():
+            for view, result in views.items():
+                if result["queries"] > QUERY_BUDGETS[view]:
+                    failures.append(
+                        f"{view} at {size}: {result['queries']} queries "
+                        f"(budget {QUERY_BUDGETS[view]})"
+                    )
+            if participant_writes[size]["max"] > PARTICIPANT_WRITE_BUDGET:
+                failures.append(
+                    f"{participant_writes[size]['max']} writes per participant "
+                    f"at {size} (budget {PARTICIPANT_WRITE_BUDGET})"
+                )
+
+        # Wall times depend on the machine and its load, so they are only
+        # compared against a baseline recorded locally
+        if baseline_path is None:
+            return failures
+        baseline = json.loads(Path(baseline_path).read_text())
+        for size, views in results.items():
+            for view, result in views.items():
+                reference = baseline.get(size, {}).get(view)
+                if reference is None:
+                    continue
+                if result["queries"] > reference["queries"]:
+                    failures.append(
+                        f"{view} at {size}: {result['queries']} queries "
+                        f"(baseline {reference['queries']})"
+                    )
+                limit = reference["median_ms"] * (1 + tolerance)
+                if result["median_ms"] > limit:
+                    failures.append(
+                        f"{view} at {size}: {result['median_ms']:.2f} ms median "
+                        f"(baseline {reference['median_ms']:.2f} ms)"
+                    )
+        return failures
@@ -0,0 +1,45 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from speedierwatch.sessions import CLEANUP_BATCH_SIZE, SessionStore
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired database sessions in short batches, so the cleanup "
+        "never holds the SQLite writer lock for long"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=CLEANUP_BATCH_SIZE,
+            help="Sessions deleted per transaction",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.05,
+            help="Seconds to sleep between batches, letting requests write",
+        )
+
+    def handle(self, *args, **options):
+        if settings.SESSION_ENGINE != "speedierwatch.sessions":
+            raise CommandError(
+                "SESSION_ENGINE is not speedierwatch.sessions; use clearsessions"
+            )
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive")
+        started = time.monotonic()
+        deleted = SessionStore.clear_expired(
+            batch_size=options["batch_size"], pause=options["pause"]
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted {deleted} expired sessions "
+                f"in {time.monotonic() - started:.1f}s"
+            )
+        )
@@ -0,0 +1,85 @@
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Max, Q
+
+from study.allocation import permuted_blocks
+from study.models import AllocationBlock
+
+
+class Command(BaseCommand):
+    help = "Append permuted blocks to the treatment allocation sequence"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--blocks",
+            type=int,
+            default=250,
+            help="Number of blocks to add per stratum",
+        )
+        parser.add_argument(
+            "--block-sizes",
+            default="4,6",
+            help="Comma-separated block sizes, picked at random per block",
+        )
+        parser.add_argument(
+            "--strata",
+            default="",
+            help="Comma-separated strata, e.g. direct,referred; none by default",
+        )
+        parser.add_argument("--seed", type=int, help="Seed of the sequence")
+        parser.add_argument(
+            "--status",
+            action="store_true",
+            help="Only report how many blocks are left per stratum",
+        )
+
+    def handle(self, *args, **options):
+        if options["status"]:
+            return self._status()
+        try:
+            sizes = [int(size) for size in options["block_sizes"].split(",")]
+        except ValueError:
+            raise CommandError("--block-sizes must be comma-separated integers")
+        if options["blocks"] < 1 or min(sizes) < 2:
+            raise CommandError("--blocks and every block size must be positive")
+        strata = options["strata"].split(",") if options["strata"] else [""]
+        rng = random.Random(options["seed"])
+
+        with transaction.atomic():
+            for stratum in strata:
+                last = AllocationBlock.objects.filter(stratum=stratum).aggregate(
+                    Max("position")
+                )["position__max"]
+                start = 0 if last is None else last + 1
+                try:
+                    blocks = permuted_blocks(options["blocks"], sizes, rng)
+                except ValueError as exc:
+                    raise CommandError(exc)
+                AllocationBlock.objects.bulk_create(
+                    AllocationBlock(
+                        stratum=stratum, position=start + i, assignments=assignments
+                    )
+                    for i, assignments in enumerate(blocks)
+                )
+                self.stdout.write(
+                    f"{stratum or 'all'}: blocks {start}-{start + len(blocks) - 1}, "
+                    f"{sum(map(len, blocks))} assignments"
+                )
+        self.stdout.write(self.style.SUCCESS("Allocation sequence extended"))
+
+    def _status(self):
+        rows = (
+            AllocationBlock.objects.values("stratum")
+            .annotate(
+                total=Count("pk"), free=Count("pk", filter=Q(reserved_at__isnull=True))
+            )
+            .order_by("stratum")
+        )
+        if not rows:
+            self.stdout.write("No allocation sequence; groups are assigned at random")
+        for row in rows:
+            self.stdout.write(
+                f"{row['stratum'] or 'all'}: {row['free']} of {row['total']} blocks free"
+            )
@@ -0,0 +1,261 @@
+import random
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from analytics import rollups
+from study import answers, leaderboard, tickets
+from study.models import (
+    AllocationBlock,
+    LeaderboardEntry,
+    Participant,
+    PlaybackEvent,
+    QuizResponse,
+    RaffleDraw,
+)
+from study.question_bank import get_question_bank
+
+
+class Command(BaseCommand):
+    help = "Generate a synthetic study dataset for scale testing"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--participants", type=int, default=10000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--completion-rate",
+            type=float,
+            default=0.85,
+            help="Share of participants who submit the quiz",
+        )
+        parser.add_argument(
+            "--referral-rate",
+            type=float,
+            default=0.4,
+            help="Share of participants who arrive through a referral link",
+        )
+        parser.add_argument(
+            "--max-depth",
+            type=int,
+            default=8,
+            help="Maximum depth of the generated referral trees",
+        )
+        parser.add_argument(
+            "--mean-score-1x",
+            type=float,
+            default=6.5,
+            help="Expected quiz score of the 1x group",
+        )
+        parser.add_argument(
+            "--mean-score-2x",
+            type=float,
+            default=6.0,
+            help="Expected quiz score of the 2x group",
+        )
+        parser.add_argument(
+            "--days",
+            type=float,
+            default=14,
+            help="Length of the simulated enrolment period",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help=(
+                "Delete all existing study data first (participants, responses, "
+                "playback events and raffle draws) and restart the allocation "
+                "sequence"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        n = options["participants"]
+        if n < 1:
+            raise CommandError("--participants must be positive")
+        for rate in ("completion_rate", "referral_rate"):
+            if not 0 <= options[rate] <= 1:
+                raise CommandError(f"--{rate.replace('_', '-')} must be in [0, 1]")
+
+        started = time.monotonic()
+        rng = np.random.default_rng(options["seed"])
+        tree_rng = random.Random(options["seed"])
+
+        if options["clear"]:
+            self._clear()
+
+        groups = rng.integers(1, 3, size=n)
+        completed = rng.random(n) < options["completion_rate"]
+        success = (
+            np.where(groups == 1, options["mean_score_1x"], options["mean_score_2x"])
+            / 10
+        )
+        scores = rng.binomial(10, np.clip(success, 0, 1))
+        parents = self._referral_forest(
+            completed, options["referral_rate"], options["max_depth"], tree_rng
+        )
+        ticket_cents = tickets.ticket_cents(scores, completed, parents)
+        packed_answers = self._answers(scores, rng)
+        answers_bank = get_question_bank().key_digest
+
+        enrolment = timedelta(days=options["days"])
+        first_created = timezone.now() - enrolment
+        created_offsets = np.sort(rng.random(n)) * enrolment.total_seconds()
+        quiz_seconds = rng.uniform(5 * 60, 30 * 60, size=n)
+
+        first_id = (
+            Participant.objects.order_by("-id").values_list("id", flat=True).first()
+            or 0
+        ) + 1
+        # Plain lists are much faster than NumPy scalars in the row loop
+        groups, completed_list, scores, packed_answers = (
+            groups.tolist(),
+            completed.tolist(),
+            scores.tolist(),
+            packed_answers.tolist(),
+        )
+        parent_list, ticket_cents = parents.tolist(), ticket_cents.tolist()
+        created_offsets, quiz_seconds = created_offsets.tolist(), quiz_seconds.tolist()
+
+        batch_size = options["batch_size"]
+        with transaction.atomic():
+            for start in range(0, n, batch_size):
+                stop = min(start + batch_size, n)
+                participants = []
+                responses = []
+                timestamps = {Participant: [], QuizResponse: []}
+                for i in range(start, stop):
+                    participant_id = first_id + i
+                    created_at = first_created + timedelta(seconds=created_offsets[i])
+                    participants.append(
+                        Participant(
+                            id=participant_id,
+                            name=f"Participant {participant_id}",
+                            email=f"participant{participant_id}@example.com",
+                            treatment_group=groups[i],
+                            referral_code=str(
+                                uuid.UUID(int=tree_rng.getrandbits(128), version=4)
+                            ),
+                            referred_by_id=(
+                                first_id + parent_list[i]
+                                if parent_list[i] >= 0
+                                else None
+                            ),
+                        )
+                    )
+                    timestamps[Participant].append(created_at)
+                    if completed_list[i]:
+                        responses.append(
+                            QuizResponse(
+                                participant_id=participant_id,
+                                score=scores[i],
+                                answers=packed_answers[i],
+                                answers_bank=answers_bank,
+                                raffle_tickets=Decimal(ticket_cents[i]).scaleb(-2),
+                            )
+                        )
+                        timestamps[QuizResponse].append(
+                            created_at + timedelta(seconds=quiz_seconds[i])
+                        )
+                Participant.objects.bulk_create(participants)
+                QuizResponse.objects.bulk_create(responses)
+                # Inserted with auto_now_add's current time; the simulated
+                # enrolment times are written over it
+                for model, objects, field in (
+                    (Participant, participants, "created_at"),
+                    (QuizResponse, responses, "submitted_at"),
+                ):
+                    self._backdate(model, objects, field, timestamps[model])
+                self.stdout.write(f"  {stop}/{n} participants")
+
+        # bulk_create skips the incremental maintenance, so rebuild once
+        leaderboard.rebuild()
+        rollups.rebuild()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Generated {n} participants ({int(completed.sum())} responses, "
+                f"{int((parents >= 0).sum())} referrals) "
+                f"in {time.monotonic() - started:.1f}s"
+            )
+        )
+
+    def _backdate(self, model, objects, field, values):
+        """
+        Set `field` of the saved `objects` to `values` with bulk_update
+        """
+        for obj, value in zip(objects, values):
+            setattr(obj, field, value)
+        model.objects.bulk_update(objects, [field])
+
+    def _clear(self):
+        """
+        Delete all study data, tables referencing participants first, free
+        every allocation block, and reset the leaderboard and score rollups
+        (bumping both data versions) to match
+        """
+        with transaction.atomic():
+            for model in (
+                PlaybackEvent,
+                LeaderboardEntry,
+                QuizResponse,
+                RaffleDraw,
+                Participant,
+            ):
+                # One DELETE per table, without collecting the rows for the
+                # cascade and the per-row delete signals
+                queryset = model.objects.all()
+                queryset._raw_delete(queryset.db)
+            AllocationBlock.objects.update(reserved_at=None, reserved_by="")
+            leaderboard.rebuild()
+            rollups.rebuild()
+
+    def _answers(self, scores, rng):
+        """
+        Packed answers with exactly `score` correct ones per participant.
+
+        Questions get a random easiness and distractors a random appeal, so
+        the item analysis has something to find. Correct questions are a
+        weighted sample without replacement (Gumbel top-k) by easiness.
+        """
+        bank = get_question_bank()
+        count = len(bank.questions)
+        correct = np.array(
+            [answers.CODES[question.correct_answer] for question in bank.questions]
+        )
+        easiness = rng.uniform(0.5, 2.0, size=count)
+        keys = np.log(easiness) + rng.gumbel(size=(len(scores), count))
+        ranks = np.argsort(np.argsort(-keys, axis=1), axis=1)
+        is_correct = ranks < np.minimum(scores, count)[:, None]
+
+        # Wrong answers: one of the three other options, by per-question appeal
+        appeal = rng.dirichlet(np.full(3, 2.0), size=count).cumsum(axis=1)
+        offsets = 1 + (rng.random((len(scores), count, 1)) > appeal[:, :2]).sum(axis=2)
+        wrong = (correct - 1 + offsets) % 4 + 1
+        return answers.pack_matrix(np.where(is_correct, correct, wrong))
+
+    def _referral_forest(self, completed, referral_rate, max_depth, tree_rng):
+        """
+        Pick a referrer among earlier quiz completers for referred participants.
+
+        Returns the parent index per participant, -1 for none.
+        """
+        n = len(completed)
+        parents = np.full(n, -1, dtype=np.int64)
+        depth = np.zeros(n, dtype=np.int64)
+        # Only completers see their referral link on the results page
+        referrers = []
+        for i in range(n):
+            if referrers and tree_rng.random() < referral_rate:
+                parent = referrers[tree_rng.randrange(len(referrers))]
+                parents[i] = parent
+                depth[i] = depth[parent] + 1
+            if completed[i] and depth[i] < max_depth:
+                referrers.append(i)
+        return parents
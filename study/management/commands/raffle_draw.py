@@ -0,0 +1,122 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from study import raffle
+from study.models import RaffleDraw
+
+
+class Command(BaseCommand):
+    help = "Draw raffle winners weighted by tickets, replay a draw, or simulate draws"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--winners", type=int, default=1, help="Number of winners to draw"
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            help="Seed of the draw; a random one is picked and recorded by default",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Draw without recording the result",
+        )
+        parser.add_argument(
+            "--replay",
+            type=int,
+            metavar="DRAW_ID",
+            help="Redraw a recorded draw and check that it gives the same winners",
+        )
+        parser.add_argument(
+            "--simulate",
+            type=int,
+            metavar="RUNS",
+            help="Estimate every entrant's win probability from RUNS simulated draws",
+        )
+        parser.add_argument(
+            "--top",
+            type=int,
+            default=20,
+            help="Entrants listed after --simulate",
+        )
+        parser.add_argument(
+            "--csv",
+            action="store_true",
+            help="With --simulate, print the probability of every entrant as CSV",
+        )
+
+    def handle(self, *args, **options):
+        if options["replay"] is not None:
+            return self._replay(options["replay"])
+        if options["winners"] < 0:
+            raise CommandError("--winners must not be negative")
+        if options["simulate"] is not None:
+            return self._simulate(options)
+
+        started = time.monotonic()
+        try:
+            raffle_draw = raffle.run_draw(
+                options["winners"], options["seed"], record=not options["dry_run"]
+            )
+        except ValueError as exc:
+            raise CommandError(exc)
+        for place, participant_id in enumerate(raffle_draw.winners, start=1):
+            self.stdout.write(f"{place}. participant {participant_id}")
+        recorded = f"draw {raffle_draw.pk}" if raffle_draw.pk else "not recorded"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Drew {raffle_draw.winner_count} of {raffle_draw.entrants} entrants "
+                f"with seed {raffle_draw.seed} ({recorded}) "
+                f"in {time.monotonic() - started:.3f}s"
+            )
+        )
+
+    def _replay(self, draw_id):
+        try:
+            raffle_draw = RaffleDraw.objects.get(pk=draw_id)
+        except RaffleDraw.DoesNotExist:
+            raise CommandError(f"No raffle draw {draw_id}")
+        same_weights, same_winners = raffle.replay(raffle_draw)
+        if not same_weights:
+            self.stdout.write(
+                self.style.WARNING("Ticket totals changed since the draw was recorded")
+            )
+        if not same_winners:
+            raise CommandError(f"Draw {draw_id} does not replay to the same winners")
+        self.stdout.write(self.style.SUCCESS(f"Draw {draw_id} replays identically"))
+
+    def _simulate(self, options):
+        if options["simulate"] < 1:
+            raise CommandError("--simulate must be positive")
+        seed = raffle.new_seed() if options["seed"] is None else options["seed"]
+        ids, cents = raffle.load_weights()
+        started = time.monotonic()
+        try:
+            chances = raffle.simulate(
+                cents, options["winners"], options["simulate"], seed
+            )
+        except ValueError as exc:
+            raise CommandError(exc)
+
+        if options["csv"]:
+            writer = csv.writer(self.stdout)
+            writer.writerow(("participant_id", "tickets", "win_probability"))
+            for participant_id, entrant_cents, chance in zip(
+                ids.tolist(), cents.tolist(), chances.tolist()
+            ):
+                writer.writerow((participant_id, entrant_cents / 100, chance))
+            return
+
+        for position in chances.argsort()[::-1][: options["top"]].tolist():
+            self.stdout.write(
+                f"participant {ids[position]}: {cents[position] / 100:.2f} tickets, "
+                f"{chances[position]:.2%}"
+            )
+        self.stdout.write(
+            f"{options['simulate']} simulated draws of {options['winners']} winners "
+            f"among {len(ids)} entrants (seed {seed}) "
+            f"in {time.monotonic() - started:.1f}s"
+        )
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from study import leaderboard
+
+
+class Command(BaseCommand):
+    help = "Rebuild the denormalized leaderboard table from quiz responses"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of rows read and written per batch",
+        )
+
+    def handle(self, *args, **options):
+        count = leaderboard.rebuild(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} leaderboard entries"))
@@ -0,0 +1,60 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand
+
+from study import tickets
+
+
+class Command(BaseCommand):
+    help = "Recompute every raffle ticket total from scores and the referral forest"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report the responses whose tickets would change",
+        )
+        parser.add_argument(
+            "--csv",
+            action="store_true",
+            help="With --dry-run, print one CSV row per change",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of rows written per batch",
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        if options["dry_run"]:
+            changes = tickets.diff()
+            if options["csv"]:
+                writer = csv.writer(self.stdout)
+                writer.writerow(("participant_id", "stored", "recomputed", "delta"))
+                for participant_id, stored, recomputed in changes:
+                    writer.writerow(
+                        (participant_id, stored, recomputed, recomputed - stored)
+                    )
+                return
+            for participant_id, stored, recomputed in changes[:50]:
+                self.stdout.write(
+                    f"participant {participant_id}: {stored} -> {recomputed} "
+                    f"({recomputed - stored:+})"
+                )
+            if len(changes) > 50:
+                self.stdout.write(f"... and {len(changes) - 50} more")
+            self.stdout.write(
+                f"{len(changes)} responses would change "
+                f"(checked in {time.monotonic() - started:.1f}s)"
+            )
+            return
+
+        count = tickets.recompute(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Updated {count} responses in {time.monotonic() - started:.1f}s"
+            )
+        )
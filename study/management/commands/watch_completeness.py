@@ -0,0 +1,56 @@
+import csv
+
+from django.core.management.base import BaseCommand
+
+from study import telemetry
+
+FIELDS = (
+    "participant_id",
+    "treatment_group",
+    "events",
+    "furthest",
+    "duration",
+    "completeness",
+    "ended",
+    "hidden",
+    "off_speed",
+    "rate_changes",
+    "first_seen",
+    "last_seen",
+)
+
+
+class Command(BaseCommand):
+    help = "Report how much of the video each participant watched, and at which speed"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--csv",
+            action="store_true",
+            help="Print one CSV row per participant instead of the summary",
+        )
+
+    def handle(self, *args, **options):
+        rollup = telemetry.completeness()
+
+        if options["csv"]:
+            writer = csv.writer(self.stdout)
+            writer.writerow(FIELDS)
+            for participant_id, row in rollup.items():
+                row = {**row, "participant_id": participant_id}
+                writer.writerow(row[field] for field in FIELDS)
+            return
+
+        for group in sorted({row["treatment_group"] for row in rollup.values()}):
+            rows = [row for row in rollup.values() if row["treatment_group"] == group]
+            shares = [
+                row["completeness"] for row in rows if row["completeness"] is not None
+            ]
+            mean = sum(shares) / len(shares) if shares else 0.0
+            self.stdout.write(
+                f"{group}x: {len(rows)} participants, "
+                f"{sum(row['ended'] for row in rows)} watched to the end, "
+                f"mean completeness {mean:.1%}, "
+                f"{sum(row['off_speed'] > 0 for row in rows)} seen off speed, "
+                f"{sum(row['rate_changes'] > 0 for row in rows)} tried to change it"
+            )
@@ -6,10 +6,15 @@ from study.migrations.operations.update_raffle_tickets import (
 
 
 class Migration(migrations.Migration):
+    # Each backfill chunk commits on its own, keeping the write lock short
+    atomic = False
+
     dependencies = [
         ("study", "0004_add_referral_fields"),
     ]
 
     operations = [
-        migrations.RunPython(update_raffle_tickets, reverse_update_raffle_tickets),
+        migrations.RunPython(
+            update_raffle_tickets, reverse_update_raffle_tickets, atomic=False
+        ),
     ]
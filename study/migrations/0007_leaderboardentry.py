@@ -0,0 +1,55 @@
+# Generated by Django 5.0.2 on 2026-10-18 13:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+from study.migrations.operations.populate_leaderboard import (
+    populate_leaderboard,
+    clear_leaderboard,
+)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("study", "0006_change_tickets_to_decimal"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LeaderboardEntry",
+            fields=[
+                (
+                    "participant",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="leaderboard_entry",
+                        serialize=False,
+                        to="study.participant",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100)),
+                ("referral_code", models.CharField(max_length=36)),
+                ("score", models.IntegerField()),
+                (
+                    "raffle_tickets",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=10),
+                ),
+                ("referral_count", models.IntegerField(default=0)),
+                (
+                    "rank",
+                    models.IntegerField(
+                        help_text="1 + number of entries with strictly more raffle tickets"
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["raffle_tickets"], name="study_leade_raffle__52fe18_idx"
+                    ),
+                    models.Index(fields=["rank"], name="study_leade_rank_7df2c6_idx"),
+                ],
+            },
+        ),
+        migrations.RunPython(populate_leaderboard, clear_leaderboard),
+    ]
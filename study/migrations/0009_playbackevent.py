@@ -0,0 +1,76 @@
+# Generated by Django 5.0.2 on 2026-10-18 13:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("study", "0008_dataversion"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PlaybackEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.PositiveSmallIntegerField(
+                        choices=[
+                            (0, "play"),
+                            (1, "progress"),
+                            (2, "ratechange"),
+                            (3, "ended"),
+                            (4, "pause"),
+                            (5, "hidden"),
+                        ]
+                    ),
+                ),
+                (
+                    "client_ms",
+                    models.PositiveIntegerField(
+                        help_text="Milliseconds since the video page loaded"
+                    ),
+                ),
+                (
+                    "position",
+                    models.FloatField(help_text="Playback position in seconds"),
+                ),
+                ("playback_rate", models.FloatField()),
+                (
+                    "duration",
+                    models.FloatField(
+                        blank=True,
+                        help_text="Video length reported by the browser",
+                        null=True,
+                    ),
+                ),
+                ("received_at", models.DateTimeField()),
+                (
+                    "participant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="playback_events",
+                        to="study.participant",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["participant", "client_ms"],
+                        name="study_playb_partici_736401_idx",
+                    )
+                ],
+            },
+        ),
+    ]
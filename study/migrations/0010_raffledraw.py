@@ -0,0 +1,47 @@
+# Generated by Django 5.0.2 on 2026-10-18 13:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("study", "0009_playbackevent"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RaffleDraw",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("seed", models.BigIntegerField()),
+                ("winner_count", models.PositiveIntegerField()),
+                ("entrants", models.PositiveIntegerField()),
+                (
+                    "total_cents",
+                    models.BigIntegerField(
+                        help_text="Sum of all entrants' raffle tickets, in hundredths"
+                    ),
+                ),
+                (
+                    "weights_digest",
+                    models.CharField(
+                        help_text="SHA-256 of the entrant ids and ticket totals",
+                        max_length=64,
+                    ),
+                ),
+                (
+                    "winners",
+                    models.JSONField(help_text="Winning participant ids in draw order"),
+                ),
+                ("drawn_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.0.2 on 2026-10-18 13:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("study", "0010_raffledraw"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AllocationBlock",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("stratum", models.CharField(blank=True, default="", max_length=50)),
+                (
+                    "position",
+                    models.PositiveIntegerField(
+                        help_text="Order of the block within its stratum"
+                    ),
+                ),
+                (
+                    "assignments",
+                    models.CharField(
+                        help_text="Treatment groups in assignment order, e.g. 2112",
+                        max_length=64,
+                    ),
+                ),
+                ("reserved_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "reserved_by",
+                    models.CharField(blank=True, default="", max_length=100),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["stratum", "reserved_at", "position"],
+                        name="study_alloc_stratum_3c6aff_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="allocationblock",
+            constraint=models.UniqueConstraint(
+                fields=("stratum", "position"), name="unique_block_position"
+            ),
+        ),
+    ]
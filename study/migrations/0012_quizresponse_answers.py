@@ -0,0 +1,21 @@
+# Generated by Django 5.0.2 on 2026-10-18 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("study", "0011_allocationblock"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="quizresponse",
+            name="answers",
+            field=models.BigIntegerField(
+                blank=True,
+                help_text="Chosen options packed 3 bits per question (see study.answers); empty for responses recorded before answers were stored",
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.0.2 on 2026-10-18 14:27
+
+import hashlib
+import json
+from pathlib import Path
+
+from django.db import migrations, models
+
+from study.migrations.operations.backfill import chunked_update
+
+QUESTIONS_PATH = Path(__file__).resolve().parent.parent / "data" / "questions.json"
+
+
+def answer_key_digest(path=QUESTIONS_PATH):
+    """
+    study.question_bank.answer_key_digest() of the question bank file as
+    it was computed when this migration was written
+    """
+    entries = json.loads(Path(path).read_bytes())["questions"]
+    content = json.dumps(
+        [
+            [
+                str(entry["text"]),
+                entry["correct_answer"],
+                [[letter, str(entry[f"option_{letter.lower()}"])] for letter in "ABCD"],
+            ]
+            for entry in entries
+        ]
+    )
+    return hashlib.sha256(content.encode()).hexdigest()[:16]
+
+
+def stamp_answers_bank(apps, schema_editor):
+    """
+    Mark the answers stored so far as given against the current question
+    bank, the only one in use since answers were first stored (0012)
+    """
+    QuizResponse = apps.get_model("study", "QuizResponse")
+    queryset = QuizResponse.objects.using(schema_editor.connection.alias).filter(
+        answers__isnull=False
+    )
+    if queryset.exists():
+        chunked_update(queryset, {"answers_bank": answer_key_digest()})
+
+
+class Migration(migrations.Migration):
+    # Each backfill chunk commits on its own, keeping the write lock short
+    atomic = False
+
+    dependencies = [
+        ("study", "0012_quizresponse_answers"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="quizresponse",
+            name="answers_bank",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="key_digest of the question bank the answers were given against",
+                max_length=16,
+            ),
+        ),
+        migrations.RunPython(
+            stamp_answers_bank, migrations.RunPython.noop, atomic=False
+        ),
+    ]
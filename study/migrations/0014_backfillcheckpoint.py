@@ -0,0 +1,29 @@
+# Generated by Django 5.0.2 on 2026-10-18 14:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("study", "0013_quizresponse_answers_bank"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BackfillCheckpoint",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=200, primary_key=True, serialize=False),
+                ),
+                (
+                    "last_pk",
+                    models.BigIntegerField(
+                        help_text="Primary key of the last row done"
+                    ),
+                ),
+                ("rows_done", models.BigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
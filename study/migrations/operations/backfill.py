@@ -0,0 +1,32 @@
+"""
+Chunked updates for data migrations.
+
+A frozen copy of the chunk loop of study.backfill.Backfill, so that
+migrations keep doing what they did when they were written however that
+module changes later. It keeps no checkpoints: the migrations using it run
+before the checkpoint table exists (0014), and are written so that an
+interrupted run can start over.
+"""
+
+from django.db import transaction
+
+
+def chunked_update(queryset, changes, chunk_size=1000):
+    """
+    Apply `changes` (field -> value or expression, as for QuerySet.update())
+    to `queryset` in primary-key order, one short transaction per chunk.
+
+    Returns the number of rows updated.
+    """
+    queryset = queryset.order_by("pk")
+    done = 0
+    last_pk = None
+    while True:
+        remaining = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        pks = list(remaining.values_list("pk", flat=True)[:chunk_size])
+        if not pks:
+            return done
+        with transaction.atomic(using=queryset.db):
+            remaining.filter(pk__lte=pks[-1]).update(**changes)
+        last_pk = pks[-1]
+        done += len(pks)
@@ -0,0 +1,74 @@
+from django.db.models import Count, Q
+
+CHUNK_SIZE = 1000
+
+
+def populate_leaderboard(apps, schema_editor):
+    """
+    Fill the leaderboard table from existing quiz responses, a chunk at a
+    time so memory stays flat however many responses there are
+    """
+    QuizResponse = apps.get_model("study", "QuizResponse")
+    Participant = apps.get_model("study", "Participant")
+    LeaderboardEntry = apps.get_model("study", "LeaderboardEntry")
+    using = schema_editor.connection.alias
+
+    responses = QuizResponse.objects.using(using).order_by(
+        "-raffle_tickets", "participant_id"
+    )
+    position = 0
+    rank = 0
+    previous_tickets = None
+    last_id = None
+    while True:
+        # Keyset pagination in leaderboard order, after the last row written
+        remaining = responses
+        if previous_tickets is not None:
+            remaining = responses.filter(
+                Q(raffle_tickets__lt=previous_tickets)
+                | Q(raffle_tickets=previous_tickets, participant_id__gt=last_id)
+            )
+        chunk = list(
+            remaining.values_list(
+                "participant_id",
+                "participant__name",
+                "participant__referral_code",
+                "score",
+                "raffle_tickets",
+            )[:CHUNK_SIZE]
+        )
+        if not chunk:
+            return
+        referral_counts = dict(
+            Participant.objects.using(using)
+            .filter(referred_by__in=[row[0] for row in chunk])
+            .values_list("referred_by")
+            .annotate(count=Count("id"))
+            .values_list("referred_by", "count")
+        )
+
+        entries = []
+        for participant_id, name, referral_code, score, tickets in chunk:
+            position += 1
+            if tickets != previous_tickets:
+                rank = position
+                previous_tickets = tickets
+            entries.append(
+                LeaderboardEntry(
+                    participant_id=participant_id,
+                    name=name,
+                    referral_code=referral_code,
+                    score=score,
+                    raffle_tickets=tickets,
+                    referral_count=referral_counts.get(participant_id, 0),
+                    rank=rank,
+                )
+            )
+        LeaderboardEntry.objects.using(using).bulk_create(entries)
+        last_id = chunk[-1][0]
+
+
+def clear_leaderboard(apps, schema_editor):
+    """
+    Reverse operation - the table is dropped, nothing to undo
+    """
@@ -1,14 +1,17 @@
+from django.db.models import Case, F, IntegerField, When
+from django.db.models.functions import Power
+
+from .backfill import chunked_update
+
+
 def update_raffle_tickets(apps, schema_editor):
     """
     Update raffle tickets for existing entries to be 2 times their score
     """
     QuizResponse = apps.get_model("study", "QuizResponse")
+    queryset = QuizResponse.objects.using(schema_editor.connection.alias)
 
-    # Get all existing quiz responses
-    for response in QuizResponse.objects.all():
-        # Update raffle tickets to be 2 times the score
-        response.raffle_tickets = 2 * response.score
-        response.save()
+    chunked_update(queryset, {"raffle_tickets": F("score") * 2})
 
 
 def reverse_update_raffle_tickets(apps, schema_editor):
@@ -16,9 +19,15 @@ def reverse_update_raffle_tickets(apps, schema_editor):
     Reverse operation - revert to original raffle tickets (which was 2^score)
     """
     QuizResponse = apps.get_model("study", "QuizResponse")
+    queryset = QuizResponse.objects.using(schema_editor.connection.alias)
 
-    # Get all existing quiz responses
-    for response in QuizResponse.objects.all():
-        # Revert to original formula (2^score)
-        response.raffle_tickets = 2**response.score if response.score > 0 else 0
-        response.save()
+    chunked_update(
+        queryset,
+        {
+            "raffle_tickets": Case(
+                When(score__gt=0, then=Power(2, F("score"))),
+                default=0,
+                output_field=IntegerField(),
+            )
+        },
+    )
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 import uuid
 
@@ -37,6 +38,18 @@ class QuizResponse(models.Model):
         validators=[MinValueValidator(0), MaxValueValidator(10)],
         help_text="Score out of 10",
     )
+    answers = models.BigIntegerField(
+        null=True,
+        blank=True,
+        help_text="Chosen options packed 3 bits per question (see study.answers); "
+        "empty for responses recorded before answers were stored",
+    )
+    answers_bank = models.CharField(
+        max_length=16,
+        blank=True,
+        default="",
+        help_text="key_digest of the question bank the answers were given against",
+    )
     raffle_tickets = models.DecimalField(
         max_digits=10,
         decimal_places=2,
@@ -47,3 +60,151 @@ class QuizResponse(models.Model):
 
     def __str__(self):
         return f"{self.participant.name}'s Quiz - Score: {self.score}/10, Tickets: {self.raffle_tickets:.2f}"
+
+
+class LeaderboardEntry(models.Model):
+    """
+    Denormalized leaderboard row, maintained incrementally by study.leaderboard
+    """
+
+    participant = models.OneToOneField(
+        Participant,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="leaderboard_entry",
+    )
+    name = models.CharField(max_length=100)
+    referral_code = models.CharField(max_length=36)
+    score = models.IntegerField()
+    raffle_tickets = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    referral_count = models.IntegerField(default=0)
+    rank = models.IntegerField(
+        help_text="1 + number of entries with strictly more raffle tickets"
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["raffle_tickets"]),
+            models.Index(fields=["rank"]),
+        ]
+
+    def __str__(self):
+        return f"#{self.rank} {self.name} - Tickets: {self.raffle_tickets:.2f}"
+
+
+class DataVersion(models.Model):
+    """
+    Counter bumped whenever the data behind a cached page changes
+    """
+
+    key = models.CharField(max_length=50, primary_key=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.key} v{self.version}"
+
+
+class PlaybackEvent(models.Model):
+    """
+    Append-only video playback event, written in batches by study.telemetry
+    """
+
+    PLAY = 0
+    PROGRESS = 1
+    RATECHANGE = 2
+    ENDED = 3
+    PAUSE = 4
+    HIDDEN = 5
+    KIND_CHOICES = [
+        (PLAY, "play"),
+        (PROGRESS, "progress"),
+        (RATECHANGE, "ratechange"),
+        (ENDED, "ended"),
+        (PAUSE, "pause"),
+        (HIDDEN, "hidden"),
+    ]
+
+    participant = models.ForeignKey(
+        Participant, on_delete=models.CASCADE, related_name="playback_events"
+    )
+    kind = models.PositiveSmallIntegerField(choices=KIND_CHOICES)
+    client_ms = models.PositiveIntegerField(
+        help_text="Milliseconds since the video page loaded"
+    )
+    position = models.FloatField(help_text="Playback position in seconds")
+    playback_rate = models.FloatField()
+    duration = models.FloatField(
+        null=True, blank=True, help_text="Video length reported by the browser"
+    )
+    received_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [models.Index(fields=["participant", "client_ms"])]
+
+    def __str__(self):
+        return f"{self.participant_id} {self.get_kind_display()} @ {self.position:.1f}s"
+
+
+class RaffleDraw(models.Model):
+    """
+    A weighted raffle draw, recorded so that it can be replayed by study.raffle
+    """
+
+    seed = models.BigIntegerField()
+    winner_count = models.PositiveIntegerField()
+    entrants = models.PositiveIntegerField()
+    total_cents = models.BigIntegerField(
+        help_text="Sum of all entrants' raffle tickets, in hundredths"
+    )
+    weights_digest = models.CharField(
+        max_length=64, help_text="SHA-256 of the entrant ids and ticket totals"
+    )
+    winners = models.JSONField(help_text="Winning participant ids in draw order")
+    drawn_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Draw {self.pk}: {self.winner_count} of {self.entrants} entrants"
+
+
+class AllocationBlock(models.Model):
+    """
+    A permuted block of the pre-generated treatment allocation sequence,
+    handed out whole to one worker by study.allocation
+    """
+
+    stratum = models.CharField(max_length=50, blank=True, default="")
+    position = models.PositiveIntegerField(
+        help_text="Order of the block within its stratum"
+    )
+    assignments = models.CharField(
+        max_length=64, help_text="Treatment groups in assignment order, e.g. 2112"
+    )
+    reserved_at = models.DateTimeField(null=True, blank=True)
+    reserved_by = models.CharField(max_length=100, blank=True, default="")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["stratum", "position"], name="unique_block_position"
+            )
+        ]
+        indexes = [models.Index(fields=["stratum", "reserved_at", "position"])]
+
+    def __str__(self):
+        stratum = self.stratum or "all"
+        return f"{stratum} block {self.position}: {self.assignments}"
+
+
+class BackfillCheckpoint(models.Model):
+    """
+    Progress of an unfinished study.backfill.Backfill, deleted once it completes
+    """
+
+    name = models.CharField(max_length=200, primary_key=True)
+    last_pk = models.BigIntegerField(help_text="Primary key of the last row done")
+    rows_done = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.rows_done} rows, after pk {self.last_pk}"
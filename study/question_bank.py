@@ -0,0 +1,160 @@
+"""
+In-process cache of the quiz question bank.
+
+The bank is parsed and validated once per worker and only re-read when the
+file on disk changes, so quiz requests never pay for file I/O or JSON parsing.
+"""
+
+import hashlib
+import json
+import os
+import random
+import threading
+from pathlib import Path
+from typing import NamedTuple
+
+from django.core.exceptions import ImproperlyConfigured
+
+QUESTIONS_PATH = Path(__file__).parent / "data" / "questions.json"
+
+OPTION_LETTERS = ("A", "B", "C", "D")
+
+# Stored answers take ANSWER_BITS bits per question of one signed 64-bit
+# integer (see study.answers), which bounds the size of the bank
+ANSWER_BITS = 3
+MAX_QUESTIONS = 63 // ANSWER_BITS
+
+
+class Question(NamedTuple):
+    id: int
+    text: str
+    correct_answer: str
+    options: tuple  # ((letter, text), ...) in A-D order
+
+
+class QuestionBank(NamedTuple):
+    questions: tuple
+    by_id: dict
+    digest: str  # of the file, to notice changes on disk
+    key_digest: str  # of what stored answers refer to, see answer_key_digest()
+
+
+_lock = threading.Lock()
+_bank = None
+_stat_key = None
+
+
+def _parse(raw):
+    try:
+        payload = json.loads(raw)
+        entries = payload["questions"]
+    except (ValueError, KeyError, TypeError) as exc:
+        raise ImproperlyConfigured(f"Malformed question bank: {exc}") from exc
+
+    questions = []
+    for index, entry in enumerate(entries):
+        try:
+            options = tuple(
+                (letter, str(entry[f"option_{letter.lower()}"]))
+                for letter in OPTION_LETTERS
+            )
+            question = Question(
+                id=index,
+                text=str(entry["text"]),
+                correct_answer=entry["correct_answer"],
+                options=options,
+            )
+        except (KeyError, TypeError) as exc:
+            raise ImproperlyConfigured(
+                f"Question {index} in the question bank is missing {exc}"
+            ) from exc
+        if question.correct_answer not in OPTION_LETTERS:
+            raise ImproperlyConfigured(
+                f"Question {index} has invalid correct_answer "
+                f"{question.correct_answer!r}"
+            )
+        questions.append(question)
+
+    if not questions:
+        raise ImproperlyConfigured("The question bank is empty")
+    if len(questions) > MAX_QUESTIONS:
+        raise ImproperlyConfigured(
+            f"The question bank has {len(questions)} questions; "
+            f"at most {MAX_QUESTIONS} are supported"
+        )
+
+    questions = tuple(questions)
+    return QuestionBank(
+        questions=questions,
+        by_id={question.id: question for question in questions},
+        digest=hashlib.sha256(raw).hexdigest(),
+        key_digest=answer_key_digest(questions),
+    )
+
+
+def answer_key_digest(questions):
+    """
+    Short digest of the questions in bank order with their options and
+    correct answers: everything packed answers are decoded and scored
+    against, but not the file's formatting
+    """
+    content = json.dumps(
+        [
+            [question.text, question.correct_answer, question.options]
+            for question in questions
+        ]
+    )
+    return hashlib.sha256(content.encode()).hexdigest()[:16]
+
+
+def get_question_bank(path=QUESTIONS_PATH):
+    """
+    Return the cached question bank, reloading it if the file has changed
+    """
+    global _bank, _stat_key
+
+    stat = os.stat(path)
+    stat_key = (str(path), stat.st_mtime_ns, stat.st_size)
+    if _bank is not None and stat_key == _stat_key:
+        return _bank
+
+    with _lock:
+        if _bank is not None and stat_key == _stat_key:
+            return _bank
+        raw = Path(path).read_bytes()
+        # A touched but unchanged file keeps the already parsed bank
+        if _bank is None or hashlib.sha256(raw).hexdigest() != _bank.digest:
+            _bank = _parse(raw)
+        _stat_key = stat_key
+        return _bank
+
+
+def shuffled_questions(seed, bank=None):
+    """
+    Return the bank's questions in the order determined by a quiz seed
+    """
+    bank = bank or get_question_bank()
+    questions = list(bank.questions)
+    random.Random(seed).shuffle(questions)
+    return questions
+
+
+def option_rng(seed):
+    """
+    Return the generator used to order answer options for a quiz seed
+    """
+    return random.Random(f"{seed}:options")
+
+
+def option_orders(seed, questions):
+    """
+    Return the (letter, text) options of each question in the order shown
+    for a quiz seed
+    """
+    rng = option_rng(seed)
+    orders = []
+    for question in questions:
+        options = list(question.options)
+        rng.shuffle(options)
+        orders.append(tuple(options))
+    return orders
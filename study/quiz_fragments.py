@@ -0,0 +1,63 @@
+"""
+Pre-rendered quiz question blocks.
+
+A question block only depends on the question and the order of its options,
+apart from the position it is shown at. Each (question, option order) is
+rendered through the form widgets once per worker with placeholders for the
+position, and the quiz page is assembled from these fragments in the
+participant's order without building a QuizForm.
+"""
+
+import re
+from functools import lru_cache
+
+from django import forms
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .forms import question_field
+from .question_bank import get_question_bank, option_orders, shuffled_questions
+
+# Stand-ins for the 0-based field index and the 1-based question number
+INDEX = "__index__"
+NUMBER = "__number__"
+PLACEHOLDERS = re.compile(f"({INDEX}|{NUMBER})")
+
+# Questions x 24 option orders; well above what a bank of quiz size needs
+MAX_FRAGMENTS = 4096
+
+
+@lru_cache(maxsize=MAX_FRAGMENTS)
+def question_parts(digest, question, options):
+    """
+    Render the block for `question` with `options`, split at the placeholders.
+
+    `digest` identifies the question bank, so an edited bank never serves
+    stale fragments.
+    """
+    name = f"question_{INDEX}"
+    form = forms.Form()
+    form.fields[name] = question_field(question, options)
+    html = render_to_string(
+        "study/quiz_question.html", {"field": form[name], "number": NUMBER}
+    )
+    return tuple(PLACEHOLDERS.split(html))
+
+
+def render_question(parts, position):
+    values = {INDEX: str(position), NUMBER: str(position + 1)}
+    return mark_safe("".join(values.get(part, part) for part in parts))
+
+
+def question_fragments(seed):
+    """
+    Return the rendered question blocks of a quiz seed, in display order
+    """
+    bank = get_question_bank()
+    questions = shuffled_questions(seed, bank)
+    return [
+        render_question(question_parts(bank.digest, question, options), position)
+        for position, (question, options) in enumerate(
+            zip(questions, option_orders(seed, questions))
+        )
+    ]
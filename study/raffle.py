@@ -0,0 +1,156 @@
+"""
+Weighted raffle draws over QuizResponse.raffle_tickets.
+
+Ticket totals are loaded once as integer hundredths of a ticket, in
+participant id order, and turned into a cumulative sum. A winner is drawn by
+picking a uniform integer below the total and binary-searching the prefix
+sums, so each draw costs O(log n). Winners are drawn without replacement by
+rejecting repeats; when repeats become common the prefix sums are rebuilt
+without the winners. Every draw is a pure function of the weights and the
+seed, and RaffleDraw records both (the weights as a digest), so any draw can
+be replayed and audited.
+"""
+
+import hashlib
+import secrets
+
+import numpy as np
+from django.db import connection
+
+from .models import QuizResponse, RaffleDraw
+
+RESPONSES = QuizResponse._meta.db_table
+
+# Rebuild the prefix sums once more than this share of a batch are repeats
+MAX_REJECTION_RATE = 0.5
+
+# Cells of the (runs x entrants) key matrix handled at once when simulating
+SIMULATION_BLOCK = 4_000_000
+
+
+def load_weights():
+    """
+    Return (participant ids, ticket cents) of every entrant with tickets
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT participant_id, CAST(ROUND(raffle_tickets * 100) AS INTEGER)
+            FROM {RESPONSES}
+            WHERE raffle_tickets > 0
+            ORDER BY participant_id
+            """
+        )
+        rows = np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, 2)
+    return rows[:, 0], rows[:, 1]
+
+
+def weights_digest(ids, cents):
+    """
+    SHA-256 of the entrant list, to check that a replay saw the same weights
+    """
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(ids, dtype="<i8").tobytes())
+    digest.update(np.ascontiguousarray(cents, dtype="<i8").tobytes())
+    return digest.hexdigest()
+
+
+def new_seed():
+    return secrets.randbits(63)
+
+
+def draw(cents, k, seed):
+    """
+    Draw k distinct entrants with probability proportional to `cents`.
+
+    Returns their positions in draw order.
+    """
+    cents = np.asarray(cents, dtype=np.int64)
+    if k > np.count_nonzero(cents):
+        raise ValueError(f"Cannot draw {k} winners from {np.count_nonzero(cents)}")
+    rng = np.random.default_rng(seed)
+    remaining = cents.copy()
+    cumulative = np.cumsum(remaining)
+    winners = []
+    chosen = set()
+    while len(winners) < k:
+        needed = k - len(winners)
+        picks = np.searchsorted(
+            cumulative, rng.integers(0, cumulative[-1], size=needed), side="right"
+        )
+        rejected = 0
+        for position in picks.tolist():
+            if position in chosen:
+                rejected += 1
+                continue
+            chosen.add(position)
+            winners.append(position)
+        if rejected > MAX_REJECTION_RATE * needed:
+            # Most of the weight is taken; drop the winners and start over
+            remaining[winners] = 0
+            cumulative = np.cumsum(remaining)
+    return winners
+
+
+def simulate(cents, k, runs, seed):
+    """
+    Estimate every entrant's chance of being among k winners from `runs`
+    simulated draws.
+
+    Uses the Gumbel top-k trick: the k largest log(weight) + Gumbel noise
+    follow the same distribution as k successive draws without replacement.
+    """
+    cents = np.asarray(cents, dtype=np.int64)
+    n = len(cents)
+    if k > np.count_nonzero(cents):
+        raise ValueError(f"Cannot draw {k} winners from {np.count_nonzero(cents)}")
+    if not k:
+        return np.zeros(n)
+    rng = np.random.default_rng(seed)
+    with np.errstate(divide="ignore"):
+        log_weights = np.log(cents.astype(np.float64))
+    wins = np.zeros(n, dtype=np.int64)
+    block = max(1, SIMULATION_BLOCK // max(n, 1))
+    for start in range(0, runs, block):
+        size = min(block, runs - start)
+        keys = log_weights + rng.gumbel(size=(size, n))
+        top = np.argpartition(keys, n - k, axis=1)[:, n - k :]
+        wins += np.bincount(top.ravel(), minlength=n)
+    return wins / runs
+
+
+def run_draw(k, seed=None, record=True):
+    """
+    Draw k winners from the current ticket totals.
+
+    Returns a RaffleDraw, saved unless `record` is false.
+    """
+    if seed is None:
+        seed = new_seed()
+    ids, cents = load_weights()
+    winners = draw(cents, k, seed)
+    raffle_draw = RaffleDraw(
+        seed=seed,
+        winner_count=k,
+        entrants=len(ids),
+        total_cents=int(cents.sum()),
+        weights_digest=weights_digest(ids, cents),
+        winners=ids[winners].tolist(),
+    )
+    if record:
+        raffle_draw.save()
+    return raffle_draw
+
+
+def replay(raffle_draw):
+    """
+    Redraw a recorded draw from the current ticket totals.
+
+    Returns (same weights, same winners).
+    """
+    ids, cents = load_weights()
+    winners = ids[draw(cents, raffle_draw.winner_count, raffle_draw.seed)].tolist()
+    return (
+        weights_digest(ids, cents) == raffle_draw.weights_digest,
+        winners == raffle_draw.winners,
+    )
@@ -0,0 +1,132 @@
+"""
+Quiz submission and the cascading referral bonus.
+
+Each referrer up the chain receives 20% of the previous level's bonus, up to
+MAX_REFERRAL_DEPTH levels, stopping at the first ancestor who has not
+completed the quiz. Bonuses are applied exactly once, in the same transaction
+that records the quiz response.
+"""
+
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Case, DecimalField, F, Value, When
+
+from . import leaderboard
+from .models import Participant, QuizResponse
+
+MAX_REFERRAL_DEPTH = 5
+REFERRAL_BONUS_RATE = Decimal("0.2")
+TICKETS_PER_POINT = Decimal("2")
+TICKET_QUANTUM = Decimal("0.01")
+
+
+def base_tickets(score):
+    """
+    Raffle tickets earned from the quiz itself: 2 times the score
+    """
+    return TICKETS_PER_POINT * score
+
+
+def level_bonuses(tickets, depth=MAX_REFERRAL_DEPTH):
+    """
+    Return the bonus for referral levels 1..depth, rounded to stored precision
+    """
+    bonuses = []
+    bonus = Decimal(tickets)
+    for _ in range(depth):
+        bonus *= REFERRAL_BONUS_RATE
+        bonuses.append(bonus.quantize(TICKET_QUANTUM))
+    return bonuses
+
+
+def ancestor_chain(participant_id, depth=MAX_REFERRAL_DEPTH):
+    """
+    Return [(ancestor_id, has_quiz_response), ...] nearest first, in one query
+    """
+    participant_table = Participant._meta.db_table
+    response_table = QuizResponse._meta.db_table
+    sql = f"""
+        WITH RECURSIVE chain(participant_id, level) AS (
+            SELECT referred_by_id, 1
+            FROM {participant_table}
+            WHERE id = %s AND referred_by_id IS NOT NULL
+            UNION ALL
+            SELECT p.referred_by_id, chain.level + 1
+            FROM {participant_table} p
+            JOIN chain ON p.id = chain.participant_id
+            WHERE p.referred_by_id IS NOT NULL AND chain.level < %s
+        )
+        SELECT chain.participant_id, r.id IS NOT NULL
+        FROM chain
+        LEFT JOIN {response_table} r ON r.participant_id = chain.participant_id
+        ORDER BY chain.level
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [participant_id, depth])
+        return [(ancestor_id, bool(completed)) for ancestor_id, completed in cursor]
+
+
+def apply_referral_bonuses(quiz_response):
+    """
+    Credit the referral chain above a new quiz response.
+
+    Returns {ancestor_id: bonus} in chain order.
+    """
+    bonuses = {}
+    chain = ancestor_chain(quiz_response.participant_id)
+    for (ancestor_id, completed), bonus in zip(
+        chain, level_bonuses(quiz_response.raffle_tickets)
+    ):
+        if not completed:
+            break
+        bonuses[ancestor_id] = bonus
+
+    if not bonuses:
+        return bonuses
+
+    ticket_field = DecimalField(max_digits=10, decimal_places=2)
+    QuizResponse.objects.filter(participant_id__in=bonuses).update(
+        raffle_tickets=F("raffle_tickets")
+        + Case(
+            *[
+                When(participant_id=ancestor_id, then=Value(bonus))
+                for ancestor_id, bonus in bonuses.items()
+            ],
+            output_field=ticket_field,
+        )
+    )
+    leaderboard.update_tickets(
+        dict(
+            QuizResponse.objects.filter(participant_id__in=bonuses).values_list(
+                "participant_id", "raffle_tickets"
+            )
+        )
+    )
+    return bonuses
+
+
+def submit_quiz(participant, score, answers=None, answers_bank=""):
+    """
+    Record a participant's quiz and apply referral bonuses, exactly once.
+    `answers` is the packed form of the chosen options (see study.answers),
+    given against the question bank with key_digest `answers_bank`.
+
+    Returns (quiz_response, bonuses); bonuses is empty when the quiz had
+    already been submitted.
+    """
+    with transaction.atomic():
+        quiz_response, created = QuizResponse.objects.get_or_create(
+            participant=participant,
+            defaults={
+                "score": score,
+                "answers": answers,
+                "answers_bank": answers_bank,
+                "raffle_tickets": base_tickets(score),
+            },
+        )
+        if not created:
+            return quiz_response, {}
+        leaderboard.add_entry(quiz_response)
+        bonuses = apply_referral_bonuses(quiz_response)
+    return quiz_response, bonuses
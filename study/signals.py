@@ -0,0 +1,25 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from . import leaderboard
+from .models import LeaderboardEntry, QuizResponse
+
+
+def _origin_model(origin):
+    return origin.model if isinstance(origin, QuerySet) else type(origin)
+
+
+@receiver(post_delete, sender=LeaderboardEntry)
+def close_rank_gap(sender, instance, **kwargs):
+    # Also runs for the cascade when a Participant is deleted in the admin
+    leaderboard.close_gap(instance.raffle_tickets)
+
+
+@receiver(post_delete, sender=QuizResponse)
+def remove_leaderboard_entry(sender, instance, origin=None, **kwargs):
+    # A response deleted on its own takes the participant off the board. A
+    # deleted Participant cascades to its entry as well, whose post_delete
+    # closes the gap once
+    if _origin_model(origin) is QuizResponse:
+        leaderboard.remove_entry(instance.participant_id)
@@ -0,0 +1,202 @@
+"""
+Playback telemetry from the video page.
+
+The page batches its events and posts them with navigator.sendBeacon. Each
+worker keeps accepted events in an in-memory buffer and writes them with one
+bulk_create once TELEMETRY_FLUSH_SIZE events are waiting or
+TELEMETRY_FLUSH_INTERVAL seconds have passed, so a beacon normally costs no
+database write at all. A timer flushes whatever is still waiting after
+TELEMETRY_FLUSH_INTERVAL seconds, so an idle worker holds events no longer
+than that, and buffers are also flushed when the worker exits. A killed
+worker loses at most that interval of events.
+"""
+
+import atexit
+import json
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, F, Max, Min, Q
+from django.utils import timezone
+
+from .models import Participant, PlaybackEvent
+
+# Upper bound on events accepted from a single beacon
+MAX_EVENTS_PER_BEACON = 200
+
+KINDS = frozenset(kind for kind, _ in PlaybackEvent.KIND_CHOICES)
+
+
+class InvalidBeacon(ValueError):
+    pass
+
+
+def parse_beacon(payload, participant_id):
+    """
+    Build unsaved PlaybackEvents from a beacon payload.
+
+    The payload is JSON {"d": duration, "e": [[kind, client_ms, position,
+    playback_rate], ...]}.
+    """
+    try:
+        data = json.loads(payload)
+        duration = data.get("d")
+        rows = data["e"]
+    except (TypeError, ValueError, KeyError, AttributeError):
+        raise InvalidBeacon("Malformed payload")
+    if not isinstance(rows, list) or len(rows) > MAX_EVENTS_PER_BEACON:
+        raise InvalidBeacon(
+            f"Expected a list of at most {MAX_EVENTS_PER_BEACON} events"
+        )
+    if duration is not None and not _finite(duration):
+        duration = None
+
+    received_at = timezone.now()
+    events = []
+    for row in rows:
+        if not isinstance(row, list) or len(row) != 4:
+            raise InvalidBeacon("Events are [kind, client_ms, position, rate]")
+        kind, client_ms, position, playback_rate = row
+        if kind not in KINDS or not all(
+            _finite(value) and value >= 0
+            for value in (client_ms, position, playback_rate)
+        ):
+            raise InvalidBeacon("Invalid event values")
+        events.append(
+            PlaybackEvent(
+                participant_id=participant_id,
+                kind=kind,
+                client_ms=int(client_ms),
+                position=position,
+                playback_rate=playback_rate,
+                duration=duration,
+                received_at=received_at,
+            )
+        )
+    return events
+
+
+def _finite(value):
+    return (
+        isinstance(value, (int, float))
+        and not isinstance(value, bool)
+        and math.isfinite(value)
+    )
+
+
+class EventBuffer:
+    """
+    Per-process queue of events waiting to be written
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events = []
+        self._last_flush = time.monotonic()
+        self._timer = None
+
+    def add(self, events):
+        flush_size = getattr(settings, "TELEMETRY_FLUSH_SIZE", 500)
+        flush_interval = getattr(settings, "TELEMETRY_FLUSH_INTERVAL", 10.0)
+        with self._lock:
+            self._events.extend(events)
+            due = (
+                len(self._events) >= flush_size
+                or time.monotonic() - self._last_flush >= flush_interval
+            )
+            if not due and self._timer is None:
+                # Started on demand: no thread survives a preforking fork()
+                self._timer = threading.Timer(flush_interval, self._flush_on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        if due:
+            self.flush()
+
+    def _flush_on_timer(self):
+        with self._lock:
+            self._timer = None
+        try:
+            self.flush()
+        finally:
+            # The timer thread's own connection
+            connection.close()
+
+    def flush(self):
+        """
+        Write all buffered events; returns the number written
+        """
+        with self._lock:
+            events, self._events = self._events, []
+            self._last_flush = time.monotonic()
+        if not events:
+            return 0
+        # Participants may have been invalidated and deleted since their
+        # events were buffered; one lookup keeps the FK check from failing
+        # the whole batch
+        existing = set(
+            Participant.objects.filter(
+                id__in={event.participant_id for event in events}
+            ).values_list("id", flat=True)
+        )
+        events = [event for event in events if event.participant_id in existing]
+        PlaybackEvent.objects.bulk_create(events, batch_size=500)
+        return len(events)
+
+    def __len__(self):
+        return len(self._events)
+
+
+buffer = EventBuffer()
+atexit.register(buffer.flush)
+
+
+def completeness(participant_ids=None):
+    """
+    Watch completeness per participant from a single GROUP BY query.
+
+    Returns {participant_id: dict} with the treatment group, the furthest
+    position reached as a share of the video, whether the video ended, how
+    many events were recorded while playing at a rate other than the
+    assigned one, and how many rate changes tried to leave it. A ratechange
+    event carries the attempted rate before the page resets it, so it is
+    not counted as off-speed playback.
+    """
+    events = PlaybackEvent.objects.all()
+    if participant_ids is not None:
+        events = events.filter(participant_id__in=participant_ids)
+    rows = (
+        events.values(
+            "participant_id", treatment_group=F("participant__treatment_group")
+        )
+        .annotate(
+            events=Count("id"),
+            furthest=Max("position"),
+            duration=Max("duration"),
+            ended=Count("id", filter=Q(kind=PlaybackEvent.ENDED)),
+            hidden=Count("id", filter=Q(kind=PlaybackEvent.HIDDEN)),
+            off_speed=Count(
+                "id",
+                filter=~Q(playback_rate=F("participant__treatment_group"))
+                & ~Q(kind=PlaybackEvent.RATECHANGE),
+            ),
+            rate_changes=Count(
+                "id",
+                filter=~Q(playback_rate=F("participant__treatment_group"))
+                & Q(kind=PlaybackEvent.RATECHANGE),
+            ),
+            first_seen=Min("received_at"),
+            last_seen=Max("received_at"),
+        )
+        .order_by("participant_id")
+    )
+    rollup = {}
+    for row in rows:
+        participant_id = row.pop("participant_id")
+        duration = row["duration"]
+        row["completeness"] = min(row["furthest"] / duration, 1.0) if duration else None
+        row["ended"] = row["ended"] > 0
+        rollup[participant_id] = row
+    return rollup
@@ -1 +1,784 @@
-# Create your tests here.
+import json
+import random
+import re
+import time
+from io import StringIO
+from unittest import mock
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import (
+    AsyncRequestFactory,
+    Client,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from speedierwatch.sessions import COOKIE_PREFIX, SessionStore
+
+from . import (
+    allocation,
+    answers,
+    async_views,
+    leaderboard,
+    raffle,
+    telemetry,
+    tickets,
+    versioning,
+)
+from .models import (
+    AllocationBlock,
+    LeaderboardEntry,
+    Participant,
+    PlaybackEvent,
+    QuizResponse,
+)
+from .question_bank import MAX_QUESTIONS, OPTION_LETTERS
+from .referrals import (
+    MAX_REFERRAL_DEPTH,
+    base_tickets,
+    level_bonuses,
+    submit_quiz,
+)
+
+
+def make_participant(name, referred_by=None):
+    return Participant.objects.create(
+        name=name,
+        email=f"{name}@example.com",
+        treatment_group=1 + len(name) % 2,
+        referred_by=referred_by,
+    )
+
+
+class PackedAnswersTests(SimpleTestCase):
+    def random_answers(self, rng, questions):
+        choices = [None, *OPTION_LETTERS]
+        return [rng.choice(choices) for _ in range(questions)]
+
+    def test_round_trip(self):
+        rng = random.Random(0)
+        for questions in (0, 1, 10, MAX_QUESTIONS):
+            for _ in range(50):
+                chosen = self.random_answers(rng, questions)
+                packed = answers.pack(chosen)
+                self.assertEqual(answers.unpack(packed, questions), chosen)
+
+    def test_fits_a_signed_64_bit_integer(self):
+        packed = answers.pack([OPTION_LETTERS[-1]] * MAX_QUESTIONS)
+        self.assertLess(packed, 2**63)
+        with self.assertRaises(ValueError):
+            answers.pack([None] * (MAX_QUESTIONS + 1))
+
+    def test_no_answers_pack_to_zero(self):
+        self.assertEqual(answers.pack([None] * 10), 0)
+        self.assertEqual(answers.unpack(0, 3), [None, None, None])
+
+    def test_matrix_round_trip(self):
+        rng = random.Random(1)
+        rows = [self.random_answers(rng, 10) for _ in range(100)]
+        packed = [answers.pack(row) for row in rows]
+        codes = answers.unpack_matrix(packed, 10)
+        self.assertEqual(codes.shape, (100, 10))
+        for row, row_codes in zip(rows, codes.tolist()):
+            self.assertEqual(
+                row_codes,
+                [answers.NO_ANSWER if a is None else answers.CODES[a] for a in row],
+            )
+        self.assertEqual(answers.pack_matrix(codes).tolist(), packed)
+
+
+class SubmissionTests(TestCase):
+    def chain(self, length):
+        """
+        Participants each referred by the previous one, all with a quiz
+        """
+        participants = []
+        for i in range(length):
+            participant = make_participant(
+                f"c{length}_{i}", participants[-1] if participants else None
+            )
+            submit_quiz(participant, 5)
+            participants.append(participant)
+        return participants
+
+    def tickets(self):
+        return dict(
+            QuizResponse.objects.values_list("participant_id", "raffle_tickets")
+        )
+
+    def test_double_post_submits_once(self):
+        referrer = make_participant("referrer")
+        submit_quiz(referrer, 5)
+        self.client.get(f"/?ref={referrer.referral_code}")
+        self.client.post("/", {"name": "Ada", "email": "ada@example.com"})
+        html = self.client.get("/quiz/").content.decode()
+        data = dict(re.findall(r'name="(question_\d+)" value="([A-D])"', html))
+        self.assertTrue(data)
+
+        response = self.client.post("/quiz/", data)
+        self.assertRedirects(response, "/results/", fetch_redirect_response=False)
+        after_first = self.tickets()
+        self.assertGreater(after_first[referrer.pk], base_tickets(5))
+        response = self.client.post("/quiz/", data)
+        self.assertRedirects(response, "/results/", fetch_redirect_response=False)
+        self.assertEqual(
+            QuizResponse.objects.filter(participant__name="Ada").count(), 1
+        )
+        self.assertEqual(self.tickets(), after_first)
+
+    def test_bonus_per_depth(self):
+        ancestors = self.chain(MAX_REFERRAL_DEPTH + 1)
+        before = self.tickets()
+        leaf = make_participant("leaf", ancestors[-1])
+        response, bonuses = submit_quiz(leaf, 10)
+
+        expected = level_bonuses(response.raffle_tickets)
+        after = self.tickets()
+        for depth, ancestor in enumerate(reversed(ancestors), 1):
+            gained = after[ancestor.pk] - before[ancestor.pk]
+            if depth <= MAX_REFERRAL_DEPTH:
+                self.assertEqual(gained, expected[depth - 1], f"depth {depth}")
+                self.assertEqual(bonuses[ancestor.pk], expected[depth - 1])
+            else:
+                self.assertEqual(gained, 0, f"depth {depth}")
+                self.assertNotIn(ancestor.pk, bonuses)
+
+    def test_cascade_queries_do_not_grow_with_depth(self):
+        counts = []
+        for depth in range(MAX_REFERRAL_DEPTH + 2):
+            ancestors = self.chain(depth)
+            leaf = make_participant(
+                f"leaf{depth}", ancestors[-1] if ancestors else None
+            )
+            with CaptureQueriesContext(connection) as context:
+                submit_quiz(leaf, 7)
+            counts.append(len(context))
+        # Without a chain nothing is credited; any chain costs the same
+        self.assertEqual(len(set(counts[1:])), 1, counts)
+
+
+class AllocationTests(TestCase):
+    def generate(self, blocks, sizes="4,6"):
+        call_command(
+            "generate_allocation_sequence",
+            blocks=blocks,
+            block_sizes=sizes,
+            seed=5,
+            stdout=StringIO(),
+        )
+
+    def test_blocks_are_balanced(self):
+        rng = random.Random(5)
+        for size in (2, 4, 6, 10):
+            for block in allocation.permuted_blocks(20, [size], rng):
+                self.assertEqual(len(block), size)
+                for group in allocation.GROUPS:
+                    self.assertEqual(block.count(str(group)), size // 2)
+        with self.assertRaises(ValueError):
+            allocation.permuted_blocks(1, [3], rng)
+
+    def test_workers_never_share_a_block(self):
+        self.generate(10)
+        workers = [allocation.Allocator() for _ in range(3)]
+        assigned = [worker.assign() for worker in workers for _ in range(4)]
+        reserved = AllocationBlock.objects.filter(reserved_at__isnull=False)
+        self.assertEqual(reserved.count(), 3)
+        # Each worker hands out the block it reserved, in order
+        blocks = [
+            [int(group) for group in block.assignments[:4]]
+            for block in reserved.order_by("position")
+        ]
+        self.assertEqual(assigned, [group for block in blocks for group in block])
+
+    def test_block_taken_since_read_is_skipped(self):
+        self.generate(2)
+        first = QuerySet.first
+        taken = []
+
+        def first_then_taken(queryset):
+            row = first(queryset)
+            if row and not taken:
+                # Another worker reserves the block between read and UPDATE
+                taken.append(row[0])
+                AllocationBlock.objects.filter(pk=row[0]).update(
+                    reserved_at=timezone.now(), reserved_by="other"
+                )
+            return row
+
+        with mock.patch.object(QuerySet, "first", first_then_taken):
+            assignments = allocation.reserve_block("")
+        second = AllocationBlock.objects.get(position=1)
+        self.assertEqual(assignments, [int(group) for group in second.assignments])
+        self.assertNotEqual(second.reserved_by, "other")
+        self.assertEqual(AllocationBlock.objects.get(pk=taken[0]).reserved_by, "other")
+
+    def test_exhausted_sequence_falls_back(self):
+        self.generate(1, sizes="2")
+        worker = allocation.Allocator()
+        self.assertEqual(sorted(worker.assign() for _ in range(2)), [1, 2])
+
+        with self.assertLogs("study.allocation", "WARNING") as logs:
+            self.assertIn(worker.assign(), allocation.GROUPS)
+        self.assertEqual(len(logs.records), 1)
+        # Until the recheck, simple randomization without looking again
+        with self.assertNumQueries(0):
+            for _ in range(10):
+                self.assertIn(worker.assign(), allocation.GROUPS)
+
+        self.generate(1, sizes="2")
+        later = time.monotonic() + allocation.EXHAUSTED_RECHECK
+        with mock.patch.object(allocation.time, "monotonic", return_value=later):
+            worker.assign()
+        self.assertFalse(AllocationBlock.objects.filter(reserved_at=None).exists())
+
+
+class RaffleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(6)
+        for i in range(40):
+            # A score of 0 earns no tickets, and those never win
+            submit_quiz(make_participant(f"p{i}"), rng.choice([0, 0, 1, 5, 10]))
+
+    def test_recorded_seed_replays(self):
+        recorded = raffle.run_draw(8)
+        again = raffle.run_draw(8, seed=recorded.seed, record=False)
+        self.assertEqual(again.winners, recorded.winners)
+        self.assertEqual(again.weights_digest, recorded.weights_digest)
+        self.assertEqual(raffle.replay(recorded), (True, True))
+
+        out = StringIO()
+        call_command("raffle_draw", replay=recorded.pk, stdout=out)
+        self.assertIn("replays identically", out.getvalue())
+
+        # Changed totals are reported rather than replayed silently
+        QuizResponse.objects.filter(participant_id=recorded.winners[0]).update(
+            raffle_tickets=Decimal("0.01")
+        )
+        self.assertFalse(raffle.replay(recorded)[0])
+
+    def test_zero_tickets_never_drawn(self):
+        zero = set(
+            QuizResponse.objects.filter(raffle_tickets=0).values_list(
+                "participant_id", flat=True
+            )
+        )
+        self.assertTrue(zero)
+        ids, cents = raffle.load_weights()
+        self.assertFalse(zero & set(ids.tolist()))
+        self.assertEqual(len(ids) + len(zero), QuizResponse.objects.count())
+
+        cents = [0, 5, 0, 1, 0, 300, 0]
+        for seed in range(200):
+            winners = raffle.draw(cents, 3, seed)
+            self.assertFalse({0, 2, 4, 6} & set(winners), f"seed {seed}")
+        chances = raffle.simulate(cents, 2, 2000, seed=0)
+        self.assertEqual(chances[[0, 2, 4, 6]].tolist(), [0, 0, 0, 0])
+        with self.assertRaises(ValueError):
+            raffle.draw(cents, 4, 0)
+
+    def test_draw_without_replacement(self):
+        # One entrant holds most of the weight, so repeats are rejected and
+        # the prefix sums rebuilt without the winners
+        cents = [10**9] + [1] * 30 + [0] * 5
+        for seed in range(50):
+            winners = raffle.draw(cents, 31, seed)
+            self.assertEqual(len(winners), 31)
+            self.assertEqual(len(set(winners)), 31, f"seed {seed}")
+        recorded = raffle.run_draw(len(raffle.load_weights()[0]), record=False)
+        self.assertEqual(len(set(recorded.winners)), recorded.entrants)
+
+
+class LeaderboardTests(TestCase):
+    def assertRanksConsistent(self):
+        """
+        Every rank is 1 + the number of entries with strictly more tickets,
+        and the incremental table equals a rebuild from the responses
+        """
+        entries = list(
+            LeaderboardEntry.objects.order_by("participant_id").values_list(
+                "participant_id", "score", "raffle_tickets", "referral_count", "rank"
+            )
+        )
+        totals = [row[2] for row in entries]
+        for participant_id, _, own, _, rank in entries:
+            expected = 1 + sum(other > own for other in totals)
+            self.assertEqual(rank, expected, f"participant {participant_id}")
+        stored = dict(
+            QuizResponse.objects.values_list("participant_id", "raffle_tickets")
+        )
+        self.assertEqual({row[0]: row[2] for row in entries}, stored)
+
+        leaderboard.rebuild()
+        rebuilt = list(
+            LeaderboardEntry.objects.order_by("participant_id").values_list(
+                "participant_id", "score", "raffle_tickets", "referral_count", "rank"
+            )
+        )
+        self.assertEqual(entries, rebuilt)
+
+    def test_submissions_with_referral_bonuses(self):
+        rng = random.Random(0)
+        participants = []
+        for i in range(30):
+            referrer = rng.choice(participants) if participants and i % 3 else None
+            participant = make_participant(f"p{i}", referrer)
+            participants.append(participant)
+            if referrer:
+                leaderboard.adjust_referral_count(referrer.pk, 1)
+            # Some never finish, which cuts the referral chains below them
+            if rng.random() < 0.8:
+                submit_quiz(participant, rng.randint(0, 10))
+        self.assertRanksConsistent()
+
+    def test_ties(self):
+        for i in range(6):
+            submit_quiz(make_participant(f"p{i}"), 5)
+        self.assertEqual(
+            set(LeaderboardEntry.objects.values_list("rank", flat=True)), {1}
+        )
+        submit_quiz(make_participant("top"), 9)
+        submit_quiz(make_participant("bottom"), 1)
+        self.assertEqual(
+            sorted(LeaderboardEntry.objects.values_list("rank", flat=True)),
+            [1, 2, 2, 2, 2, 2, 2, 8],
+        )
+        self.assertRanksConsistent()
+
+    def test_ticket_updates(self):
+        rng = random.Random(1)
+        ids = []
+        for i in range(20):
+            response, _ = submit_quiz(make_participant(f"p{i}"), rng.randint(0, 10))
+            ids.append(response.participant_id)
+        for _ in range(40):
+            # Moves up, down and onto other entries' totals
+            changes = {
+                participant_id: Decimal(rng.randint(0, 40)) / 2
+                for participant_id in rng.sample(ids, 3)
+            }
+            for participant_id, total in changes.items():
+                QuizResponse.objects.filter(participant_id=participant_id).update(
+                    raffle_tickets=total
+                )
+            leaderboard.update_tickets(changes)
+            entries = list(
+                LeaderboardEntry.objects.values_list("raffle_tickets", "rank")
+            )
+            for own, rank in entries:
+                self.assertEqual(rank, 1 + sum(other > own for other, _ in entries))
+        self.assertRanksConsistent()
+
+    def test_removals(self):
+        rng = random.Random(2)
+        participants = [make_participant(f"p{i}") for i in range(20)]
+        for participant in participants:
+            submit_quiz(participant, rng.randint(0, 10))
+        rng.shuffle(participants)
+        for participant in participants[:12]:
+            leaderboard.remove_entry(participant.pk)
+            QuizResponse.objects.filter(participant=participant).delete()
+            participant.delete()
+            self.assertRanksConsistent()
+        self.assertEqual(LeaderboardEntry.objects.count(), 8)
+        # Removing an entry that is not on the board changes nothing
+        leaderboard.remove_entry(participants[0].pk)
+        self.assertRanksConsistent()
+
+    def test_deletions_in_admin(self):
+        rng = random.Random(8)
+        participants = [make_participant(f"p{i}") for i in range(12)]
+        for participant in participants:
+            submit_quiz(participant, rng.randint(0, 10))
+        self.client.force_login(
+            User.objects.create_superuser("admin", "admin@example.com", "pw")
+        )
+
+        # A participant, cascading to their response and leaderboard entry
+        self.client.post(
+            f"/admin/study/participant/{participants[0].pk}/delete/", {"post": "yes"}
+        )
+        self.assertFalse(Participant.objects.filter(pk=participants[0].pk).exists())
+        self.assertRanksConsistent()
+
+        # Several at once with the bulk action
+        self.client.post(
+            "/admin/study/participant/",
+            {
+                "action": "delete_selected",
+                "_selected_action": [p.pk for p in participants[1:5]],
+                "post": "yes",
+            },
+        )
+        self.assertEqual(LeaderboardEntry.objects.count(), 7)
+        self.assertRanksConsistent()
+
+        # A response on its own takes the participant off the board
+        response = QuizResponse.objects.get(participant=participants[5])
+        self.client.post(
+            f"/admin/study/quizresponse/{response.pk}/delete/", {"post": "yes"}
+        )
+        self.assertFalse(
+            LeaderboardEntry.objects.filter(participant=participants[5]).exists()
+        )
+        self.assertRanksConsistent()
+
+        # An entry on its own
+        entry = LeaderboardEntry.objects.order_by("rank").first()
+        version = versioning.current(versioning.LEADERBOARD)[0]
+        self.client.post(
+            f"/admin/study/leaderboardentry/{entry.pk}/delete/", {"post": "yes"}
+        )
+        self.assertGreater(versioning.current(versioning.LEADERBOARD)[0], version)
+        entries = list(LeaderboardEntry.objects.values_list("raffle_tickets", "rank"))
+        self.assertEqual(len(entries), 5)
+        for own, rank in entries:
+            self.assertEqual(rank, 1 + sum(other > own for other, _ in entries))
+
+
+class LeaderboardPageTests(TestCase):
+    def setUp(self):
+        for i in range(3):
+            submit_quiz(make_participant(f"p{i}"), i + 4)
+
+    def get(self, client=None, **headers):
+        return (client or self.client).get("/leaderboard/", headers=headers)
+
+    def test_repeat_get_is_not_modified(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        # Answered from the data version alone, without running the view
+        with self.assertNumQueries(1):
+            response = self.get(if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_submission_changes_the_etag(self):
+        etag = self.get()["ETag"]
+        version = versioning.current(versioning.LEADERBOARD)[0]
+        submit_quiz(make_participant("late"), 9)
+        self.assertGreater(versioning.current(versioning.LEADERBOARD)[0], version)
+
+        response = self.get(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertContains(response, "late")
+        self.assertEqual(self.get(if_none_match=response["ETag"]).status_code, 304)
+
+    def test_variant_changes_the_etag(self):
+        etag = self.get()["ETag"]
+        self.assertFalse(self.get().has_header("Last-Modified"))
+
+        # Links are built from the host
+        other_host = self.get(host="localhost")
+        self.assertNotEqual(other_host["ETag"], etag)
+        self.assertEqual(
+            self.get(if_none_match=etag, host="localhost").status_code, 200
+        )
+
+        # and the page shows the session's referral code
+        referred = Client()
+        referrer = Participant.objects.first()
+        referred.get(f"/?ref={referrer.referral_code}")
+        response = self.get(referred, if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(response["ETag"], (etag, other_host["ETag"]))
+        self.assertEqual(self.get(if_none_match=etag).status_code, 304)
+
+
+class RecomputeTicketsTests(TestCase):
+    def setUp(self):
+        rng = random.Random(3)
+        participants = []
+        for i in range(40):
+            referrer = rng.choice(participants) if participants and i % 4 else None
+            participant = make_participant(f"p{i}", referrer)
+            participants.append(participant)
+            # Some never finish, which cuts the referral chains below them
+            if rng.random() < 0.8:
+                submit_quiz(participant, rng.randint(0, 10))
+
+    def leaderboard_rows(self):
+        return list(
+            LeaderboardEntry.objects.order_by("participant_id").values_list(
+                "participant_id", "raffle_tickets", "rank"
+            )
+        )
+
+    def test_matches_incremental_bonuses(self):
+        # Everyone submitted after their referrer, so the bonuses credited at
+        # submission are those of the current forest
+        self.assertEqual(tickets.diff(), [])
+        self.assertEqual(tickets.recompute(), 0)
+
+    def test_repairs_then_changes_nothing(self):
+        expected = dict(
+            QuizResponse.objects.values_list("participant_id", "raffle_tickets")
+        )
+        board = self.leaderboard_rows()
+        damaged = list(expected)[::5]
+        QuizResponse.objects.filter(participant_id__in=damaged).update(
+            raffle_tickets=Decimal("123.45")
+        )
+        self.assertEqual({row[0] for row in tickets.diff()}, set(damaged))
+
+        self.assertEqual(tickets.recompute(batch_size=3), len(damaged))
+        self.assertEqual(
+            dict(QuizResponse.objects.values_list("participant_id", "raffle_tickets")),
+            expected,
+        )
+        self.assertEqual(self.leaderboard_rows(), board)
+
+        self.assertEqual(tickets.diff(), [])
+        self.assertEqual(tickets.recompute(), 0)
+        self.assertEqual(self.leaderboard_rows(), board)
+
+
+def beacon(*events, duration=120.0):
+    return {"events": json.dumps({"d": duration, "e": [list(e) for e in events]})}
+
+
+@override_settings(TELEMETRY_FLUSH_SIZE=4, TELEMETRY_FLUSH_INTERVAL=3600)
+class TelemetryTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(telemetry, "buffer", telemetry.EventBuffer())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client.post("/", {"name": "Ada", "email": "ada@example.com"})
+        self.participant = Participant.objects.get(name="Ada")
+
+    def post(self, data):
+        return self.client.post("/video/events/", data)
+
+    def test_batch_is_buffered_then_written(self):
+        assigned = self.participant.treatment_group
+        other = 3 - assigned
+        response = self.post(
+            beacon(
+                (PlaybackEvent.PLAY, 10, 0.0, assigned),
+                (PlaybackEvent.PROGRESS, 5000, 30.5, assigned),
+            )
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(PlaybackEvent.objects.exists())
+
+        # The fourth event reaches TELEMETRY_FLUSH_SIZE
+        self.post(
+            beacon(
+                # The attempted rate, reset by the page, is not off-speed
+                (PlaybackEvent.RATECHANGE, 6000, 31.0, other),
+                (PlaybackEvent.ENDED, 9000, 120.0, other),
+            )
+        )
+        events = list(
+            PlaybackEvent.objects.order_by("client_ms").values_list(
+                "participant_id", "kind", "client_ms", "position", "playback_rate"
+            )
+        )
+        self.assertEqual(
+            events,
+            [
+                (self.participant.pk, PlaybackEvent.PLAY, 10, 0.0, assigned),
+                (self.participant.pk, PlaybackEvent.PROGRESS, 5000, 30.5, assigned),
+                (self.participant.pk, PlaybackEvent.RATECHANGE, 6000, 31.0, other),
+                (self.participant.pk, PlaybackEvent.ENDED, 9000, 120.0, other),
+            ],
+        )
+        self.assertEqual(len(telemetry.buffer), 0)
+
+        totals = telemetry.completeness()[self.participant.pk]
+        self.assertEqual(totals["treatment_group"], assigned)
+        self.assertEqual(totals["events"], 4)
+        self.assertEqual(totals["furthest"], 120.0)
+        self.assertEqual(totals["completeness"], 1.0)
+        self.assertTrue(totals["ended"])
+        self.assertEqual(totals["off_speed"], 1)
+        self.assertEqual(totals["rate_changes"], 1)
+
+    def test_malformed_payload(self):
+        too_many = [(PlaybackEvent.PROGRESS, i, 1.0, 1) for i in range(201)]
+        for data in (
+            {},
+            {"events": "not json"},
+            {"events": "[]"},
+            {"events": json.dumps({"e": 5})},
+            {"events": '{"e": [[0, 0, NaN, 1]]}'},
+            beacon((PlaybackEvent.PLAY, 0, 0.0)),
+            beacon((99, 0, 0.0, 1)),
+            beacon((PlaybackEvent.PLAY, -1, 0.0, 1)),
+            beacon((PlaybackEvent.PLAY, 0, "0", 1)),
+            beacon(*too_many),
+        ):
+            self.assertEqual(self.post(data).status_code, 400, data)
+        self.assertEqual(len(telemetry.buffer), 0)
+
+        self.client.logout()
+        response = self.post(beacon((PlaybackEvent.PLAY, 0, 0.0, 1)))
+        self.assertEqual(response.status_code, 403)
+
+    def test_events_of_deleted_participants_are_dropped(self):
+        self.post(beacon((PlaybackEvent.PLAY, 0, 0.0, 1)))
+        other = make_participant("Bob")
+        telemetry.buffer.add(
+            telemetry.parse_beacon(
+                beacon((PlaybackEvent.PLAY, 0, 0.0, 1))["events"], other.pk
+            )
+        )
+        self.participant.delete()
+        self.assertEqual(telemetry.buffer.flush(), 1)
+        self.assertEqual(
+            list(PlaybackEvent.objects.values_list("participant_id", flat=True)),
+            [other.pk],
+        )
+
+
+@override_settings(TELEMETRY_FLUSH_SIZE=100, TELEMETRY_FLUSH_INTERVAL=0.5)
+class TelemetryTimerTests(TransactionTestCase):
+    def test_timer_flushes_an_idle_buffer(self):
+        self.client.post("/", {"name": "Ada", "email": "ada@example.com"})
+        participant = Participant.objects.get(name="Ada")
+        buffer = telemetry.EventBuffer()
+        with mock.patch.object(telemetry, "buffer", buffer):
+            self.client.post(
+                "/video/events/",
+                beacon(
+                    (PlaybackEvent.PLAY, 0, 0.0, 1), (PlaybackEvent.PAUSE, 10, 4.0, 1)
+                ),
+            )
+        timer = buffer._timer
+        self.assertIsNotNone(timer)
+        self.assertEqual(len(buffer), 2)
+
+        # No further request comes in; the timer writes the events
+        timer.join(5)
+        self.assertFalse(timer.is_alive())
+        self.assertIsNone(buffer._timer)
+        self.assertEqual(len(buffer), 0)
+        self.assertEqual(
+            list(
+                PlaybackEvent.objects.order_by("client_ms").values_list(
+                    "participant_id", "kind"
+                )
+            ),
+            [
+                (participant.pk, PlaybackEvent.PLAY),
+                (participant.pk, PlaybackEvent.PAUSE),
+            ],
+        )
+
+
+class SessionStoreTests(TestCase):
+    def reload(self, session):
+        return SessionStore(session.session_key)
+
+    def test_participant_session_stays_in_cookie(self):
+        session = SessionStore()
+        session["participant_id"] = 7
+        session["quiz_seed"] = 1234
+        session.save()
+        self.assertTrue(session.session_key.startswith(COOKIE_PREFIX))
+        self.assertFalse(Session.objects.exists())
+
+        loaded = self.reload(session)
+        self.assertEqual(loaded["participant_id"], 7)
+        self.assertEqual(loaded["quiz_seed"], 1234)
+        self.assertFalse(loaded.exists(loaded.session_key))
+
+    def test_moves_to_database_and_back(self):
+        session = SessionStore()
+        session["participant_id"] = 7
+        session.save()
+
+        # Any key outside COOKIE_SESSION_KEYS moves it to django_session
+        session = self.reload(session)
+        session["_auth_user_id"] = "1"
+        session.save()
+        self.assertFalse(session.session_key.startswith(COOKIE_PREFIX))
+        self.assertTrue(Session.objects.filter(pk=session.session_key).exists())
+        database_key = session.session_key
+        loaded = self.reload(session)
+        self.assertEqual(loaded["participant_id"], 7)
+        self.assertEqual(loaded["_auth_user_id"], "1")
+
+        # Once it fits again it returns to the cookie and leaves no row
+        del loaded["_auth_user_id"]
+        loaded.save()
+        self.assertTrue(loaded.session_key.startswith(COOKIE_PREFIX))
+        self.assertFalse(Session.objects.filter(pk=database_key).exists())
+        self.assertEqual(dict(self.reload(loaded).items()), {"participant_id": 7})
+
+    def test_tampered_cookie_starts_a_new_session(self):
+        session = SessionStore()
+        session["participant_id"] = 7
+        session.save()
+        loaded = SessionStore(session.session_key[:-2] + "xx")
+        self.assertNotIn("participant_id", loaded)
+        self.assertIsNone(loaded.session_key)
+
+    def test_unchanged_value_is_not_a_modification(self):
+        session = SessionStore()
+        session["participant_id"] = 7
+        session.save()
+        loaded = self.reload(session)
+        loaded["participant_id"] = 7
+        self.assertFalse(loaded.modified)
+        loaded["participant_id"] = 8
+        self.assertTrue(loaded.modified)
+
+    def test_participant_pages_write_no_database_session(self):
+        client = self.client
+        client.post("/", {"name": "Ada", "email": "ada@example.com"})
+        self.assertIsNotNone(client.session.get("participant_id"))
+        self.assertFalse(Session.objects.exists())
+
+        # A staff login in the same browser moves the session to the database
+        user = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        client.force_login(user)
+        self.assertEqual(Session.objects.count(), 1)
+        self.assertEqual(
+            client.session.get("participant_id"),
+            Participant.objects.get(name="Ada").pk,
+        )
+
+
+class StaleSessionTests(TestCase):
+    """
+    A replayed cookie of a deleted participant sends them back to
+    registration instead of failing
+    """
+
+    def setUp(self):
+        self.client.post("/", {"name": "Ada", "email": "ada@example.com"})
+        self.cookie = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+        self.client.get("/quiz/")
+        self.client.get("/invalidated/")
+        self.assertFalse(Participant.objects.exists())
+
+    def test_replayed_cookie(self):
+        for url in ("/video/", "/quiz/", "/results/"):
+            self.client.cookies[settings.SESSION_COOKIE_NAME] = self.cookie
+            response = self.client.get(url)
+            self.assertRedirects(response, "/", fetch_redirect_response=False)
+            self.assertNotIn("participant_id", self.client.session)
+
+    async def test_replayed_cookie_async(self):
+        for view in (async_views.video, async_views.quiz, async_views.results):
+            request = AsyncRequestFactory().get("/")
+            request.session = SessionStore(self.cookie)
+            request._messages = FallbackStorage(request)
+            response = await view(request)
+            self.assertEqual(response.status_code, 302)
+            self.assertEqual(response.url, "/")
+            self.assertNotIn("participant_id", request.session)
@@ -0,0 +1,156 @@
+"""
+Full recomputation of raffle tickets from scores and the referral forest.
+
+Tickets are normally maintained incrementally by referrals.submit_quiz. This
+module rebuilds them from scratch: scores and referred_by edges are loaded
+into NumPy arrays once, and the cascading bonuses are pushed up the forest
+one referral level at a time, so the cost is MAX_REFERRAL_DEPTH vectorized
+steps over the participants. Amounts are kept in integer hundredths of a
+ticket, which is exact at the stored precision.
+
+The chain rule is that of submit_quiz applied to the current state: a bonus
+reaches an ancestor only if every ancestor up to it has completed the quiz.
+"""
+
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+
+from . import leaderboard
+from .models import Participant, QuizResponse
+from .referrals import MAX_REFERRAL_DEPTH, base_tickets, level_bonuses
+
+MAX_SCORE = 10
+
+
+def bonus_table(max_score=MAX_SCORE):
+    """
+    Return the bonus in cents per (score, referral level - 1)
+    """
+    return np.array(
+        [
+            [int(bonus * 100) for bonus in level_bonuses(base_tickets(score))]
+            for score in range(max_score + 1)
+        ],
+        dtype=np.int64,
+    )
+
+
+def ticket_cents(scores, completed, parents):
+    """
+    Base tickets plus the referral cascade, in hundredths of a ticket.
+
+    All arguments are arrays indexed by participant position; `parents`
+    holds the position of the referrer, or -1 for none.
+    """
+    scores = np.asarray(scores, dtype=np.int64)
+    completed = np.asarray(completed, dtype=bool)
+    parents = np.asarray(parents, dtype=np.int64)
+    bonuses = bonus_table(max(MAX_SCORE, int(scores.max(initial=0))))
+
+    cents = np.where(completed, scores * 200, 0).astype(np.int64)
+    # Completers whose chain is still alive, and their ancestor at this level
+    sources = np.flatnonzero(completed & (parents >= 0))
+    ancestors = parents[sources]
+    for level in range(MAX_REFERRAL_DEPTH):
+        alive = completed[ancestors]
+        sources, ancestors = sources[alive], ancestors[alive]
+        if not len(sources):
+            break
+        np.add.at(cents, ancestors, bonuses[scores[sources], level])
+        has_parent = parents[ancestors] >= 0
+        sources, ancestors = sources[has_parent], parents[ancestors[has_parent]]
+    return cents
+
+
+def _positions(ids, values):
+    """
+    Map participant ids to their positions in the sorted `ids`, -1 if absent
+    """
+    if not len(ids):
+        return np.full(len(values), -1, dtype=np.int64)
+    positions = np.searchsorted(ids, values).clip(max=len(ids) - 1)
+    return np.where(ids[positions] == values, positions, -1)
+
+
+def load_forest():
+    """
+    Return (participant ids, scores, completed, parent positions, stored
+    ticket cents) as arrays ordered by participant id
+    """
+    edges = np.array(
+        [
+            (participant_id, -1 if referrer_id is None else referrer_id)
+            for participant_id, referrer_id in Participant.objects.order_by(
+                "id"
+            ).values_list("id", "referred_by_id")
+        ],
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    ids, referrers = edges[:, 0], edges[:, 1]
+    parents = _positions(ids, referrers)
+
+    responses = list(
+        QuizResponse.objects.values_list("participant_id", "score", "raffle_tickets")
+    )
+    positions = _positions(ids, np.array([row[0] for row in responses], dtype=np.int64))
+    # Responses are only orphaned if rows were removed behind the ORM's back
+    responses = [row for row, position in zip(responses, positions) if position >= 0]
+    positions = positions[positions >= 0]
+    scores = np.zeros(len(ids), dtype=np.int64)
+    stored = np.zeros(len(ids), dtype=np.int64)
+    completed = np.zeros(len(ids), dtype=bool)
+    scores[positions] = [row[1] for row in responses]
+    stored[positions] = [int(row[2].scaleb(2)) for row in responses]
+    completed[positions] = True
+    return ids, scores, completed, parents, stored
+
+
+def diff():
+    """
+    Return [(participant_id, stored tickets, recomputed tickets), ...] for
+    every quiz response whose stored tickets are wrong
+    """
+    ids, scores, completed, parents, stored = load_forest()
+    expected = ticket_cents(scores, completed, parents)
+    wrong = np.flatnonzero(completed & (expected != stored))
+    return [
+        (
+            int(ids[i]),
+            Decimal(int(stored[i])).scaleb(-2),
+            Decimal(int(expected[i])).scaleb(-2),
+        )
+        for i in wrong
+    ]
+
+
+def recompute(batch_size=1000):
+    """
+    Write the recomputed tickets of every response whose stored tickets are
+    wrong and rebuild the leaderboard.
+
+    The comparison runs inside the writing transaction, which the tuned
+    SQLite backend opens with BEGIN IMMEDIATE: a quiz submission or referral
+    credit cannot land between reading the stored tickets and overwriting
+    them, so none is lost to a stale total.
+
+    Returns the number of responses updated.
+    """
+    with transaction.atomic():
+        new_tickets = {participant_id: tickets for participant_id, _, tickets in diff()}
+        if not new_tickets:
+            return 0
+        # Scanning beats a participant_id IN (...) list of unbounded length
+        responses = [
+            response
+            for response in QuizResponse.objects.only("id", "participant_id")
+            if response.participant_id in new_tickets
+        ]
+        for response in responses:
+            response.raffle_tickets = new_tickets[response.participant_id]
+        QuizResponse.objects.bulk_update(
+            responses, ["raffle_tickets"], batch_size=batch_size
+        )
+        leaderboard.rebuild(batch_size=batch_size)
+    return len(responses)
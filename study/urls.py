@@ -1,13 +1,18 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
 
 app_name = "study"
 
+# Participant pages have async twins for ASGI deployments
+participant_views = async_views if settings.ASYNC_PARTICIPANT_VIEWS else views
+
 urlpatterns = [
-    path("", views.home, name="home"),
-    path("video/", views.video, name="video"),
-    path("quiz/", views.quiz, name="quiz"),
-    path("results/", views.results, name="results"),
+    path("", participant_views.home, name="home"),
+    path("video/", participant_views.video, name="video"),
+    path("video/events/", views.playback_events, name="playback_events"),
+    path("quiz/", participant_views.quiz, name="quiz"),
+    path("results/", participant_views.results, name="results"),
     path("invalidated/", views.invalidate_participant, name="invalidated"),
-    path("leaderboard/", views.leaderboard, name="leaderboard"),
+    path("leaderboard/", participant_views.leaderboard, name="leaderboard"),
 ]
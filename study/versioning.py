@@ -0,0 +1,128 @@
+"""
+Data version counters used for conditional GET on read-heavy pages.
+
+Writers call bump() in the same transaction as the change; views wrap
+themselves in versioned_page(), which answers 304 Not Modified from a single
+primary-key lookup without running the view.
+"""
+
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+from .models import DataVersion
+
+LEADERBOARD = "leaderboard"
+STATISTICS = "statistics"
+
+
+def bump(key):
+    """
+    Record that the data behind `key` has changed
+    """
+    changes = {"version": F("version") + 1, "updated_at": timezone.now()}
+    with transaction.atomic():
+        versions = DataVersion.objects.filter(key=key)
+        if not versions.update(**changes):
+            DataVersion.objects.get_or_create(key=key)
+            versions.update(**changes)
+
+
+def current(key):
+    """
+    Return (version, updated_at) for `key`; (0, None) if never bumped
+    """
+    return DataVersion.objects.filter(key=key).values_list(
+        "version", "updated_at"
+    ).first() or (0, None)
+
+
+async def acurrent(key):
+    """
+    Async variant of current()
+    """
+    return await DataVersion.objects.filter(key=key).values_list(
+        "version", "updated_at"
+    ).afirst() or (0, None)
+
+
+def request_version(request, key):
+    """
+    current(key), looked up at most once per request.
+
+    Views wrapped in versioned_page(key) get it without another query.
+    """
+    cache = request.__dict__.setdefault("_data_versions", {})
+    if key not in cache:
+        cache[key] = current(key)
+    return cache[key]
+
+
+def link_variant(request, version):
+    """
+    Variant for pages with links built from the request (scheme and host)
+    or showing the session's referral code
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for part in (
+        request.scheme,
+        request.get_host(),
+        request.session.get("referral_code", ""),
+    ):
+        digest.update(part.encode() + b"\0")
+    return digest.hexdigest()
+
+
+def versioned_page(key, variant=None):
+    """
+    View decorator emitting ETag/Last-Modified from the data version of `key`.
+
+    `variant(request, version)`, if given, returns a string naming whatever
+    else the response depends on, or None if nothing does. It is added to the
+    ETag, and such responses carry no Last-Modified, which could not tell
+    the variants apart.
+    """
+
+    def page_variant(request):
+        cache = request.__dict__.setdefault("_page_variants", {})
+        if key not in cache:
+            cache[key] = (
+                variant(request, request_version(request, key)[0]) if variant else None
+            )
+        return cache[key]
+
+    def etag(request, *args, **kwargs):
+        tag = f"{key}-{request_version(request, key)[0]}"
+        extra = page_variant(request)
+        return tag if extra is None else f"{tag}-{extra}"
+
+    def last_modified(request, *args, **kwargs):
+        if page_variant(request) is not None:
+            return None
+        return request_version(request, key)[1]
+
+    def decorator(view):
+        conditional = condition(etag_func=etag, last_modified_func=last_modified)(view)
+        if not iscoroutinefunction(view):
+            return conditional
+
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            # condition() calls the header functions synchronously, so fill
+            # the per-request caches with an async query first; the variant
+            # may load a database-backed session
+            cache = request.__dict__.setdefault("_data_versions", {})
+            if key not in cache:
+                cache[key] = await acurrent(key)
+            if variant:
+                await sync_to_async(page_variant)(request)
+            return await conditional(request, *args, **kwargs)
+
+        return inner
+
+    return decorator
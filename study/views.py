@@ -1,11 +1,17 @@
 from django.shortcuts import render, redirect
 from django.contrib import messages
-from .models import Participant, QuizResponse
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseForbidden
+from django.views.decorators.http import require_POST
+from .models import LeaderboardEntry, Participant, QuizResponse
+from .allocation import assign_group
 from .forms import ParticipantForm, QuizForm
-from pathlib import Path
+from . import leaderboard as leaderboard_table
+from . import telemetry
+from .question_bank import get_question_bank, shuffled_questions
+from .quiz_fragments import question_fragments
+from .referrals import submit_quiz
+from .versioning import LEADERBOARD, link_variant, versioned_page
 import random
-import json
-from decimal import Decimal
 
 
 def home(request):
@@ -23,7 +29,6 @@ def home(request):
         form = ParticipantForm(request.POST)
         if form.is_valid():
             participant = form.save(commit=False)
-            participant.treatment_group = random.randint(1, 2)
 
             # Set referrer if available
             if "referral_code" in request.session:
@@ -35,8 +40,14 @@ def home(request):
                 except Participant.DoesNotExist:
                     pass
 
+            # Next slot of this worker's block; may stratify on the referrer
+            participant.treatment_group = assign_group(participant)
+
             participant.save()
+            if participant.referred_by_id:
+                leaderboard_table.adjust_referral_count(participant.referred_by_id, 1)
             request.session["participant_id"] = participant.id
+            request.session.pop("quiz_seed", None)
             return redirect("study:video")
     else:
         form = ParticipantForm()
@@ -57,13 +68,27 @@ def home(request):
     return render(request, "study/home.html", context)
 
 
-def video(request):
+def registered_participant(request, participants=Participant.objects):
+    """
+    The session's participant, or None if it has none. A session naming a
+    participant who no longer exists, such as a replayed cookie issued
+    before the participant was deleted, is flushed.
+    """
     participant_id = request.session.get("participant_id")
     if not participant_id:
+        return None
+    participant = participants.filter(id=participant_id).first()
+    if participant is None:
+        request.session.flush()
+    return participant
+
+
+def video(request):
+    participant = registered_participant(request)
+    if participant is None:
         messages.error(request, "Please register first.")
         return redirect("study:home")
 
-    participant = Participant.objects.get(id=participant_id)
     return render(
         request,
         "study/video.html",
@@ -74,12 +99,32 @@ def video(request):
     )
 
 
+@require_POST
+def playback_events(request):
+    """
+    Accept a batch of playback events sent by the video page with sendBeacon
+    """
+    participant_id = request.session.get("participant_id")
+    if not participant_id:
+        return HttpResponseForbidden()
+    try:
+        events = telemetry.parse_beacon(request.POST.get("events", ""), participant_id)
+    except telemetry.InvalidBeacon as exc:
+        return HttpResponseBadRequest(str(exc))
+    # Buffered; written in bulk by whichever request crosses a flush threshold
+    telemetry.buffer.add(events)
+    return HttpResponse(status=204)
+
+
 def invalidate_participant(request):
     participant_id = request.session.get("participant_id")
     if participant_id:
         try:
             # Delete all related data
             participant = Participant.objects.get(id=participant_id)
+            leaderboard_table.remove_entry(participant.id)
+            if participant.referred_by_id:
+                leaderboard_table.adjust_referral_count(participant.referred_by_id, -1)
             QuizResponse.objects.filter(participant=participant).delete()
             participant.delete()
         except Participant.DoesNotExist:
@@ -92,93 +137,61 @@ def invalidate_participant(request):
 
 
 def quiz(request):
-    participant_id = request.session.get("participant_id")
-    if not participant_id:
+    participant = registered_participant(request)
+    if participant is None:
         messages.error(request, "Please register first.")
         return redirect("study:home")
 
-    participant = Participant.objects.get(id=participant_id)
-
-    json_path = Path(__file__).parent / "data" / "questions.json"
-    with open(json_path) as f:
-        questions_data = json.load(f)["questions"]
-
-    random.shuffle(questions_data)
-    request.session["shuffled_questions"] = questions_data
+    # Only the seed is stored; question and option order are derived from it
+    seed = request.session.get("quiz_seed")
+    if seed is None:
+        seed = random.getrandbits(32)
+        request.session["quiz_seed"] = seed
 
     if request.method == "POST":
-        form = QuizForm(
-            request.POST,
-            questions_to_display=request.session.get("shuffled_questions", []),
-        )
+        bank = get_question_bank()
+        questions_data = shuffled_questions(seed, bank)
+        form = QuizForm(request.POST, questions_to_display=questions_data, seed=seed)
         if form.is_valid():
             score = 0
-            shuffled_questions_from_session = request.session.get(
-                "shuffled_questions", []
-            )
 
-            for i, question_data in enumerate(shuffled_questions_from_session):
+            for i, question_data in enumerate(questions_data):
                 user_answer_key = form.cleaned_data.get(f"question_{i}")
 
-                original_correct_answer_letter = question_data["correct_answer"]
+                original_correct_answer_letter = question_data.correct_answer
 
                 if user_answer_key == original_correct_answer_letter:
                     score += 1
 
-            # Calculate raffle tickets: 2 times the score (as decimal)
-            raffle_tickets = Decimal("2") * score
-            QuizResponse.objects.create(
-                participant=participant, score=score, raffle_tickets=raffle_tickets
-            )
-            del request.session["shuffled_questions"]
+            answers = form.packed_answers()
+            # Records the response and credits the referral chain once
+            _, bonuses = submit_quiz(participant, score, answers, bank.key_digest)
+            if bonuses:
+                # Store info for the direct referrer only
+                direct_bonus = next(iter(bonuses.values()))
+                request.session["referred_bonus_earned"] = str(direct_bonus)
             return redirect("study:results")
+        # Invalid answers: re-render the bound form to keep the selections
+        context = {"form": form}
     else:
-        form = QuizForm(questions_to_display=questions_data)
+        # Assembled from cached question blocks; no form is built on GET
+        context = {"question_fragments": question_fragments(seed)}
 
-    return render(
-        request, "study/quiz.html", {"form": form, "participant": participant}
-    )
+    context["participant"] = participant
+    return render(request, "study/quiz.html", context)
 
 
 def results(request):
-    participant_id = request.session.get("participant_id")
-    if not participant_id:
+    # Results are read-only; bonuses were applied when the quiz was submitted
+    participant = registered_participant(
+        request, Participant.objects.select_related("referred_by")
+    )
+    if participant is None:
         messages.error(request, "Please register first.")
         return redirect("study:home")
 
-    participant = Participant.objects.get(id=participant_id)
     quiz_response = QuizResponse.objects.get(participant=participant)
 
-    # Check if this completion was through a referral and process cascading rewards
-    if participant.referred_by:
-        # Apply cascading referral rewards - each level gets 20% of the tickets from their referral
-        current_referral = participant.referred_by
-        current_bonus = quiz_response.raffle_tickets
-        referral_level = 1
-
-        while current_referral and referral_level <= 5:  # Limit to 5 levels deep
-            try:
-                referring_quiz_response = QuizResponse.objects.get(
-                    participant=current_referral
-                )
-                # Calculate bonus for this level (20% of previous level's tickets)
-                level_bonus = current_bonus * Decimal("0.2")
-
-                # Update referrer's tickets
-                referring_quiz_response.raffle_tickets += level_bonus
-                referring_quiz_response.save()
-
-                # Store info for the direct referrer only
-                if referral_level == 1:
-                    request.session["referred_bonus_earned"] = str(level_bonus)
-
-                # Set up for next level in the chain
-                current_bonus = level_bonus
-                current_referral = current_referral.referred_by
-                referral_level += 1
-            except QuizResponse.DoesNotExist:
-                break
-
     # Generate site URL for referral link
     site_url = request.build_absolute_uri("/").rstrip("/")
     referral_url = f"{site_url}?ref={participant.referral_code}"
@@ -187,14 +200,6 @@ def results(request):
     referral_success = participant.referred_by is not None
     referral_source = participant.referred_by.name if participant.referred_by else None
 
-    # Ensure referred_bonus_earned is properly formatted for template
-    if "referred_bonus_earned" in request.session:
-        # Store as string to avoid serialization issues
-        if not isinstance(request.session["referred_bonus_earned"], str):
-            request.session["referred_bonus_earned"] = str(
-                request.session["referred_bonus_earned"]
-            )
-
     return render(
         request,
         "study/results.html",
@@ -208,39 +213,29 @@ def results(request):
     )
 
 
+@versioned_page(LEADERBOARD, variant=link_variant)
 def leaderboard(request):
     """
     Display a leaderboard of participants and their raffle tickets
     """
-    # Get all participants who have completed the quiz
-    participants_with_quiz = (
-        QuizResponse.objects.select_related("participant")
-        .all()
-        .order_by("-raffle_tickets")
+    # Ranks, scores and referral counts are precomputed in LeaderboardEntry
+    entries = LeaderboardEntry.objects.order_by("rank", "participant_id").values_list(
+        "name", "score", "raffle_tickets", "referral_code", "referral_count", "rank"
     )
 
     # Generate referral URLs for each participant
     site_url = request.build_absolute_uri("/").rstrip("/")
-    participants_data = []
-
-    for quiz_response in participants_with_quiz:
-        participant = quiz_response.participant
-        referral_url = f"{site_url}?ref={participant.referral_code}"
-
-        # Count the number of referrals this participant has made
-        referral_count = Participant.objects.filter(referred_by=participant).count()
-
-        participants_data.append(
-            {
-                "name": participant.name,
-                "score": quiz_response.score,
-                "tickets": float(
-                    quiz_response.raffle_tickets
-                ),  # Convert Decimal to float for template
-                "referral_url": referral_url,
-                "referral_count": referral_count,
-            }
-        )
+    participants_data = [
+        {
+            "name": name,
+            "score": score,
+            "tickets": float(tickets),  # Convert Decimal to float for template
+            "referral_url": f"{site_url}?ref={referral_code}",
+            "referral_count": referral_count,
+            "rank": rank,
+        }
+        for name, score, tickets, referral_code, referral_count, rank in entries
+    ]
 
     return render(
         request,